@@ -0,0 +1,303 @@
+import json
+
+from flask import Blueprint, Response, current_app, request
+
+try:
+    import msgpack
+except ImportError:  # msgpack responses are then not offered
+    msgpack = None
+
+from data_manager import (
+    BATCH_CANCELLED,
+    book_batch,
+    book_places,
+    get_clubs,
+    get_clubs_page,
+    get_competitions,
+    get_competitions_page,
+    get_obj_by_field
+)
+from models import competition_date
+
+api = Blueprint("api", __name__, url_prefix="/api")
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack")
+
+# Fields each endpoint can return, with the function reading each one.
+# Club emails are the secretaries' logins, so they are not exposed.
+FIELDS = {
+    "clubs": {
+        "name": lambda club: club["name"],
+        "points": lambda club: int(club["points"]),
+    },
+    "competitions": {
+        "name": lambda comp: comp["name"],
+        "date": lambda comp: competition_date(comp).isoformat(sep=" "),
+        "number_of_places": lambda comp: int(comp["number_of_places"]),
+    },
+}
+
+
+class ApiError(Exception):
+    """Error answered to the client with a status code and a message"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+########################################################
+# SERIALIZATION HELPERS
+########################################################
+
+def wants_msgpack() -> bool:
+    """Check if the client prefers msgpack, when it is available"""
+    if msgpack is None:
+        return False
+    best = request.accept_mimetypes.best_match(
+        (JSON_MIMETYPE,) + MSGPACK_MIMETYPES
+    )
+    return best in MSGPACK_MIMETYPES
+
+
+def api_response(data: dict, status: int = 200) -> Response:
+    """Serialize `data` to compact JSON, or to msgpack if preferred"""
+    if wants_msgpack():
+        return Response(
+            msgpack.packb(data), status, mimetype=MSGPACK_MIMETYPES[0]
+        )
+    return Response(
+        json.dumps(data, separators=(",", ":")), status,
+        mimetype=JSON_MIMETYPE
+    )
+
+
+def request_data() -> dict:
+    """Return the JSON or msgpack body of the request"""
+    if request.mimetype in MSGPACK_MIMETYPES and msgpack is not None:
+        try:
+            data = msgpack.unpackb(request.get_data())
+        except ValueError:
+            data = None
+    else:
+        data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ApiError("Invalid data provided")
+    return data
+
+
+def selected_fields(kind: str) -> list:
+    """
+    Return the (name, reader) of the fields selected by the `fields`
+    query argument, or of all the fields.
+    """
+    available = FIELDS[kind]
+    names = request.args.get("fields")
+    if not names:
+        return list(available.items())
+    fields = []
+    for name in names.split(","):
+        if name not in available:
+            raise ApiError(f"Unknown field: {name}")
+        fields.append((name, available[name]))
+    return fields
+
+
+def serialize(items, fields: list) -> list:
+    """Return the selected fields of each item as a dict"""
+    return [{name: read(item) for name, read in fields} for item in items]
+
+
+def int_arg(name: str, default: int, minimum: int = 0) -> int:
+    """Return an integer query argument"""
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        raise ApiError(f"Invalid {name}") from None
+    if value < minimum:
+        raise ApiError(f"Invalid {name}")
+    return value
+
+
+def page_size() -> int:
+    """Return the requested page size, capped by API_MAX_PAGE_SIZE"""
+    limit = int_arg("limit", current_app.config["API_PAGE_SIZE"], minimum=1)
+    return min(limit, current_app.config["API_MAX_PAGE_SIZE"])
+
+
+@api.errorhandler(ApiError)
+def handle_api_error(error):
+    return api_response({"error": error.message}, error.status)
+
+
+########################################################
+# API ROUTES
+########################################################
+
+@api.route("/clubs")
+def list_clubs():
+    """
+    List the clubs by name, `limit` at a time after the cursor `after`,
+    with the fields selected by `fields`.
+    """
+    fields = selected_fields("clubs")
+    page, next_cursor = get_clubs_page(
+        get_clubs(), after=request.args.get("after"), limit=page_size()
+    )
+    return api_response({
+        "clubs": serialize(page, fields),
+        "next_cursor": next_cursor,
+    })
+
+
+@api.route("/competitions")
+def list_competitions():
+    """
+    List the competitions by date, `limit` at a time after the cursor
+    `after`, with the fields selected by `fields`.
+    `upcoming=0` includes past competitions, `available=1` only lists
+    competitions with places left.
+    """
+    fields = selected_fields("competitions")
+    page, next_cursor = get_competitions_page(
+        get_competitions(),
+        after=request.args.get("after"),
+        limit=page_size(),
+        upcoming_only=request.args.get("upcoming", "1") == "1",
+        with_places=request.args.get("available", "0") == "1",
+    )
+    return api_response({
+        "competitions": serialize(page, fields),
+        "next_cursor": next_cursor,
+    })
+
+
+def booking_request(data) -> tuple[str, str, int]:
+    """
+    Return the competition name, club name and places of a booking
+    request object.
+    """
+    if not isinstance(data, dict):
+        raise ApiError("Invalid data provided")
+    competition_name = data.get("competition")
+    club_name = data.get("club")
+    places = data.get("places")
+    if not all([competition_name, club_name, places]):
+        raise ApiError("Missing required data")
+    # Only a strictly positive number of places can be booked
+    if isinstance(places, bool) or not isinstance(places, (int, str)):
+        raise ApiError("Invalid data provided")
+    try:
+        places_required = int(places)
+    except ValueError:
+        raise ApiError("Invalid data provided") from None
+    if places_required <= 0:
+        raise ApiError("Invalid data provided")
+    return competition_name, club_name, places_required
+
+
+def find_booked(competition_name: str, club_name: str) -> tuple:
+    """Return the competition and club of a booking (None if unknown)"""
+    return (
+        get_obj_by_field("name", competition_name, get_competitions()),
+        get_obj_by_field("name", club_name, get_clubs()),
+    )
+
+
+def booking_response(competition, club) -> dict:
+    """Return the club and competition values after a booking"""
+    return {
+        "club": serialize([club], FIELDS["clubs"].items())[0],
+        "competition": serialize(
+            [competition], FIELDS["competitions"].items()
+        )[0],
+    }
+
+
+@api.route("/bookings", methods=["POST"])
+def create_booking():
+    """
+    Book `places` of the competition `competition` for the club `club`,
+    given as a JSON or msgpack object.
+    """
+    competition_name, club_name, places_required = booking_request(
+        request_data()
+    )
+    competition, club = find_booked(competition_name, club_name)
+    if club is None or competition is None:
+        raise ApiError("Invalid competition or club", 404)
+
+    error, competition, club = book_places(
+        competition, club, places_required
+    )
+    if error:
+        raise ApiError(error, 409)
+    return api_response(booking_response(competition, club), 201)
+
+
+@api.route("/bookings/batch", methods=["POST"])
+def create_bookings():
+    """
+    Make the `bookings` of a JSON or msgpack object, each given like
+    for /bookings, with a single save.
+    By default (`atomic` true) nothing is booked unless every booking
+    is possible, and an invalid booking is answered 400; with `atomic`
+    false, each booking is made if possible, an invalid one refused.
+    Answers the result of each booking, in order.
+    """
+    data = request_data()
+    items = data.get("bookings")
+    if not isinstance(items, list) or not items:
+        raise ApiError("Missing required data")
+    if len(items) > current_app.config["API_MAX_BATCH_SIZE"]:
+        raise ApiError("Too many bookings")
+    atomic = data.get("atomic", True)
+    if not isinstance(atomic, bool):
+        raise ApiError("Invalid data provided")
+
+    # The known (competition, club, places_required) of each item, or
+    # the error of the item
+    entries = []
+    for item in items:
+        try:
+            competition_name, club_name, places_required = booking_request(
+                item
+            )
+        except ApiError as e:
+            if atomic:
+                raise
+            entries.append(e.message)
+            continue
+        competition, club = find_booked(competition_name, club_name)
+        known = club is not None and competition is not None
+        entries.append(
+            (competition, club, places_required) if known
+            else "Invalid competition or club"
+        )
+    bookings = [entry for entry in entries if isinstance(entry, tuple)]
+
+    if atomic and len(bookings) < len(entries):
+        errors = [BATCH_CANCELLED] * len(bookings)
+    elif bookings:
+        # The records booked, which a reload may have replaced
+        errors, bookings = book_batch(bookings, atomic)
+    else:
+        errors = []
+
+    outcomes = iter(zip(errors, bookings))
+    results = []
+    for entry in entries:
+        error, booking = (entry, None) if isinstance(entry, str) \
+            else next(outcomes)
+        if error:
+            results.append({"status": "refused", "error": error})
+        else:
+            results.append(
+                {"status": "booked", **booking_response(*booking[:2])}
+            )
+    booked = sum(result["status"] == "booked" for result in results)
+
+    status = 409 if atomic and booked < len(results) else 200
+    return api_response({"booked": booked, "results": results}, status)
@@ -13,7 +13,100 @@ class Config:
         self.DEBUG = os.environ.get('FLASK_DEBUG', '1') == '1'
         self.RUN_PORT = os.environ.get('FLASK_RUN_PORT', '5000')
         self.TESTING = False
-        self.JSON_CLUBS = "clubs.json"
-        self.JSON_COMPETITIONS = "competitions.json"
+        self.COMPETITIONS_PAGE_SIZE = int(
+            os.environ.get('COMPETITIONS_PAGE_SIZE', '20')
+        )
+        # Items per page of the JSON API, by default and at most
+        self.API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', '100'))
+        self.API_MAX_PAGE_SIZE = int(
+            os.environ.get('API_MAX_PAGE_SIZE', '1000')
+        )
+        # Largest list of bookings accepted by POST /api/bookings/batch
+        self.API_MAX_BATCH_SIZE = int(
+            os.environ.get('API_MAX_BATCH_SIZE', '500')
+        )
+        # Stream the points and welcome pages as they render, in chunks
+        # of STREAM_CHUNK_SIZE template pieces, instead of rendering
+        # them whole (the points page is then not cached)
+        self.STREAM_PAGES = os.environ.get('STREAM_PAGES', '0') == '1'
+        self.STREAM_CHUNK_SIZE = int(
+            os.environ.get('STREAM_CHUNK_SIZE', '64')
+        )
+        # Time the requests and their stages, exposed at /metrics and
+        # in the Server-Timing header of each response
+        self.METRICS = os.environ.get('METRICS', '1') == '1'
+        # Profile the requests to PROFILE_ROUTES (comma-separated URL
+        # rules) and a PROFILE_SAMPLE_RATE share of the others, keeping
+        # those slower than PROFILE_SLOW_MS in PROFILE_DIR (empty
+        # disables it), at most PROFILE_MAX_FILES of them
+        self.PROFILE_DIR = os.environ.get('PROFILE_DIR', '')
+        self.PROFILE_SAMPLE_RATE = float(
+            os.environ.get('PROFILE_SAMPLE_RATE', '0.01')
+        )
+        self.PROFILE_ROUTES = tuple(
+            route.strip()
+            for route in os.environ.get('PROFILE_ROUTES', '').split(',')
+            if route.strip()
+        )
+        self.PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', '0'))
+        self.PROFILE_MAX_FILES = int(
+            os.environ.get('PROFILE_MAX_FILES', '100')
+        )
+        # Load test mode: POST /_load_test/reset replaces the data by
+        # generated data every booking can succeed on. The app then
+        # refuses to start on the data files shipped with it.
+        self.LOAD_TEST = os.environ.get('LOAD_TEST', '0') == '1'
+        # Rendered pages kept by the render cache (0 disables it)
+        self.RENDER_CACHE_SIZE = int(
+            os.environ.get('RENDER_CACHE_SIZE', '16')
+        )
+        # Data files, next to this file unless set in the environment
+        self.JSON_CLUBS = os.environ.get(
+            'JSON_CLUBS', str(BASE_DIR / "clubs.json")
+        )
+        self.JSON_COMPETITIONS = os.environ.get(
+            'JSON_COMPETITIONS', str(BASE_DIR / "competitions.json")
+        )
+        # "json" keeps the data in the JSON files above, "sqlite" in
+        # SQLITE_DATABASE (filled from the JSON files when empty).
+        self.STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'json')
+        self.SQLITE_DATABASE = os.environ.get(
+            'SQLITE_DATABASE', str(BASE_DIR / "gudlft.db")
+        )
+        # Several worker processes (e.g. gunicorn -w N) share the data:
+        # each one reloads what the others changed, and bookings are
+        # serialized across workers (through a lock file next to
+        # JSON_CLUBS with the json backend).
+        self.SHARED_STATE = os.environ.get('SHARED_STATE', '0') == '1'
+        # Seconds between two checks of the data files for changes made
+        # outside the app, which are then loaded without a restart
+        # (0 disables it)
+        self.DATA_RELOAD_INTERVAL = float(
+            os.environ.get('DATA_RELOAD_INTERVAL', '0')
+        )
+        # "snapshot" rewrites both JSON files after each booking,
+        # "journal" appends each booking to JSON_JOURNAL and only
+        # rewrites them every JOURNAL_COMPACT_EVERY bookings.
+        self.PERSISTENCE_MODE = os.environ.get('PERSISTENCE_MODE', 'snapshot')
+        self.JSON_JOURNAL = os.environ.get(
+            'JSON_JOURNAL', str(BASE_DIR / "bookings.journal")
+        )
+        self.JOURNAL_COMPACT_EVERY = int(
+            os.environ.get('JOURNAL_COMPACT_EVERY', '1000')
+        )
+        # In snapshot mode, bookings arriving within this many seconds
+        # are saved by a single write of both files (0 disables it).
+        self.GROUP_COMMIT_WINDOW = float(
+            os.environ.get('GROUP_COMMIT_WINDOW', '0')
+        )
+        # Bookings are saved by a writer thread instead of the request
+        # thread (ignored with SHARED_STATE). ASYNC_DURABILITY "memory"
+        # answers once a booking is queued, "disk" once it is saved.
+        # At most ASYNC_QUEUE_SIZE saves wait, then bookings block.
+        self.ASYNC_WRITES = os.environ.get('ASYNC_WRITES', '0') == '1'
+        self.ASYNC_DURABILITY = os.environ.get('ASYNC_DURABILITY', 'memory')
+        self.ASYNC_QUEUE_SIZE = int(
+            os.environ.get('ASYNC_QUEUE_SIZE', '1000')
+        )
 
 config = {"default": Config()}
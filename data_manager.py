@@ -1,8 +1,37 @@
+import atexit
+import base64
 import json
+import os
+import queue
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from contextlib import ExitStack, contextmanager, nullcontext
+from copy import copy
+from datetime import datetime
+from operator import itemgetter
 
-from flask import Flask, current_app
+from flask import Flask, current_app, has_app_context
+from werkzeug.local import LocalProxy
 
-from validators import validate_competition_date, validate_places_required
+from config import config
+from metrics import count_booking, timed
+from models import Club, Competition, competition_date, to_json
+from validators import (
+    normalize_email,
+    validate_competition_date,
+    validate_places_required
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: workers then only lock within a process
+    fcntl = None
 
 ########################################################
 # DATA & SERVICES FUNCTIONS
@@ -15,41 +44,1858 @@ def load_data(file_path: str, key: str):
         return json.load(f)[key]
 
 
-CLUBS = load_data("clubs.json", "clubs")
-COMPETITIONS = load_data("competitions.json", "competitions")
+########################################################
+# LOOKUP INDEXES
+########################################################
+
+# Indexes of each list, with the function giving an object's key in each
+INDEXED_FIELDS = {
+    "clubs": {
+        "name": itemgetter("name"),
+        "email": itemgetter("email"),
+        "normalized_email": lambda club: normalize_email(club["email"]),
+    },
+    "competitions": {"name": itemgetter("name")},
+}
+
+# For each list name: the indexed list itself and one dict per index
+_INDEXES = {}
+
+
+def build_index(list_name: str, list_of_dicts: list):
+    """Build the lookup indexes of a list of clubs or competitions"""
+    _INDEXES[list_name] = (
+        list_of_dicts,
+        {
+            field: {key(item): item for item in reversed(list_of_dicts)}
+            for field, key in INDEXED_FIELDS[list_name].items()
+        },
+    )
+
+
+def update_index(list_name: str, old_list: list, new_list: list, obj: dict):
+    """
+    Make the indexes of `old_list` point to `new_list`, where `obj`
+    has replaced the object of the same name.
+    Does nothing if `old_list` is not indexed.
+    Returns the replaced object, if any.
+    """
+    indexed_list, fields = _INDEXES.get(list_name, (None, None))
+    if indexed_list is not old_list:
+        return None
+    replaced = fields["name"].get(obj["name"])
+    for field, key in INDEXED_FIELDS[list_name].items():
+        if replaced is not None:
+            fields[field].pop(key(replaced), None)
+        fields[field][key(obj)] = obj
+    _INDEXES[list_name] = (new_list, fields)
+    return replaced
+
+
+def apply_index_changes(
+    list_name: str, old_list: list, new_list: list, changes: list
+):
+    """
+    Make the indexes of `old_list` point to `new_list`, which differs
+    by the (old, new) `changes` (None for an added or removed object).
+    Does nothing if `old_list` is not indexed.
+    """
+    indexed_list, fields = _INDEXES.get(list_name, (None, None))
+    if indexed_list is not old_list:
+        return
+    for old, new in changes:
+        for field, key in INDEXED_FIELDS[list_name].items():
+            if old is not None and fields[field].get(key(old)) is old:
+                del fields[field][key(old)]
+            if new is not None:
+                fields[field][key(new)] = new
+    _INDEXES[list_name] = (new_list, fields)
+
+
+def build_indexes():
+    """Build the lookup indexes of the clubs and competitions lists"""
+    build_index("clubs", CLUBS)
+    build_index("competitions", COMPETITIONS)
+    build_calendar(COMPETITIONS)
+
+
+def get_index(key: str, list_of_dicts: list) -> dict | None:
+    """
+    Return the index of `list_of_dicts` on `key`, or None if that
+    list (or field) is not indexed.
+    """
+    for indexed_list, fields in _INDEXES.values():
+        if indexed_list is list_of_dicts:
+            return fields.get(key)
+    return None
+
+
+def get_email_index(clubs: list) -> dict:
+    """
+    Return the clubs of `clubs` keyed by normalized email, from the
+    index when `clubs` is indexed.
+    """
+    index = get_index("normalized_email", clubs)
+    if index is None:
+        index = {
+            normalize_email(club["email"]): club for club in reversed(clubs)
+        }
+    return index
+
+
+########################################################
+# COMPETITION CALENDAR
+########################################################
+
+
+def competition_key(competition: dict) -> tuple:
+    """Return the key ordering competitions by date, then by name"""
+    return competition_date(competition), competition["name"]
+
+
+class CompetitionCalendar:
+    """
+    Competitions ordered by date, split between past and upcoming ones.
+    The split only moves forward as time passes, so keeping it up to
+    date costs O(1) amortized, and a competition is found in O(log n).
+    """
+
+    def __init__(self, competitions: list):
+        self._competitions = sorted(competitions, key=competition_key)
+        self._split = 0
+
+    def _advance(self) -> int:
+        """Move the competitions that have started to the past ones"""
+        now = datetime.now()
+        competitions = self._competitions
+        while (
+            self._split < len(competitions)
+            and competition_date(competitions[self._split]) <= now
+        ):
+            self._split += 1
+        return self._split
+
+    def _position(self, competition: dict) -> int | None:
+        """Return the position of `competition`, or None if absent"""
+        key = competition_key(competition)
+        position = bisect_left(self._competitions, key, key=competition_key)
+        while (
+            position < len(self._competitions)
+            and competition_key(self._competitions[position]) == key
+        ):
+            if self._competitions[position] is competition:
+                return position
+            position += 1
+        return None
+
+    def all(self) -> list:
+        """Return all the competitions, ordered by date"""
+        return self._competitions
+
+    def past_count(self) -> int:
+        """Return the number of competitions which have started"""
+        return self._advance()
+
+    def past(self) -> list:
+        """Return the competitions which have started, ordered by date"""
+        return self._competitions[:self._advance()]
+
+    def upcoming(self) -> list:
+        """Return the competitions still to come, ordered by date"""
+        return self._competitions[self._advance():]
+
+    def page(
+        self,
+        after: tuple | None = None,
+        limit: int = 20,
+        upcoming_only: bool = True,
+        with_places: bool = False
+    ) -> tuple[list, tuple | None]:
+        """
+        Return up to `limit` competitions following the key `after`,
+        and the key to continue from (None on the last page).
+        The start is found by bisection, so the cost depends on the
+        page size (plus the full competitions skipped with
+        `with_places`), not on the number of competitions.
+        """
+        competitions = self._competitions
+        start = self._advance() if upcoming_only else 0
+        if after is not None:
+            start = max(
+                start, bisect_right(competitions, after, key=competition_key)
+            )
+        page = []
+        position = start
+        while position < len(competitions) and len(page) <= limit:
+            competition = competitions[position]
+            if not with_places or competition["number_of_places"] > 0:
+                page.append(competition)
+            position += 1
+        if len(page) > limit:
+            return page[:limit], competition_key(page[limit - 1])
+        return page, None
+
+    def add(self, competition: dict):
+        """Insert a competition at its position in the calendar"""
+        position = bisect_right(
+            self._competitions,
+            competition_key(competition),
+            key=competition_key
+        )
+        self._competitions.insert(position, competition)
+        if position < self._split:
+            self._split += 1
+
+    def remove(self, competition: dict):
+        """Remove a competition, if present"""
+        position = self._position(competition)
+        if position is None:
+            return
+        del self._competitions[position]
+        if position < self._split:
+            self._split -= 1
+
+    def replace(self, old: dict, new: dict):
+        """Replace a competition by a new version of it"""
+        position = self._position(old)
+        if position is not None and (
+            competition_key(old) == competition_key(new)
+        ):
+            self._competitions[position] = new
+            return
+        self.remove(old)
+        self.add(new)
 
 
+# The indexed competitions list and its calendar
+_CALENDAR = (None, None)
+
+
+def build_calendar(competitions: list):
+    """Build the calendar of the indexed competitions list"""
+    global _CALENDAR
+    _CALENDAR = (competitions, CompetitionCalendar(competitions))
+
+
+def update_calendar(
+    old_list: list, new_list: list, replaced: dict | None, obj: dict
+):
+    """
+    Make the calendar of `old_list` follow its replacement by
+    `new_list`, where `obj` has replaced `replaced`.
+    Does nothing if `old_list` has no calendar.
+    """
+    global _CALENDAR
+    calendar_list, calendar = _CALENDAR
+    if calendar_list is not old_list:
+        return
+    if replaced is None:
+        calendar.add(obj)
+    elif replaced is not obj:
+        calendar.replace(replaced, obj)
+    _CALENDAR = (new_list, calendar)
+
+
+def apply_calendar_changes(old_list: list, new_list: list, changes: list):
+    """
+    Make the calendar of `old_list` follow its replacement by
+    `new_list`, which differs by the (old, new) `changes`.
+    Does nothing if `old_list` has no calendar.
+    """
+    global _CALENDAR
+    calendar_list, calendar = _CALENDAR
+    if calendar_list is not old_list:
+        return
+    for old, new in changes:
+        if old is None:
+            calendar.add(new)
+        elif new is None:
+            calendar.remove(old)
+        else:
+            calendar.replace(old, new)
+    _CALENDAR = (new_list, calendar)
+
+
+def get_calendar(competitions: list) -> CompetitionCalendar:
+    """
+    Return the calendar of `competitions`, the maintained one when
+    `competitions` is the indexed list.
+    """
+    calendar_list, calendar = _CALENDAR
+    if calendar_list is competitions:
+        return calendar
+    return CompetitionCalendar(competitions)
+
+
+def encode_cursor(key: tuple) -> str:
+    """Encode a calendar key into an opaque, URL-safe page cursor"""
+    date, name = key
+    data = json.dumps([date.isoformat(), name], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(cursor: str | None) -> tuple | None:
+    """Decode a page cursor, or return None if it is missing or invalid"""
+    if not cursor:
+        return None
+    try:
+        date, name = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        date = datetime.fromisoformat(date)
+    except (ValueError, TypeError):
+        return None
+    # Only keys comparable with the calendar's, whose dates are naive
+    if date.tzinfo is not None or not isinstance(name, str):
+        return None
+    return date, name
+
+
+def get_competitions_page(
+    competitions: list,
+    after: str | None = None,
+    limit: int = 20,
+    upcoming_only: bool = True,
+    with_places: bool = False
+) -> tuple[list, str | None]:
+    """
+    Return a page of `competitions` ordered by date, starting after the
+    cursor `after`, and the cursor of the next page (None if last).
+    """
+    page, next_key = get_calendar(competitions).page(
+        decode_cursor(after), limit, upcoming_only, with_places
+    )
+    return page, next_key and encode_cursor(next_key)
+
+
+# The clubs list last ordered by name, with its clubs and their names
+_CLUBS_BY_NAME = (None, [], [])
+
+
+def clubs_by_name(clubs: list) -> tuple[list, list]:
+    """
+    Return `clubs` ordered by name, and their names, sorted again only
+    when `clubs` is not the list last ordered (reloads replace it).
+    """
+    global _CLUBS_BY_NAME
+    sorted_list, ordered, names = _CLUBS_BY_NAME
+    if sorted_list is not clubs:
+        ordered = sorted(clubs, key=itemgetter("name"))
+        names = [club["name"] for club in ordered]
+        _CLUBS_BY_NAME = (clubs, ordered, names)
+    return ordered, names
+
+
+def encode_name_cursor(name: str) -> str:
+    """Encode a club name into an opaque, URL-safe page cursor"""
+    return base64.urlsafe_b64encode(json.dumps(name).encode()).decode()
+
+
+def decode_name_cursor(cursor: str | None) -> str | None:
+    """Decode a name cursor, or return None if it is missing or invalid"""
+    if not cursor:
+        return None
+    try:
+        name = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    return name if isinstance(name, str) else None
+
+
+def get_clubs_page(
+    clubs: list, after: str | None = None, limit: int = 100
+) -> tuple[list, str | None]:
+    """
+    Return a page of `clubs` ordered by name, starting after the cursor
+    `after`, and the cursor of the next page (None if last).
+    The order does not depend on the clubs' order in the data, so the
+    pages neither skip nor repeat clubs when the data is reloaded.
+    """
+    ordered, names = clubs_by_name(clubs)
+    name = decode_name_cursor(after)
+    start = 0 if name is None else bisect_right(names, name)
+    page = ordered[start:start + limit]
+    if start + limit < len(ordered):
+        return page, encode_name_cursor(page[-1]["name"])
+    return page, None
+
+
+def _default_file_mode() -> int:
+    """Return the mode open() creates a file with, under the umask"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# Mode of the data files saved for the first time
+NEW_FILE_MODE = _default_file_mode()
+
+
+def file_mode(file_path: str) -> int:
+    """Return the permissions of a file, or those of a new file"""
+    try:
+        return stat.S_IMODE(os.stat(file_path).st_mode)
+    except FileNotFoundError:
+        return NEW_FILE_MODE
+
+
+@timed("save")
 def save_json(file_path: str, data: list, key: str):
-    """Save JSON data to a club or competition file"""
-    with open(file_path, "w") as f:
-        json.dump({key: data}, f, ensure_ascii=True, indent=4)
+    """
+    Save JSON data to a club or competition file.
+    The data is written and synced to a temporary file which then
+    replaces the target, so readers never see a partly written file.
+    The temporary file takes the target's permissions, mkstemp only
+    letting its owner read it.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp"
+    )
+    try:
+        os.chmod(tmp_path, file_mode(file_path))
+        with os.fdopen(fd, "w") as f:
+            json.dump(
+                {key: data}, f, ensure_ascii=True, indent=4, default=to_json
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    sync_directory(directory)
 
 
+def file_stamp(file_path: str) -> tuple | None:
+    """
+    Return the inode, modification time and size of a file, which
+    change whenever it is replaced or written, or None if it is missing.
+    """
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def sync_directory(directory: str):
+    """Make the renames done in a directory durable (POSIX only)"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+########################################################
+# DATA VERSION
+########################################################
+
+# Bumped whenever the clubs or competitions change, so anything derived
+# from them (rendered pages, ETags...) can tell whether it is still current
+_data_version = 0
+# Version of each ("club" | "competition", name) changed since startup
+_object_versions = {}
+_VERSION_LOCK = threading.Lock()
+
+# Changes on each start, as the versions start over from 0
+DATA_EPOCH = uuid.uuid4().hex
+
+
+def get_data_version() -> int:
+    """Return the current version of the clubs and competitions data"""
+    return _data_version
+
+
+def get_object_version(kind: str, name: str) -> int:
+    """Return the current version of the club or competition `name`"""
+    return _object_versions.get((kind, name), 0)
+
+
+def bump_data_version(changed: tuple = ()) -> int:
+    """
+    Record a change of the clubs or competitions data, and of each
+    ("club" | "competition", name) in `changed`.
+    """
+    global _data_version
+    with _VERSION_LOCK:
+        _data_version += 1
+        for key in changed:
+            _object_versions[key] = _data_version
+        return _data_version
+
+
+########################################################
+# LOCKING
+########################################################
+
+# One lock per competition and per club, created on first use
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+
+# Serializes the rebinding of the CLUBS and COMPETITIONS lists
+_LISTS_LOCK = threading.Lock()
+
+# Serializes disk writes, so an older state never overwrites a newer one
+_PERSIST_LOCK = threading.RLock()
+
+
+def get_lock(kind: str, name: str) -> threading.Lock:
+    """Return the lock of the club or competition named `name`"""
+    lock = _LOCKS.get((kind, name))
+    if lock is None:
+        with _LOCKS_GUARD:
+            lock = _LOCKS.setdefault((kind, name), threading.Lock())
+    return lock
+
+
+@contextmanager
+def booking_lock(competition: dict, club: dict):
+    """
+    Hold the locks of a competition and a club during a booking.
+    The competition lock is always taken first, so two bookings can
+    never wait for each other's lock.
+    """
+    with get_lock("competition", competition["name"]), \
+         get_lock("club", club["name"]):
+        yield
+
+
+# Number of bookings of each ("club" | "competition", name) made in
+# memory but not saved yet
+_UNSAVED = Counter()
+_UNSAVED_LOCK = threading.Lock()
+
+
+def mark_unsaved(competition: dict, club: dict):
+    """Record a booking made in memory, which a reload must not undo"""
+    with _UNSAVED_LOCK:
+        _UNSAVED[("competition", competition["name"])] += 1
+        _UNSAVED[("club", club["name"])] += 1
+
+
+def mark_saved(competition: dict, club: dict):
+    """Record that a booking marked by mark_unsaved was saved"""
+    with _UNSAVED_LOCK:
+        for key in (("competition", competition["name"]),
+                    ("club", club["name"])):
+            _UNSAVED[key] -= 1
+            if _UNSAVED[key] <= 0:
+                del _UNSAVED[key]
+
+
+@contextmanager
+def batch_lock(bookings: list):
+    """
+    Hold the locks of all the competitions and clubs of a list of
+    (competition, club, places_required) bookings.
+    Like booking_lock, the competition locks are taken before the club
+    locks, each kind in name order, so batches and single bookings can
+    never wait for each other's lock.
+    """
+    competitions = sorted({comp["name"] for comp, _, _ in bookings})
+    clubs = sorted({club["name"] for _, club, _ in bookings})
+    with ExitStack() as stack:
+        for name in competitions:
+            stack.enter_context(get_lock("competition", name))
+        for name in clubs:
+            stack.enter_context(get_lock("club", name))
+        yield
+
+
+########################################################
+# GROUP COMMIT
+########################################################
+
+
+class _Batch:
+    """Saves waiting for the same flush"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class GroupCommitter:
+    """
+    Batches the saves requested within `window` seconds into a single
+    call to `flush`.
+    The first caller of a batch waits for the window to pass then
+    flushes; `commit` only returns once the flush of its batch is done.
+    """
+
+    def __init__(self, flush, window: float):
+        self.flush = flush
+        self.window = window
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = None
+
+    def commit(self):
+        """
+        Wait until the state at the time of the call is on disk.
+        Raises the error of the flush if it failed.
+        """
+        with self._lock:
+            batch = self._pending
+            is_leader = batch is None
+            if is_leader:
+                batch = self._pending = _Batch()
+
+        if is_leader:
+            time.sleep(self.window)
+            with self._lock:
+                self._pending = None
+            with self._flush_lock:
+                try:
+                    self.flush()
+                except Exception as e:
+                    batch.error = e
+            batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+
+
+def get_group_committer(app_instance: Flask) -> GroupCommitter:
+    """Return the group committer saving the data files of the app"""
+    committer = app_instance.extensions.get("group_committer")
+    if committer is None:
+        committer = app_instance.extensions.setdefault(
+            "group_committer",
+            GroupCommitter(
+                lambda: save_current_data(app_instance),
+                app_instance.config["GROUP_COMMIT_WINDOW"],
+            ),
+        )
+    return committer
+
+
+########################################################
+# ASYNC WRITES
+########################################################
+
+
+class AsyncWriter:
+    """
+    Saves the bookings from a writer thread, so the request threads do
+    not wait for the disk.
+    The bookings queued while a save is running are saved together by
+    the next one. When `queue_size` saves are waiting, `submit` blocks
+    until the writer catches up.
+    """
+
+    def __init__(self, write, queue_size: int, logger=None):
+        self.write = write
+        self.logger = logger
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        # (bookings, saved) of a failed save, saved again by the next one
+        self._failed = []
+        self._thread = threading.Thread(
+            target=self._run, name="async-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, bookings: list, wait: bool = False, saved=None):
+        """
+        Queue a list of (competition, club, places_required) bookings
+        to save, calling `saved` (if given) once they are written. With
+        `wait`, return once they are saved, raising the error of the
+        save if it failed.
+        Once the writer is closed, the bookings are saved right away.
+        """
+        batch = _Batch() if wait else None
+        with self._lock:
+            if self._closed:
+                self.write(bookings)
+                if saved is not None:
+                    saved()
+                return
+            with timed("enqueue"):
+                self._queue.put((bookings, batch, saved))
+        if batch is not None:
+            batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+
+    def flush(self):
+        """Return once every booking submitted so far is saved"""
+        self.submit([], wait=True)
+
+    def close(self):
+        """Save the queued bookings, then stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._save([item for item in items if item is not None])
+            if None in items:
+                return
+
+    def _save(self, items: list):
+        pending = self._failed + [
+            (bookings, saved) for bookings, _, saved in items
+        ]
+        bookings = [booking for bookings, _ in pending for booking in bookings]
+        error = None
+        if bookings:
+            try:
+                self.write(bookings)
+                self._failed = []
+            except Exception as e:
+                error = e
+                self._failed = pending
+                if self.logger is not None:
+                    self.logger.warning("Could not save the bookings: %s", e)
+        if error is None:
+            for _, saved in pending:
+                if saved is not None:
+                    saved()
+        for _, batch, _ in items:
+            if batch is not None:
+                batch.error = error
+                batch.done.set()
+
+
+def get_async_writer(app_instance: Flask) -> AsyncWriter:
+    """
+    Return the writer saving the bookings of the app, saving what it
+    still holds when the process exits.
+    """
+    if isinstance(app_instance, LocalProxy):
+        # The writer thread is outside of the request: it needs the app
+        # itself, not current_app
+        app_instance = app_instance._get_current_object()
+    writer = app_instance.extensions.get("async_writer")
+    if writer is None:
+        with _PERSIST_LOCK:
+            writer = app_instance.extensions.get("async_writer")
+            if writer is None:
+                writer = app_instance.extensions["async_writer"] = AsyncWriter(
+                    lambda bookings: write_app_bookings(
+                        app_instance, bookings
+                    ),
+                    app_instance.config["ASYNC_QUEUE_SIZE"],
+                    app_instance.logger,
+                )
+                atexit.register(writer.close)
+    return writer
+
+
+def write_app_bookings(app_instance: Flask, bookings: list):
+    """Write a list of bookings from a thread outside of the app context"""
+    with app_instance.app_context():
+        write_bookings(app_instance, bookings)
+
+
+def flush_async_writes():
+    """Save the bookings the writer of the current app still holds"""
+    if has_app_context():
+        writer = current_app.extensions.get("async_writer")
+        if writer is not None:
+            writer.flush()
+
 
 def update_clubs_and_competitions(club: dict, competition: dict):
-    """Update clubs and competitions lists after booking"""
+    """
+    Update clubs and competitions lists after booking.
+    A booked record is changed in place, so the lists are only rebuilt,
+    in O(n), for a record they do not hold yet.
+    """
     global CLUBS, COMPETITIONS
-    clubs = [c for c in CLUBS if c["name"] != club["name"]]
-    clubs.append(club)
-    CLUBS = clubs
-    competitions = [comp for comp in COMPETITIONS if \
-        comp["name"] != competition["name"]]
-    competitions.append(competition)
-    COMPETITIONS = competitions
+    with _LISTS_LOCK:
+        if get_obj_by_field("name", club["name"], CLUBS) is not club:
+            clubs = [c for c in CLUBS if c["name"] != club["name"]]
+            clubs.append(club)
+            update_index("clubs", CLUBS, clubs, club)
+            CLUBS = clubs
+        if get_obj_by_field(
+            "name", competition["name"], COMPETITIONS
+        ) is not competition:
+            competitions = [comp for comp in COMPETITIONS if \
+                comp["name"] != competition["name"]]
+            competitions.append(competition)
+            replaced = update_index(
+                "competitions", COMPETITIONS, competitions, competition
+            )
+            update_calendar(COMPETITIONS, competitions, replaced, competition)
+            COMPETITIONS = competitions
+
+
+@contextmanager
+def own_write():
+    """
+    Serialize a write of the storage files, and mark it as this
+    process's own so the data is not reloaded because of it.
+    """
+    storage = get_storage()
+    with _PERSIST_LOCK:
+        before = storage.stamp()
+        yield
+        # Only this write was missed if the data was current
+        if before == storage.loaded_stamp:
+            storage.loaded_stamp = storage.stamp()
 
 
 def save_clubs_and_competitions(
     app_instance: Flask, clubs: list, competitions: list
 ):
     """Save clubs and competitions to their respective files"""
-    save_json(app_instance.config["JSON_CLUBS"], clubs, "clubs")
-    save_json(
-        app_instance.config["JSON_COMPETITIONS"], competitions, "competitions"
+    with own_write():
+        save_json(app_instance.config["JSON_CLUBS"], clubs, "clubs")
+        save_json(
+            app_instance.config["JSON_COMPETITIONS"],
+            competitions,
+            "competitions"
+        )
+
+
+def refresh_before_save(app_instance: Flask):
+    """
+    Swap in the changes made to the files since they were loaded (e.g.
+    by staff), so rewriting them from memory does not undo the changes.
+    """
+    if CLUBS is None or not get_storage().changed():
+        return
+    try:
+        refresh_data()
+    except LOAD_ERRORS as e:
+        app_instance.logger.warning("Could not reload the data: %s", e)
+
+
+def save_current_data(app_instance: Flask):
+    """Save the current clubs and competitions, with the files' changes"""
+    refresh_before_save(app_instance)
+    save_clubs_and_competitions(app_instance, CLUBS, COMPETITIONS)
+
+
+def iter_rows(list_of_dicts: list):
+    """
+    Yield the clubs or competitions of a list one by one, for pages
+    streamed row by row.
+    Bookings change the records in place and reloads replace the lists,
+    so the list can safely be read while the page is sent.
+    """
+    yield from list_of_dicts
+
+
+@timed("lookup")
+def get_obj_by_field(key: str, value: str, list_of_dicts: list) -> dict | None:
+    """
+    Return the first object of `list_of_dicts` whose `key` field equals
+    `value`, or None if there is none.
+    Indexed lists are looked up in constant time.
+    """
+    index = get_index(key, list_of_dicts)
+    if index is not None:
+        return index.get(value)
+    return next((item for item in list_of_dicts if item[key] == value), None)
+
+
+########################################################
+# BOOKING JOURNAL
+########################################################
+
+# Number of bookings appended to the journal since the last compaction
+_journal_records = 0
+
+
+def append_to_journal(
+    file_path: str, competition: dict, club: dict, places_required: int
+):
+    """
+    Append one compact booking record to the journal file.
+    The record holds the resulting places and points, so replaying it
+    more than once gives the same state.
+    """
+    append_bookings_to_journal(
+        file_path, [(competition, club, places_required)]
     )
 
 
-def get_obj_by_field(key: str, value: str, list_of_dicts: list) -> dict:
-    return [item for item in list_of_dicts if item[key] == value][0]
+@timed("save")
+def append_bookings_to_journal(file_path: str, bookings: list):
+    """
+    Append the records of a list of (competition, club, places_required)
+    bookings to the journal file, with a single write and fsync.
+    """
+    global _journal_records
+    with own_write():
+        # The values are read once the writes are serialized, so a
+        # record never holds older values than the one before it
+        lines = "".join(
+            json.dumps({
+                "competition": competition["name"],
+                "club": club["name"],
+                "places": places_required,
+                "number_of_places": competition["number_of_places"],
+                "points": club["points"],
+            }, separators=(",", ":")) + "\n"
+            for competition, club, places_required in bookings
+        )
+        repair_journal(file_path)
+        with open(file_path, "a") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        _journal_records += len(bookings)
+
+
+def repair_journal(file_path: str):
+    """
+    Cut off a record left partly written by a crash at the end of the
+    journal, so the next record does not end up on the same line.
+    Appends are serialized, so only a crashed one can be partly written.
+    """
+    try:
+        f = open(file_path, "rb+")
+    except FileNotFoundError:
+        return
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        f.seek(0)
+        f.truncate(f.read().rfind(b"\n") + 1)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def replay_journal(file_path: str, clubs: list, competitions: list) -> int:
+    """
+    Apply the bookings of the journal file to the clubs and competitions
+    loaded from the last snapshots.
+    A truncated last record (crash mid-append) is ignored, and cut off
+    by the next append. Any other unreadable record raises ValueError.
+    Returns the number of records applied.
+    """
+    if not os.path.exists(file_path):
+        return 0
+    clubs_by_name = {club["name"]: club for club in clubs}
+    competitions_by_name = {comp["name"]: comp for comp in competitions}
+    applied = 0
+    with open(file_path) as f:
+        lines = f.readlines()
+    for number, line in enumerate(lines, 1):
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            if number < len(lines):
+                raise ValueError(
+                    f"Corrupt booking journal {file_path}: line {number}"
+                )
+            break
+        competition = competitions_by_name.get(record["competition"])
+        club = clubs_by_name.get(record["club"])
+        if competition is not None:
+            competition["number_of_places"] = record["number_of_places"]
+        if club is not None:
+            club["points"] = record["points"]
+        applied += 1
+    return applied
+
+
+def read_journal_tail(file_path: str, start: int, end: int) -> list | None:
+    """
+    Return the booking records appended to the journal file between the
+    offsets `start` and `end`, or None if they are not whole records
+    (e.g. a truncated record was cut off since).
+    """
+    with open(file_path, "rb") as f:
+        # The record before `start` must have ended there
+        f.seek(max(start - 1, 0))
+        data = f.read(end - f.tell())
+    if start:
+        if data[:1] != b"\n":
+            return None
+        data = data[1:]
+    if not data.endswith(b"\n"):
+        return None
+    try:
+        return [json.loads(line) for line in data.splitlines()]
+    except json.JSONDecodeError:
+        return None
+
+
+def compact_journal(app_instance: Flask, clubs: list, competitions: list):
+    """
+    Fold the journal into fresh snapshots of both JSON files,
+    then empty it.
+    """
+    global _journal_records
+    with own_write():
+        save_clubs_and_competitions(app_instance, clubs, competitions)
+        open(app_instance.config["JSON_JOURNAL"], "w").close()
+        _journal_records = 0
+
+
+def persist_booking(
+    app_instance: Flask, competition: dict, club: dict, places_required: int
+):
+    """Save a booking according to the configured persistence mode"""
+    persist_bookings(app_instance, [(competition, club, places_required)])
+
+
+def persist_bookings(app_instance: Flask, bookings: list, saved=None):
+    """
+    Save a list of (competition, club, places_required) bookings with
+    a single write, according to the configured persistence mode, then
+    call `saved` (if given), even if the write failed.
+    With ASYNC_WRITES, the write is left to the writer thread: the
+    bookings are saved once in memory ("memory" durability) or once on
+    disk ("disk"), and `saved` is only called once they are written.
+    """
+    if app_instance.config.get("ASYNC_WRITES") and \
+            not app_instance.config.get("SHARED_STATE"):
+        # Other workers must see a booking on disk before booking
+        get_async_writer(app_instance).submit(
+            bookings,
+            wait=app_instance.config.get("ASYNC_DURABILITY") == "disk",
+            saved=saved,
+        )
+        return
+    try:
+        write_bookings(app_instance, bookings)
+    finally:
+        if saved is not None:
+            saved()
+
+
+def write_bookings(app_instance: Flask, bookings: list):
+    """Write a list of bookings to the files of the persistence mode"""
+    if app_instance.config.get("PERSISTENCE_MODE") == "journal":
+        append_bookings_to_journal(
+            app_instance.config["JSON_JOURNAL"], bookings
+        )
+        if _journal_records >= app_instance.config["JOURNAL_COMPACT_EVERY"]:
+            refresh_before_save(app_instance)
+            compact_journal(app_instance, CLUBS, COMPETITIONS)
+    elif app_instance.config.get("GROUP_COMMIT_WINDOW") and \
+            not app_instance.config.get("SHARED_STATE"):
+        # Bookings are serialized across workers in SHARED_STATE mode,
+        # so there would never be a second booking to group
+        get_group_committer(app_instance).commit()
+    else:
+        save_current_data(app_instance)
+
+
+########################################################
+# STORAGE BACKENDS
+########################################################
+
+
+# Error of the valid bookings of a refused all-or-nothing batch
+BATCH_CANCELLED = "Not booked: another booking of the batch was refused"
+
+# Error of a batch item booking no place, or a negative number of them
+NO_PLACE_BOOKED = "You must book at least one place"
+
+
+class Storage:
+    """Where the clubs and competitions are loaded from and saved to"""
+
+    # Stamp of the storage when the data was last loaded or written here
+    loaded_stamp = None
+
+    def load(self) -> tuple[list, list]:
+        """Return the lists of Club and Competition records"""
+        self.loaded_stamp, clubs, competitions = self.read()
+        return clubs, competitions
+
+    def read(self, since=None) -> tuple:
+        """
+        Return the current stamp of the storage, with the lists of Club
+        and Competition records which may have changed since the stamp
+        `since` (None for a list which did not, both lists if `since` is
+        None).
+        """
+        raise NotImplementedError
+
+    def read_appended(self, since) -> tuple | None:
+        """
+        Return the current stamp of the storage, with the points of the
+        clubs and the places of the competitions booked since the stamp
+        `since` (dicts by name), if the storage can tell them without
+        being read whole; else None, and `read` must be used.
+        """
+        return None
+
+    def stamp(self):
+        """
+        Return a cheap value which changes whenever the storage is
+        written, by this process or another.
+        """
+        raise NotImplementedError
+
+    def changed(self) -> bool:
+        """Check if another process wrote the storage since it was loaded"""
+        return self.stamp() != self.loaded_stamp
+
+    def exclusive(self):
+        """
+        Return a context manager keeping the other worker processes
+        from booking until it exits.
+        """
+        return nullcontext()
+
+    def book(
+        self,
+        app_instance: Flask,
+        competition: dict,
+        club: dict,
+        places_required: int
+    ) -> str | None:
+        """
+        Take an already validated booking out of the competition places
+        and the club points, in memory and in the storage.
+        Returns an error message if the storage refused the booking.
+        """
+        return self.book_many(
+            app_instance, [(competition, club, places_required)]
+        )[0]
+
+    def book_many(
+        self, app_instance: Flask, bookings: list, atomic: bool = True
+    ) -> list:
+        """
+        Take a list of already validated (competition, club,
+        places_required) bookings in memory and in the storage, saved
+        with a single write.
+        With `atomic`, no booking is kept if the storage refused one.
+        Returns the error message of each booking, None for those made.
+        """
+        raise NotImplementedError
+
+    def save(self, app_instance: Flask, bookings: list):
+        """
+        Save the bookings made by book_many, once the locks of their
+        competitions and clubs are released (nothing to do for storages
+        saving in book_many).
+        """
+
+    def replace(self, clubs: list, competitions: list):
+        """
+        Replace all the stored data by the lists of Club and
+        Competition records.
+        """
+        raise NotImplementedError
+
+
+class JsonStorage(Storage):
+    """
+    Storage in the clubs and competitions JSON files, plus the booking
+    journal in journal mode.
+    In snapshot mode, a journal left over by a run in journal mode is
+    refused rather than replayed: its bookings would not be saved again.
+    """
+
+    def __init__(
+        self,
+        clubs_file: str,
+        competitions_file: str,
+        journal_file: str,
+        persistence_mode: str = "journal",
+    ):
+        self.clubs_file = clubs_file
+        self.competitions_file = competitions_file
+        self.journal_file = journal_file
+        self.persistence_mode = persistence_mode
+        self.lock_file = clubs_file + ".lock"
+        self._lock = threading.Lock()
+        # Depth of the exclusive sections entered by each thread
+        self._held = threading.local()
+
+    def read(self, since=None):
+        global _journal_records
+        stamp = self.stamp()
+        clubs_stamp, competitions_stamp, journal_stamp = since or (None,) * 3
+        # The journal holds both places and points
+        journal_changed = since is None or stamp[2] != journal_stamp
+        clubs = competitions = None
+        if journal_changed or stamp[0] != clubs_stamp:
+            clubs = [
+                Club.from_dict(club)
+                for club in load_data(self.clubs_file, "clubs")
+            ]
+        if journal_changed or stamp[1] != competitions_stamp:
+            competitions = [
+                Competition.from_dict(competition)
+                for competition in load_data(
+                    self.competitions_file, "competitions"
+                )
+            ]
+        if self.persistence_mode == "journal":
+            _journal_records = replay_journal(
+                self.journal_file, clubs or [], competitions or []
+            )
+        elif stamp[2] is not None and stamp[2][2]:
+            raise RuntimeError(
+                f"Booking journal {self.journal_file} left over: start with "
+                "PERSISTENCE_MODE=journal to apply it to the data"
+            )
+        return stamp, clubs, competitions
+
+    def read_appended(self, since):
+        global _journal_records
+        if since is None or self.persistence_mode != "journal":
+            return None
+        stamp = self.stamp()
+        before, after = since[2], stamp[2]
+        # Only bookings were appended: the snapshots were not replaced,
+        # nor the journal compacted
+        if stamp[:2] != since[:2] or before is None or after is None \
+                or after[0] != before[0] or after[2] <= before[2]:
+            return None
+        records = read_journal_tail(self.journal_file, before[2], after[2])
+        if records is None:
+            return None
+        _journal_records += len(records)
+        return (
+            stamp,
+            {record["club"]: record["points"] for record in records},
+            {
+                record["competition"]: record["number_of_places"]
+                for record in records
+            },
+        )
+
+    def stamp(self):
+        # The files are replaced on each save, the journal is appended to
+        return tuple(
+            file_stamp(path) for path in (
+                self.clubs_file, self.competitions_file, self.journal_file
+            )
+        )
+
+    @contextmanager
+    def exclusive(self):
+        """
+        Hold an exclusive lock on the lock file, shared by all the worker
+        processes, so a booking is validated and saved on the latest data.
+        The writes made while it is held are this process's own.
+        A thread already holding it enters it again without waiting.
+        """
+        if getattr(self._held, "depth", 0):
+            self._held.depth += 1
+            try:
+                yield
+            finally:
+                self._held.depth -= 1
+            return
+        with ExitStack() as stack:
+            if fcntl is None:
+                stack.enter_context(self._lock)
+            else:
+                f = stack.enter_context(open(self.lock_file, "a"))
+                fcntl.flock(f, fcntl.LOCK_EX)
+            self._held.depth = 1
+            try:
+                yield
+            finally:
+                self._held.depth = 0
+            self.loaded_stamp = self.stamp()
+
+    def book_many(self, app_instance, bookings, atomic=True):
+        # The bookings were validated under their locks, so the files
+        # can only accept them: they are saved by `save`.
+        for competition, club, places_required in bookings:
+            mark_unsaved(competition, club)
+            competition["number_of_places"] = (
+                int(competition["number_of_places"]) - places_required
+            )
+            club["points"] = int(club["points"]) - places_required
+            update_clubs_and_competitions(club, competition)
+        return [None] * len(bookings)
+
+    def save(self, app_instance, bookings):
+        # Reloads keep the booked records until they are written, which
+        # the writer thread may only do later
+        def saved():
+            for competition, club, _ in bookings:
+                mark_saved(competition, club)
+
+        persist_bookings(app_instance, bookings, saved)
+
+    def replace(self, clubs, competitions):
+        global _journal_records
+        with self.exclusive():
+            save_json(self.clubs_file, clubs, "clubs")
+            save_json(self.competitions_file, competitions, "competitions")
+            # Its bookings were made on the replaced data
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            _journal_records = 0
+
+
+class SqliteStorage(Storage):
+    """
+    Storage in an SQLite database in WAL mode, which several worker
+    processes can share.
+    Places and points are decremented in one transaction that refuses
+    to take either below zero, whatever the other workers booked.
+    An empty database is first filled from the JSON files.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS clubs (
+            name TEXT PRIMARY KEY,
+            email TEXT NOT NULL,
+            points INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS clubs_email ON clubs (email);
+        CREATE TABLE IF NOT EXISTS competitions (
+            name TEXT PRIMARY KEY,
+            date TEXT NOT NULL,
+            number_of_places INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS meta (generation INTEGER NOT NULL);
+        INSERT INTO meta SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM meta);
+    """
+
+    def __init__(
+        self, database: str, clubs_file: str, competitions_file: str
+    ):
+        self.database = database
+        self.clubs_file = clubs_file
+        self.competitions_file = competitions_file
+        self._local = threading.local()
+
+    def connect(self) -> sqlite3.Connection:
+        """Return the connection of the current thread"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.database, timeout=30, isolation_level=None
+            )
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(self.SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def import_data(self, clubs: list, competitions: list):
+        """Insert clubs and competitions missing from the database"""
+        connection = self.connect()
+        with _transaction(connection):
+            self._insert(connection, clubs, competitions)
+
+    @staticmethod
+    def _insert(connection, clubs: list, competitions: list):
+        """Insert the clubs and competitions (in their JSON form)"""
+        connection.executemany(
+            "INSERT OR IGNORE INTO clubs (name, email, points) "
+            "VALUES (:name, :email, :points)",
+            clubs,
+        )
+        connection.executemany(
+            "INSERT OR IGNORE INTO competitions "
+            "(name, date, number_of_places) "
+            "VALUES (:name, :date, :number_of_places)",
+            competitions,
+        )
+
+    def replace(self, clubs, competitions):
+        connection = self.connect()
+        with _transaction(connection):
+            connection.execute("DELETE FROM clubs")
+            connection.execute("DELETE FROM competitions")
+            self._insert(
+                connection,
+                [club.to_dict() for club in clubs],
+                [competition.to_dict() for competition in competitions],
+            )
+            # Let the other workers reload the data
+            connection.execute("UPDATE meta SET generation = generation + 1")
+
+    def load(self) -> tuple[list, list]:
+        connection = self.connect()
+        if connection.execute("SELECT 1 FROM clubs LIMIT 1").fetchone() is None:
+            self.import_data(
+                load_data(self.clubs_file, "clubs"),
+                load_data(self.competitions_file, "competitions"),
+            )
+        return super().load()
+
+    def read(self, since=None):
+        connection = self.connect()
+        stamp = self.stamp()
+        clubs = [
+            Club.from_dict(row) for row in connection.execute(
+                "SELECT name, email, points FROM clubs ORDER BY rowid"
+            )
+        ]
+        competitions = [
+            Competition.from_dict(row) for row in connection.execute(
+                "SELECT name, date, number_of_places FROM competitions "
+                "ORDER BY rowid"
+            )
+        ]
+        return stamp, clubs, competitions
+
+    def stamp(self):
+        # Bumped by every booking transaction
+        return self.connect().execute(
+            "SELECT generation FROM meta"
+        ).fetchone()[0]
+
+    def book_many(self, app_instance, bookings, atomic=True):
+        connection = self.connect()
+        errors = []
+        with _transaction(connection) as rollback:
+            generation = connection.execute(
+                "SELECT generation FROM meta"
+            ).fetchone()[0]
+            for competition, club, places_required in bookings:
+                # Each booking is undone alone if the storage refuses it
+                connection.execute("SAVEPOINT booking")
+                error = self._take(
+                    connection, competition, club, places_required
+                )
+                if error:
+                    connection.execute("ROLLBACK TO booking")
+                connection.execute("RELEASE booking")
+                errors.append(error)
+            if atomic and any(errors):
+                rollback()
+                errors = [error or BATCH_CANCELLED for error in errors]
+            elif None in errors:
+                connection.execute(
+                    "UPDATE meta SET generation = generation + 1"
+                )
+                # Only this booking was missed if the data was current
+                if generation == self.loaded_stamp:
+                    self.loaded_stamp = generation + 1
+
+        # Refresh the in-memory values, which other workers may have changed
+        for competition, club, _ in bookings:
+            competition["number_of_places"] = connection.execute(
+                "SELECT number_of_places FROM competitions WHERE name = ?",
+                (competition["name"],),
+            ).fetchone()[0]
+            club["points"] = connection.execute(
+                "SELECT points FROM clubs WHERE name = ?", (club["name"],)
+            ).fetchone()[0]
+        return errors
+
+    @staticmethod
+    def _take(connection, competition, club, places_required) -> str | None:
+        """
+        Take the places and points of one booking, unless either would
+        go below zero. Returns the error message of a refused booking.
+        """
+        places_taken = connection.execute(
+            "UPDATE competitions "
+            "SET number_of_places = number_of_places - ? "
+            "WHERE name = ? AND number_of_places >= ?",
+            (places_required, competition["name"], places_required),
+        ).rowcount
+        if not places_taken:
+            return "Not enough places available"
+        points_spent = connection.execute(
+            "UPDATE clubs SET points = points - ? "
+            "WHERE name = ? AND points >= ?",
+            (places_required, club["name"], places_required),
+        ).rowcount
+        if not points_spent:
+            return "The club does not have enough points"
+        return None
+
+
+@contextmanager
+def _transaction(connection: sqlite3.Connection):
+    """
+    Run a block in a write transaction, committed at the end of the
+    block unless the rollback function it receives was called.
+    """
+    rolled_back = False
+
+    def rollback():
+        nonlocal rolled_back
+        connection.execute("ROLLBACK")
+        rolled_back = True
+
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield rollback
+    except BaseException:
+        if not rolled_back:
+            connection.execute("ROLLBACK")
+        raise
+    if not rolled_back:
+        connection.execute("COMMIT")
+
+
+def create_storage(settings) -> Storage:
+    """
+    Create the storage backend selected by the configuration `settings`
+    (an app config or any mapping of the Config attributes)
+    """
+    if settings["STORAGE_BACKEND"] == "json":
+        return JsonStorage(
+            settings["JSON_CLUBS"],
+            settings["JSON_COMPETITIONS"],
+            settings["JSON_JOURNAL"],
+            settings.get("PERSISTENCE_MODE", "snapshot"),
+        )
+    if settings["STORAGE_BACKEND"] == "sqlite":
+        return SqliteStorage(
+            settings["SQLITE_DATABASE"],
+            settings["JSON_CLUBS"],
+            settings["JSON_COMPETITIONS"],
+        )
+    raise ValueError(
+        f"Unknown storage backend: {settings['STORAGE_BACKEND']}"
+    )
+
+
+########################################################
+# DATA LOADING
+########################################################
+
+# The storage is set up by init_data, and the data only loaded on first
+# use, so importing this module reads nothing
+STORAGE = None
+CLUBS = None
+COMPETITIONS = None
+
+
+def init_data(app_instance: Flask):
+    """
+    Use the storage configured for the app (paths, backend...).
+    Nothing is read until the data is first used.
+    """
+    global STORAGE, CLUBS, COMPETITIONS
+    with _RELOAD_LOCK:
+        STORAGE = create_storage(app_instance.config)
+        CLUBS = COMPETITIONS = None
+
+
+def get_storage() -> Storage:
+    """
+    Return the storage, set up from the default configuration if no
+    app did.
+    """
+    global STORAGE
+    if STORAGE is None:
+        with _RELOAD_LOCK:
+            if STORAGE is None:
+                STORAGE = create_storage(vars(config["default"]))
+    return STORAGE
+
+
+def ensure_data_loaded():
+    """Load the clubs and competitions not loaded yet"""
+    global CLUBS, COMPETITIONS
+    with _RELOAD_LOCK:
+        if CLUBS is not None and COMPETITIONS is not None:
+            return
+        clubs, competitions = get_storage().load()
+        with _LISTS_LOCK:
+            if CLUBS is None:
+                CLUBS = clubs
+            if COMPETITIONS is None:
+                COMPETITIONS = competitions
+            build_indexes()
+
+
+def reset_data(clubs: list, competitions: list):
+    """
+    Replace all the clubs and competitions, in the storage and in
+    memory, by the lists of Club and Competition records (used between
+    load test runs).
+    """
+    global CLUBS, COMPETITIONS
+    storage = get_storage()
+    # The queued bookings were made on the replaced data
+    flush_async_writes()
+    # In the order of worker_lock: the storage first, then the reloads
+    with storage.exclusive(), _RELOAD_LOCK, _PERSIST_LOCK:
+        storage.replace(clubs, competitions)
+        storage.loaded_stamp = storage.stamp()
+        with _LISTS_LOCK:
+            CLUBS = clubs
+            COMPETITIONS = competitions
+            build_indexes()
+        # Records may keep their name with other values
+        bump_data_version(
+            tuple(("club", club["name"]) for club in clubs)
+            + tuple(
+                ("competition", competition["name"])
+                for competition in competitions
+            )
+        )
+
+
+########################################################
+# SHARED STATE & HOT RELOAD
+########################################################
+
+# Serializes the loads and reloads of the data
+_RELOAD_LOCK = threading.RLock()
+
+# Errors of a storage which does not load, e.g. a file caught mid-edit
+LOAD_ERRORS = (OSError, ValueError, KeyError, TypeError)
+
+
+def shares_state() -> bool:
+    """Check if the app runs with several worker processes (SHARED_STATE)"""
+    return has_app_context() and bool(current_app.config.get("SHARED_STATE"))
+
+
+def merge_records(kind: str, current: list, loaded: list, held: ExitStack):
+    """
+    Return the list of `loaded` records, keeping the `current` objects
+    of the records which did not change, and the list of
+    (old, new) changes, with None for an added or removed record.
+    A record being booked, or booked but not saved yet, keeps its
+    current version, as its booking will save it; the locks of the
+    others are held on `held`.
+    """
+    by_name = {record["name"]: record for record in current}
+    merged = []
+    changes = []
+
+    def try_lock(name: str) -> bool:
+        if (kind, name) in _UNSAVED:
+            return False
+        lock = get_lock(kind, name)
+        if not lock.acquire(blocking=False):
+            return False
+        held.callback(lock.release)
+        return True
+
+    for record in loaded:
+        old = by_name.pop(record["name"], None)
+        if old is None:
+            merged.append(record)
+            changes.append((None, record))
+        elif old is record or old == record or not try_lock(old["name"]):
+            merged.append(old)
+        else:
+            merged.append(record)
+            changes.append((old, record))
+    for old in by_name.values():
+        if try_lock(old["name"]):
+            changes.append((old, None))
+        else:
+            merged.append(old)
+    return merged, changes
+
+
+def with_values(records: list, field: str, values: dict) -> list | None:
+    """
+    Return the list of `records` with the `field` of those named in
+    `values` set to their value, on copies, or None if `values` is empty.
+    The other records are the same objects.
+    """
+    if not values:
+        return None
+    updated = []
+    for record in records:
+        value = values.get(record["name"], record[field])
+        if value != record[field]:
+            record = copy(record)
+            record[field] = value
+        updated.append(record)
+    return updated
+
+
+def refresh_data() -> bool:
+    """
+    Swap in the clubs and competitions changed in the storage by another
+    program (another worker, or staff editing the JSON files), record
+    by record: unchanged records are kept, and the indexes and calendar
+    are only updated for the changed ones.
+    When the storage can tell the bookings made since the last load (the
+    journal appended to by other workers), only those are read; else
+    the changed lists are read whole, e.g. both JSON files after each
+    booking in snapshot mode.
+    Returns True if any record changed.
+    """
+    global CLUBS, COMPETITIONS
+    storage = get_storage()
+    # Data not loaded yet will be loaded as it is
+    if CLUBS is None or COMPETITIONS is None or not storage.changed():
+        return False
+    with _RELOAD_LOCK:
+        if not storage.changed():
+            return False
+        appended = storage.read_appended(storage.loaded_stamp)
+        if appended is None:
+            stamp, clubs, competitions = storage.read(storage.loaded_stamp)
+        else:
+            stamp, points, places = appended
+            clubs = with_values(CLUBS, "points", points)
+            competitions = with_values(
+                COMPETITIONS, "number_of_places", places
+            )
+        # No booking can be saved until the changes are swapped in
+        with _PERSIST_LOCK, ExitStack() as held:
+            if storage.stamp() != stamp:
+                # Saved meanwhile: read again on the next call
+                return False
+            club_changes = competition_changes = []
+            if clubs is not None:
+                clubs, club_changes = merge_records(
+                    "club", CLUBS, clubs, held
+                )
+            if competitions is not None:
+                competitions, competition_changes = merge_records(
+                    "competition", COMPETITIONS, competitions, held
+                )
+            with _LISTS_LOCK:
+                if clubs is not None:
+                    apply_index_changes("clubs", CLUBS, clubs, club_changes)
+                    CLUBS = clubs
+                if competitions is not None:
+                    apply_index_changes(
+                        "competitions",
+                        COMPETITIONS,
+                        competitions,
+                        competition_changes
+                    )
+                    apply_calendar_changes(
+                        COMPETITIONS, competitions, competition_changes
+                    )
+                    COMPETITIONS = competitions
+            storage.loaded_stamp = stamp
+            changed = tuple(
+                (kind, (old or new)["name"])
+                for kind, changes in (
+                    ("club", club_changes),
+                    ("competition", competition_changes)
+                )
+                for old, new in changes
+            )
+            if changed:
+                bump_data_version(changed)
+    return bool(changed)
+
+
+class DataWatcher:
+    """
+    Thread polling the storage every `interval` seconds, to swap in the
+    records changed by another program without a restart.
+    Only the file stamps are read while nothing changes.
+    """
+
+    def __init__(self, app_instance: Flask, interval: float):
+        self.app = app_instance
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start polling in a daemon thread"""
+        self._thread = threading.Thread(
+            target=self._run, name="data-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def check(self) -> bool:
+        """
+        Swap in the changed records, if any.
+        A file still being edited may not load: the error is logged and
+        the file read again on the next check.
+        Returns True if any record changed.
+        """
+        writer = self.app.extensions.get("async_writer")
+        try:
+            if writer is not None and get_storage().changed():
+                # The queued bookings are saved before the files are read
+                writer.flush()
+            return refresh_data()
+        except LOAD_ERRORS as e:
+            self.app.logger.warning("Could not reload the data: %s", e)
+            return False
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+
+def refresh_shared_data():
+    """
+    In SHARED_STATE mode, swap in the changes of the other workers.
+    The current data is kept if the storage does not load.
+    """
+    if not shares_state():
+        return
+    try:
+        refresh_data()
+    except LOAD_ERRORS as e:
+        current_app.logger.warning("Could not reload the data: %s", e)
+
+
+def get_clubs() -> list:
+    """
+    Return the current clubs list, to be read at each use: reloads
+    replace it, and in SHARED_STATE mode so do the other workers'.
+    """
+    if CLUBS is None:
+        ensure_data_loaded()
+    refresh_shared_data()
+    return CLUBS
+
+
+def get_competitions() -> list:
+    """Return the current competitions list (see get_clubs)"""
+    if COMPETITIONS is None:
+        ensure_data_loaded()
+    refresh_shared_data()
+    return COMPETITIONS
+
+
+@contextmanager
+def worker_lock():
+    """
+    In SHARED_STATE mode, keep the other worker processes from booking
+    and reload the data they changed, so the booking is validated and
+    saved on the latest data.
+    Yields True in that mode, as the data may have been reloaded since
+    the clubs and competitions being booked were looked up.
+    """
+    if not shares_state():
+        yield False
+        return
+    with get_storage().exclusive():
+        refresh_shared_data()
+        yield True
+
+
+def current_records(competition: dict, club: dict) -> tuple:
+    """Return the competition and club of the same names in the lists"""
+    if CLUBS is None or COMPETITIONS is None:
+        ensure_data_loaded()
+    return (
+        get_obj_by_field("name", competition["name"], COMPETITIONS),
+        get_obj_by_field("name", club["name"], CLUBS),
+    )
 
 
 def update_data_after_booking(
@@ -60,21 +1906,144 @@ def update_data_after_booking(
     after a booking.
     Returns an error message if the booking is not possible.
     """
-    # First, validate the booking
-    reservation_error = validate_places_required(
-        places_required, club, competition
-    )
-    date_error = validate_competition_date(competition)
-    if reservation_error or date_error:
-        return reservation_error or date_error
+    return book_places(competition, club, places_required)[0]
 
-    # If the booking is possible, update the data
-    competition["number_of_places"] = (
-        int(competition["number_of_places"]) - places_required
-    )
-    club["points"] = int(club["points"]) - places_required
 
-    # Update the in-memory data and save it to the files.
-    update_clubs_and_competitions(club, competition)
-    save_clubs_and_competitions(current_app, CLUBS, COMPETITIONS)
-    return None
+def book_places(
+    competition: dict, club: dict, places_required: int
+) -> tuple[str | None, dict | None, dict | None]:
+    """
+    Book places of a competition for a club, in memory and in the
+    storage.
+    The booking holds the locks of its competition and club, so
+    concurrent bookings cannot oversell them, while bookings of other
+    competitions proceed in parallel.
+    Returns an error message if the booking is not possible, with the
+    competition and club booked: those of the same names in the data
+    when the locks were taken (None if removed), as a reload may have
+    replaced the ones given.
+    """
+    with worker_lock():
+        storage = get_storage()
+        with booking_lock(competition, club):
+            competition, club = current_records(competition, club)
+            if competition is None or club is None:
+                return "Invalid competition or club", competition, club
+
+            # First, validate the booking
+            with timed("validate"):
+                reservation_error = validate_places_required(
+                    places_required, club, competition
+                )
+                date_error = validate_competition_date(competition)
+            if reservation_error or date_error:
+                count_booking(reservation_error or date_error)
+                return reservation_error or date_error, competition, club
+
+            # If the booking is possible, update the data
+            error = storage.book(
+                current_app, competition, club, places_required
+            )
+            # Even a refused booking may have refreshed stale values
+            bump_data_version(
+                (("competition", competition["name"]), ("club", club["name"]))
+            )
+
+        # Saved once the locks are released, so the bookings of a
+        # competition do not wait for each other's writes
+        if error is None:
+            storage.save(current_app, [(competition, club, places_required)])
+        count_booking(error)
+        return error, competition, club
+
+
+def update_data_after_bookings(bookings: list, atomic: bool = True) -> list:
+    """
+    Book a list of (competition, club, places_required) at once.
+    Returns the error message of each booking, None for those made.
+    """
+    return book_batch(bookings, atomic)[0]
+
+
+def book_batch(bookings: list, atomic: bool = True) -> tuple[list, list]:
+    """
+    Book a list of (competition, club, places_required) at once.
+    Each booking is validated against the places and points left by the
+    bookings before it, then all the valid ones are saved with a single
+    write.
+    With `atomic`, nothing is booked unless every booking is valid.
+    Returns the error message of each booking, None for those made,
+    and the (competition, club, places_required) of each booking with
+    the records of the data when the locks were taken (see book_places).
+    """
+    with worker_lock():
+        errors, bookings = _book_batch(bookings, atomic)
+        made = [
+            booking for booking, error in zip(bookings, errors)
+            if error is None
+        ]
+        if made:
+            get_storage().save(current_app, made)
+    for error in errors:
+        count_booking(error)
+    return errors, bookings
+
+
+def _book_batch(bookings: list, atomic: bool) -> tuple[list, list]:
+    """
+    Validate and make the bookings of book_batch, under their locks.
+    Returns the error message of each booking, and the bookings with
+    their current records.
+    """
+    with batch_lock(bookings):
+        # The records may have been reloaded since they were looked up,
+        # and those removed meanwhile are None
+        bookings = [
+            (*current_records(competition, club), places_required)
+            for competition, club, places_required in bookings
+        ]
+        places_left = {}
+        points_left = {}
+        errors = []
+        with timed("validate"):
+            for competition, club, places_required in bookings:
+                if competition is None or club is None:
+                    errors.append("Invalid competition or club")
+                    continue
+                if places_required <= 0:
+                    errors.append(NO_PLACE_BOOKED)
+                    continue
+                places = places_left.get(
+                    competition["name"], competition["number_of_places"]
+                )
+                points = points_left.get(club["name"], club["points"])
+                error = validate_places_required(
+                    places_required,
+                    {"points": points},
+                    {"number_of_places": places},
+                ) or validate_competition_date(competition)
+                if error is None:
+                    places_left[competition["name"]] = (
+                        int(places) - places_required
+                    )
+                    points_left[club["name"]] = int(points) - places_required
+                errors.append(error)
+
+        if atomic and any(errors):
+            return [error or BATCH_CANCELLED for error in errors], bookings
+        valid = [
+            booking for booking, error in zip(bookings, errors)
+            if error is None
+        ]
+        if not valid:
+            return errors, bookings
+
+        storage_errors = get_storage().book_many(current_app, valid, atomic)
+        storage_errors = iter(storage_errors)
+        errors = [error or next(storage_errors) for error in errors]
+        bump_data_version(tuple(
+            (kind, obj["name"])
+            for competition, club, _ in valid
+            for kind, obj in (("competition", competition), ("club", club))
+        ))
+        return errors, bookings
@@ -0,0 +1,117 @@
+import random
+import re
+from datetime import datetime, timedelta
+
+from models import Club, Competition
+
+########################################################
+# SYNTHETIC DATASETS
+########################################################
+
+# Words the club and competition names are made of
+CLUB_WORDS = (
+    ("Iron", "Simply", "Power", "Steel", "Titan", "Barbell", "Northern",
+     "Urban", "Golden", "Atlas", "Summit", "Granite"),
+    ("Lift", "Temple", "Lifts", "Gym", "Strength", "Club", "Athletics",
+     "Collective", "Academy", "House", "Society", "Crew"),
+)
+COMPETITION_WORDS = (
+    ("Spring", "Summer", "Fall", "Winter", "National", "Regional", "Open",
+     "Masters", "City", "Coastal"),
+    ("Festival", "Classic", "Cup", "Championship", "Challenge", "Meet",
+     "Games", "Trophy", "Series", "Invitational"),
+)
+EMAIL_DOMAINS = ("gmail.com", "outlook.com", "club.fr", "lifting.org")
+
+# Share of the competitions already held, and of the full ones
+PAST_SHARE = 0.1
+FULL_SHARE = 0.05
+
+# Points of each club and places of each competition in load tests, so
+# the bookings do not run out during a run
+LOAD_TEST_CAPACITY = 1_000_000
+
+
+def slugify(text: str) -> str:
+    """Return `text` lowercased, with dots instead of other characters"""
+    return re.sub(r"[^a-z0-9]+", ".", text.lower()).strip(".")
+
+
+def generate_clubs(
+    count: int, rng: random.Random, capacity: int | None = None
+) -> list:
+    """
+    Generate `count` clubs with distinct names and emails.
+    Most clubs have a few points and some many more, like the real data
+    (a log-normal distribution with a median of 10 points), unless they
+    all have `capacity` points.
+    """
+    clubs = []
+    for i in range(count):
+        name = f"{rng.choice(CLUB_WORDS[0])} {rng.choice(CLUB_WORDS[1])} {i}"
+        points = min(int(rng.lognormvariate(2.3, 0.8)), 1000)
+        if capacity is not None:
+            points = capacity
+        clubs.append(Club(
+            name, f"{slugify(name)}@{rng.choice(EMAIL_DOMAINS)}", points
+        ))
+    return clubs
+
+
+def generate_competitions(
+    count: int, rng: random.Random, today: datetime,
+    capacity: int | None = None
+) -> list:
+    """
+    Generate `count` competitions with distinct names.
+    PAST_SHARE of them were held in the last year, the others are held
+    in the next two years, between 8:00 and 18:00; FULL_SHARE of them
+    have no places left, the others 5 to 100 (25 most often).
+    With `capacity`, they are all upcoming with `capacity` places.
+    """
+    competitions = []
+    for i in range(count):
+        name = (
+            f"{rng.choice(COMPETITION_WORDS[0])} "
+            f"{rng.choice(COMPETITION_WORDS[1])} {i}"
+        )
+        if rng.random() < PAST_SHARE and capacity is None:
+            days = rng.randint(-365, -1)
+        else:
+            days = rng.randint(1, 730)
+        date = today + timedelta(days=days, minutes=rng.randrange(16, 36) * 30)
+        if rng.random() < FULL_SHARE:
+            places = 0
+        else:
+            places = int(rng.triangular(5, 100, 25))
+        if capacity is not None:
+            places = capacity
+        competitions.append(Competition(name, date, places))
+    return competitions
+
+
+def generate_dataset(
+    clubs: int, competitions: int, seed: int = 0, today: datetime = None,
+    capacity: int | None = None
+) -> tuple[list, list]:
+    """
+    Return `clubs` Club and `competitions` Competition records, the
+    same for a given seed and day.
+    Competition dates are relative to `today` (by default the current
+    day) so the upcoming ones stay bookable.
+    With `capacity` (e.g. LOAD_TEST_CAPACITY), all the competitions are
+    upcoming and the clubs and competitions have `capacity` points and
+    places, so that every booking of a load test can succeed.
+    """
+    if today is None:
+        today = datetime.now()
+    today = today.replace(hour=0, minute=0, second=0, microsecond=0)
+    # One generator per list, so the clubs do not depend on the number
+    # of competitions and the other way around
+    return (
+        generate_clubs(clubs, random.Random(f"clubs-{seed}"), capacity),
+        generate_competitions(
+            competitions, random.Random(f"competitions-{seed}"), today,
+            capacity
+        ),
+    )
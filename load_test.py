@@ -0,0 +1,87 @@
+from pathlib import Path
+
+from flask import Blueprint, Flask, jsonify, request
+
+from config import BASE_DIR
+from data_manager import reset_data
+from dataset import LOAD_TEST_CAPACITY, generate_dataset
+
+load_test = Blueprint("load_test", __name__, url_prefix="/_load_test")
+
+# Size of the data set by a reset, unless given
+DEFAULT_CLUBS = 1000
+DEFAULT_COMPETITIONS = 100
+
+# Largest data set a reset generates, which it holds in memory
+MAX_CLUBS = 100_000
+MAX_COMPETITIONS = 10_000
+
+# Data files of the app, which load tests must never write to
+SHIPPED_DATA = {
+    "json": {
+        "JSON_CLUBS": BASE_DIR / "clubs.json",
+        "JSON_COMPETITIONS": BASE_DIR / "competitions.json",
+    },
+    "sqlite": {"SQLITE_DATABASE": BASE_DIR / "gudlft.db"},
+}
+
+
+########################################################
+# LOAD TEST DATA
+########################################################
+
+@load_test.route("/reset", methods=["POST"])
+def reset():
+    """
+    Replace the data by generated clubs and competitions that every
+    booking can succeed on: `clubs` clubs and `competitions` upcoming
+    competitions generated from `seed` (optional JSON body), up to
+    MAX_CLUBS and MAX_COMPETITIONS.
+    """
+    data = request.get_json(silent=True) or {}
+    sizes = {
+        "clubs": data.get("clubs", DEFAULT_CLUBS),
+        "competitions": data.get("competitions", DEFAULT_COMPETITIONS),
+        "seed": data.get("seed", 0),
+    }
+    if not all(
+        isinstance(value, int) and not isinstance(value, bool) and value >= 0
+        for value in sizes.values()
+    ):
+        return jsonify({"error": "Invalid data provided"}), 400
+    if (sizes["clubs"] > MAX_CLUBS
+            or sizes["competitions"] > MAX_COMPETITIONS):
+        return jsonify({
+            "error": f"At most {MAX_CLUBS} clubs and {MAX_COMPETITIONS} "
+                     "competitions can be generated"
+        }), 400
+
+    reset_data(*generate_dataset(
+        sizes["clubs"], sizes["competitions"], sizes["seed"],
+        capacity=LOAD_TEST_CAPACITY
+    ))
+    return jsonify(sizes)
+
+
+def uses_shipped_data(settings) -> bool:
+    """Check if the configured storage is the data shipped with the app"""
+    paths = SHIPPED_DATA.get(settings["STORAGE_BACKEND"], {})
+    return any(
+        Path(settings[name]).resolve() == path.resolve()
+        for name, path in paths.items()
+    )
+
+
+def init_load_test(app_instance: Flask):
+    """
+    Add the load test endpoints to the app, refusing to if its data is
+    the data shipped with it.
+    """
+    if uses_shipped_data(app_instance.config):
+        raise RuntimeError(
+            "LOAD_TEST resets the data: point JSON_CLUBS and "
+            "JSON_COMPETITIONS (or SQLITE_DATABASE) to a load test "
+            "directory, e.g. one written by `flask --app server "
+            "generate-data --load-test --output DIR`"
+        )
+    app_instance.register_blueprint(load_test)
@@ -0,0 +1,255 @@
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+from flask import (
+    Flask,
+    Response,
+    before_render_template,
+    g,
+    has_request_context,
+    request,
+    template_rendered
+)
+
+# Upper bounds (in seconds) of the latency histogram buckets
+BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+REQUEST_DURATION = "gudlft_request_duration_seconds"
+STAGE_DURATION = "gudlft_stage_duration_seconds"
+BOOKINGS = "gudlft_bookings_total"
+
+HELP = {
+    REQUEST_DURATION: "Time to handle a request, by route",
+    STAGE_DURATION: "Time spent in each stage of the requests",
+    BOOKINGS: "Bookings made or refused, by reason",
+}
+
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4"
+
+
+########################################################
+# HISTOGRAMS & COUNTERS
+########################################################
+
+
+class Histogram:
+    """Counts of the values falling in each of the BUCKETS"""
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        # The last count is for the values above the last bucket
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Record a value"""
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Histograms and counters keyed on their name and labels, a tuple of
+    (label, value) pairs.
+    Recording a value costs a dict lookup under a lock, so the metrics
+    can stay on in production. When not `enabled`, nothing is recorded.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, labels: tuple, value: float):
+        """Record a value in the histogram `name` with `labels`"""
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, labels: tuple, amount: int = 1):
+        """Increment the counter `name` with `labels`"""
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def clear(self):
+        """Drop all the recorded values"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self) -> str:
+        """Return the metrics in the Prometheus text format"""
+        with self._lock:
+            histograms = sorted(
+                (key, list(h.counts), h.total, h.count)
+                for key, h in self._histograms.items()
+            )
+            counters = sorted(self._counters.items())
+
+        lines = []
+        described = set()
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), counts, total, count in histograms:
+            describe(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += bucket_count
+                bucket_labels = format_labels(labels + (("le", str(bound)),))
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+        for (name, labels), value in counters:
+            describe(name, "counter")
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels: tuple) -> str:
+    """Return the labels in the Prometheus text format"""
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            label,
+            str(value).replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n")
+        )
+        for label, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+# Metrics of the process, shared by all the requests
+METRICS = Metrics()
+
+
+########################################################
+# INSTRUMENTATION
+########################################################
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Record the time spent in the block as the stage `stage`, and add it
+    to the Server-Timing header of the current request.
+    """
+    if not METRICS.enabled:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, perf_counter() - start)
+
+
+def record_stage(stage: str, elapsed: float):
+    """Record `elapsed` seconds spent in the stage `stage`"""
+    if not METRICS.enabled:
+        return
+    METRICS.observe(STAGE_DURATION, (("stage", stage),), elapsed)
+    if has_request_context():
+        timings = g.setdefault("server_timing", {})
+        timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def count_booking(error: str | None):
+    """Count a booking, made or refused with the message `error`"""
+    if not METRICS.enabled:
+        return
+    if error:
+        METRICS.inc(BOOKINGS, (("result", "refused"), ("reason", error)))
+    else:
+        METRICS.inc(BOOKINGS, (("result", "booked"), ("reason", "")))
+
+
+def server_timing(timings: dict, total: float) -> str:
+    """Return the Server-Timing header value of the stage timings"""
+    entries = [
+        f"{stage};dur={elapsed * 1e3:.2f}"
+        for stage, elapsed in timings.items()
+    ]
+    entries.append(f"total;dur={total * 1e3:.2f}")
+    return ", ".join(entries)
+
+
+########################################################
+# FLASK INTEGRATION
+########################################################
+
+
+def start_request_timer():
+    g.request_start = perf_counter()
+
+
+def record_request(response):
+    """
+    Record the latency of the request by route, and send its stage
+    timings in the Server-Timing header.
+    """
+    start = g.pop("request_start", None)
+    if start is None:
+        return response
+    elapsed = perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    METRICS.observe(
+        REQUEST_DURATION,
+        (
+            ("route", route),
+            ("method", request.method),
+            ("status", str(response.status_code)),
+        ),
+        elapsed,
+    )
+    response.headers["Server-Timing"] = server_timing(
+        g.get("server_timing", {}), elapsed
+    )
+    return response
+
+
+def start_render_timer(sender, template, context, **extra):
+    if has_request_context():
+        g.setdefault("render_starts", []).append(perf_counter())
+
+
+def record_render(sender, template, context, **extra):
+    starts = g.get("render_starts") if has_request_context() else None
+    if starts:
+        record_stage("render", perf_counter() - starts.pop())
+
+
+def show_metrics():
+    """Expose the metrics to Prometheus"""
+    return Response(METRICS.render(), mimetype=PROMETHEUS_MIMETYPE)
+
+
+def init_metrics(app_instance: Flask):
+    """
+    Time the requests and template renders of the app, and expose the
+    metrics at /metrics.
+    """
+    app_instance.before_request(start_request_timer)
+    app_instance.after_request(record_request)
+    before_render_template.connect(start_render_timer, app_instance)
+    template_rendered.connect(record_render, app_instance)
+    app_instance.add_url_rule("/metrics", "metrics", show_metrics)
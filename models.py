@@ -0,0 +1,113 @@
+from datetime import datetime
+
+########################################################
+# CLUB & COMPETITION RECORDS
+########################################################
+
+
+class Record:
+    """
+    Compact record with one slot per field.
+    Fields can also be read and written with `record["field"]`, like
+    the dicts loaded from the JSON files, so templates and code written
+    for those keep working.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(
+            getattr(self, field) == getattr(other, field)
+            for field in self.__slots__
+        )
+
+    def __repr__(self):
+        fields = ", ".join(
+            f"{field}={getattr(self, field)!r}" for field in self.__slots__
+        )
+        return f"{type(self).__name__}({fields})"
+
+
+class Club(Record):
+    """A club, with its points as an int"""
+
+    __slots__ = ("name", "email", "points")
+
+    def __init__(self, name: str, email: str, points: int):
+        self.name = name
+        self.email = email
+        self.points = points
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Club":
+        """Create a club from its JSON form"""
+        return cls(data["name"], data["email"], int(data["points"]))
+
+    def to_dict(self) -> dict:
+        """Return the JSON form of the club"""
+        return {
+            "name": self.name,
+            "email": self.email,
+            "points": str(self.points),
+        }
+
+
+class Competition(Record):
+    """A competition, with its date parsed and its places as an int"""
+
+    __slots__ = ("name", "date", "number_of_places")
+
+    def __init__(self, name: str, date: datetime, number_of_places: int):
+        self.name = name
+        self.date = date
+        self.number_of_places = number_of_places
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Competition":
+        """Create a competition from its JSON form"""
+        return cls(
+            data["name"],
+            datetime.fromisoformat(data["date"]),
+            int(data["number_of_places"]),
+        )
+
+    def to_dict(self) -> dict:
+        """Return the JSON form of the competition"""
+        return {
+            "name": self.name,
+            "date": self.date.isoformat(sep=" "),
+            "number_of_places": self.number_of_places,
+        }
+
+
+def competition_date(competition) -> datetime:
+    """
+    Return the date of a competition: already parsed for Competition
+    records, parsed from its JSON form for plain dicts.
+    """
+    date = competition["date"]
+    if isinstance(date, str):
+        return datetime.fromisoformat(date)
+    return date
+
+
+def to_json(obj):
+    """`default` hook of json.dump, serializing records to their JSON form"""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(
+        f"Object of type {type(obj).__name__} is not JSON serializable"
+    )
@@ -0,0 +1,145 @@
+import cProfile
+import json
+import os
+import random
+import re
+import threading
+import time
+from time import perf_counter
+
+from flask import Flask, current_app, g, request
+
+import data_manager
+
+
+########################################################
+# REQUEST PROFILER
+########################################################
+
+
+class RequestProfiler:
+    """
+    Profile a sample of the requests with cProfile, and write the
+    profiles to `directory` with the route, timing and data size of
+    each request.
+
+    A request is profiled when it matches one of `routes` (URL rules
+    like "/purchase_places"), or else with the probability
+    `sample_rate`. With `slow_ms`, only the profiles of the requests
+    slower than `slow_ms` milliseconds are written.
+    Only one request is profiled at a time, and profiling stops once
+    `max_files` profiles are written, so it can be left on for a few
+    minutes on a production worker.
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 0.0,
+                 routes=(), slow_ms: float = 0.0, max_files: int = 100):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.routes = frozenset(routes)
+        self.slow_ms = slow_ms
+        self.max_files = max_files
+        self.written = 0
+        # Held while a request is profiled: a single request is profiled
+        # at a time, which bounds the overhead on the worker
+        self._busy = threading.Lock()
+        self._count_lock = threading.Lock()
+
+    def wants(self, route: str) -> bool:
+        """Check if a request of `route` should be profiled"""
+        if self.written >= self.max_files:
+            return False
+        return route in self.routes or random.random() < self.sample_rate
+
+    def start(self):
+        """Profile the current request if it is selected"""
+        route = current_route()
+        if not self.wants(route) or not self._busy.acquire(blocking=False):
+            return
+        profiler = cProfile.Profile()
+        g.profile = (profiler, perf_counter())
+        profiler.enable()
+
+    def stop(self, response):
+        """Stop profiling the current request and write its profile"""
+        profile = g.pop("profile", None)
+        if profile is None:
+            return response
+        profiler, start = profile
+        profiler.disable()
+        elapsed_ms = (perf_counter() - start) * 1e3
+        try:
+            if elapsed_ms >= self.slow_ms:
+                self.write(profiler, elapsed_ms, response)
+        finally:
+            self._busy.release()
+        return response
+
+    def abandon(self, error=None):
+        """Stop the profiler of a request ended without a response"""
+        profile = g.pop("profile", None)
+        if profile is not None:
+            profile[0].disable()
+            self._busy.release()
+
+    def write(self, profiler: cProfile.Profile, elapsed_ms: float, response):
+        """Write the profile of the current request and its metadata"""
+        with self._count_lock:
+            if self.written >= self.max_files:
+                return
+            self.written += 1
+            number = self.written
+        route = current_route()
+        name = "{}-{}-{}".format(
+            time.strftime("%Y%m%d-%H%M%S"), os.getpid(),
+            re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        )
+        base = os.path.join(self.directory, f"{name}-{number}")
+        metadata = {
+            "route": route,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(elapsed_ms, 3),
+            "time": time.time(),
+            "pid": os.getpid(),
+            "request_size": request.content_length,
+            "response_size": response.content_length,
+            "clubs": loaded_size(data_manager.CLUBS),
+            "competitions": loaded_size(data_manager.COMPETITIONS),
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profiler.dump_stats(base + ".prof")
+            # Written last: a profile with its metadata is complete
+            with open(base + ".json", "w") as f:
+                json.dump(metadata, f, indent=2)
+        except OSError as error:
+            current_app.logger.warning("Could not write profile: %s", error)
+
+
+def current_route() -> str:
+    """Return the URL rule of the current request"""
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def loaded_size(records) -> int | None:
+    """Return the number of records, None if they are not loaded"""
+    return None if records is None else len(records)
+
+
+def init_profiling(app_instance: Flask) -> RequestProfiler:
+    """Profile the requests of the app as set in its PROFILE_* config"""
+    settings = app_instance.config
+    profiler = RequestProfiler(
+        settings["PROFILE_DIR"],
+        sample_rate=settings["PROFILE_SAMPLE_RATE"],
+        routes=settings["PROFILE_ROUTES"],
+        slow_ms=settings["PROFILE_SLOW_MS"],
+        max_files=settings["PROFILE_MAX_FILES"],
+    )
+    app_instance.before_request(profiler.start)
+    app_instance.after_request(profiler.stop)
+    app_instance.teardown_request(profiler.abandon)
+    app_instance.extensions["profiler"] = profiler
+    return profiler
@@ -1,20 +1,89 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import click
 from flask import (
     Flask, 
+    Response,
+    get_flashed_messages,
+    make_response,
     render_template, 
     request,
     redirect, 
     flash, 
+    session,
+    stream_template,
     url_for
 )
 
+from api import api
 from config import config
 from data_manager import (
+    DataWatcher,
+    book_places,
+    compact_journal,
+    create_storage,
+    get_calendar,
+    get_clubs,
+    get_competitions,
+    get_competitions_page,
+    get_data_version,
+    get_object_version,
+    get_email_index,
     get_obj_by_field, 
-    update_data_after_booking,
-    CLUBS,
-    COMPETITIONS
+    init_data,
+    iter_rows,
+    DATA_EPOCH
 )
-from validators import mail_is_unknown
+from dataset import LOAD_TEST_CAPACITY, generate_dataset
+from load_test import init_load_test, uses_shipped_data
+from metrics import METRICS, init_metrics, timed
+from profiling import init_profiling
+from validators import mail_is_unknown, normalize_email
+
+
+########################################################
+# RENDER CACHE
+########################################################
+
+class RenderCache:
+    """
+    Rendered pages keyed on the data version, so a page is only rendered
+    again once the data has changed.
+    Holds at most `max_entries` pages, dropping the least recently used.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, name, source, render):
+        """
+        Return the page `name` rendered from `source` at the current data
+        version, calling `render` if it is not cached.
+        """
+        key = (name, id(source), get_data_version())
+        with self._lock:
+            cached = self._pages.get(key)
+            if cached is not None and cached[0] is source:
+                self._pages.move_to_end(key)
+                return cached[1]
+        page = render()
+        if self.max_entries > 0:
+            with self._lock:
+                self._pages[key] = (source, page)
+                self._pages.move_to_end(key)
+                while len(self._pages) > self.max_entries:
+                    self._pages.popitem(last=False)
+        return page
+
+    def clear(self):
+        """Drop all the cached pages"""
+        with self._lock:
+            self._pages.clear()
 
 
 ########################################################
@@ -26,11 +95,119 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(config["default"])
     app.secret_key = app.config["SECRET_KEY"]
+    # The data is only loaded on first use
+    init_data(app)
+    app.extensions["render_cache"] = RenderCache(
+        app.config["RENDER_CACHE_SIZE"]
+    )
+    app.register_blueprint(api)
+    # The data functions time their stages outside of the requests too
+    METRICS.enabled = app.config["METRICS"]
+    if app.config["METRICS"]:
+        init_metrics(app)
+    if app.config["PROFILE_DIR"]:
+        init_profiling(app)
+    if app.config["LOAD_TEST"]:
+        init_load_test(app)
+    if app.config["DATA_RELOAD_INTERVAL"] > 0:
+        watcher = DataWatcher(app, app.config["DATA_RELOAD_INTERVAL"])
+        watcher.start()
+        app.extensions["data_watcher"] = watcher
     return app
 
 app = create_app()
 
 
+########################################################
+# RENDERING HELPERS
+########################################################
+
+def chunked(pieces, size):
+    """Join the pieces of a streamed page into chunks of `size` pieces"""
+    buffer = []
+    for piece in pieces:
+        buffer.append(piece)
+        if len(buffer) >= size:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_page(template_name, **context):
+    """
+    Stream a page in chunks as its template renders, so the first rows
+    are sent at once and the whole page is never held in memory.
+    """
+    # Take the flash messages now: the session is saved before the
+    # page is streamed
+    get_flashed_messages()
+    return Response(
+        chunked(
+            stream_template(template_name, **context),
+            app.config["STREAM_CHUNK_SIZE"]
+        )
+    )
+
+
+def render_page(template_name, **context):
+    """Render a page, or stream it in streaming mode"""
+    if app.config["STREAM_PAGES"]:
+        return stream_page(template_name, **context)
+    return render_template(template_name, **context)
+
+
+def render_welcome(club):
+    """
+    Render the welcome page of a club with one page of competitions,
+    selected by the `after`, `upcoming` and `available` query arguments.
+    """
+    upcoming_only = request.args.get("upcoming", "1") == "1"
+    with_places = request.args.get("available", "0") == "1"
+    competitions, next_cursor = get_competitions_page(
+        get_competitions(),
+        after=request.args.get("after"),
+        limit=app.config["COMPETITIONS_PAGE_SIZE"],
+        upcoming_only=upcoming_only,
+        with_places=with_places
+    )
+    return render_page(
+        "welcome.html",
+        club=club,
+        competitions=iter_rows(competitions),
+        next_cursor=next_cursor,
+        upcoming_only=upcoming_only,
+        with_places=with_places
+    )
+
+
+def make_etag(*parts) -> str:
+    """
+    Return a strong ETag for a page built from the data identified by
+    `parts` (data versions, names, query arguments...).
+    """
+    key = repr((DATA_EPOCH,) + parts).encode()
+    return hashlib.sha1(key).hexdigest()
+
+
+def conditional_response(etag, render):
+    """
+    Answer 304 Not Modified without rendering the page when the client
+    already has the version `etag`, otherwise render it and tag it.
+    Pages showing pending flash messages are never tagged, as the
+    messages are only shown once.
+    """
+    if session.get("_flashes"):
+        return render()
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
 ########################################################
 # FLASK ROUTES
 ########################################################
@@ -48,41 +225,70 @@ def show_summary():
     and the competitions list.
     """
     email = request.form.get("email")
-    if mail_is_unknown(email, CLUBS):
+    clubs_by_email = get_email_index(get_clubs())
+    with timed("lookup"):
+        unknown = mail_is_unknown(email, clubs_by_email)
+    if unknown:
         flash("Please enter a valid email")
         return redirect(url_for("index"))
     
     else:
-        club = get_obj_by_field("email", email, CLUBS)
-        return render_template("welcome.html", 
-                                club=club, 
-                                competitions=COMPETITIONS)
+        club = clubs_by_email[normalize_email(email)]
+        # The club whose pages of competitions can be shown
+        session["club"] = club["name"]
+        return render_welcome(club)
+
+
+@app.route("/competitions/<club_name>")
+def show_competitions(club_name):
+    """
+    Display the welcome page of a club on another page of
+    competitions, or with other filters, to the club logged in only:
+    the page shows the club's email, its secretary's login.
+    """
+    club = get_obj_by_field("name", club_name, get_clubs())
+    if club is None or session.get("club") != club_name:
+        flash("Invalid competition or club")
+        return redirect(url_for("index"))
+    etag = make_etag(
+        "welcome",
+        club_name,
+        get_data_version(),
+        # The upcoming competitions also change as competitions start
+        get_calendar(get_competitions()).past_count(),
+        sorted(request.args.items())
+    )
+    return conditional_response(etag, lambda: render_welcome(club))
 
 
 @app.route("/book/<competition_name>/<club_name>")
 def book(competition_name, club_name):
     """Display the booking page"""
-    try:
-        club = get_obj_by_field("name", club_name, CLUBS)
-        competition = get_obj_by_field("name", competition_name, COMPETITIONS)
-        
-        if club and competition:
-            return render_template(
-                "booking.html",
-                club=club,
-                competition=competition
-            )
-        else:
-            flash("Something went wrong-please try again")
-            return render_template(
-                "welcome.html", 
-                club=club, 
-                competitions=COMPETITIONS
-            )
-    except IndexError:
+    club = get_obj_by_field("name", club_name, get_clubs())
+    competition = get_obj_by_field(
+        "name", competition_name, get_competitions()
+    )
+
+    if club is None or competition is None:
         flash("Invalid competition or club")
         return redirect(url_for("index"))
 
+    etag = make_etag(
+        "booking",
+        competition_name,
+        get_object_version("competition", competition_name),
+        club_name,
+        get_object_version("club", club_name)
+    )
+    return conditional_response(
+        etag,
+        lambda: render_template(
+            "booking.html",
+            club=club,
+            competition=competition
+        )
+    )
+
 
 @app.route("/purchase_places", methods=["POST"])
 def purchase_places():
@@ -99,11 +305,23 @@ def purchase_places():
             flash("Missing required data")
             return redirect(url_for("index"))
             
-        competition = get_obj_by_field("name", competition_name, COMPETITIONS)
-        club = get_obj_by_field("name", club_name, CLUBS)
+        competition = get_obj_by_field(
+            "name", competition_name, get_competitions()
+        )
+        club = get_obj_by_field("name", club_name, get_clubs())
+        if club is None or competition is None:
+            flash("Invalid competition or club")
+            return redirect(url_for("index"))
+
         places_required = int(places_str)
         
-        error = update_data_after_booking(competition, club, places_required)
+        error, competition, club = book_places(
+            competition, club, places_required
+        )
+        if club is None or competition is None:
+            # Removed by a reload since they were looked up
+            flash(error)
+            return redirect(url_for("index"))
         if error:
             flash(error)
             return render_template(
@@ -113,25 +331,97 @@ def purchase_places():
             )
         else:
             flash("Great-booking complete!")
-            return render_template("welcome.html", 
-                                    club=club, 
-                                    competitions=COMPETITIONS)
-    except (ValueError, IndexError, KeyError):
+            return render_welcome(club)
+    except (ValueError, KeyError):
         flash("Invalid data provided")
         return redirect(url_for("index"))
 
 
 @app.route("/display_points")
 def display_points():
-    """Display the points of the clubs from the main page"""
-    return render_template("points.html", clubs=CLUBS)
+    """
+    Display the points of the clubs from the main page.
+    The page only changes with the data, so it is served from the
+    render cache until the next booking, or not at all to clients
+    which already have it.
+    In streaming mode, it is streamed row by row instead of cached.
+    """
+    clubs = get_clubs()
+    if app.config["STREAM_PAGES"]:
+        def render():
+            return stream_page("points.html", clubs=iter_rows(clubs))
+    else:
+        def render():
+            return app.extensions["render_cache"].get_or_render(
+                "points.html",
+                clubs,
+                lambda: render_template("points.html", clubs=clubs)
+            )
+    etag = make_etag("points", get_data_version())
+    return conditional_response(etag, render)
 
 
 @app.route("/logout")
 def logout():
-    """Redirect to the main page"""
+    """Log the club out and redirect to the main page"""
+    session.pop("club", None)
     return redirect(url_for("index"))
 
 
+########################################################
+# CLI COMMANDS
+########################################################
+
+@app.cli.command("compact-journal")
+def compact_journal_command():
+    """Fold the booking journal into the clubs and competitions files"""
+    compact_journal(app, get_clubs(), get_competitions())
+
+
+@app.cli.command("generate-data")
+@click.option("--clubs", default=1000, show_default=True,
+              help="Number of clubs.")
+@click.option("--competitions", default=100, show_default=True,
+              help="Number of competitions.")
+@click.option("--seed", default=0, show_default=True,
+              help="Seed of the generated data.")
+@click.option("--load-test", is_flag=True,
+              help="Generate only upcoming competitions, with clubs and "
+                   "competitions that never run out of points or places.")
+@click.option("--output", type=click.Path(file_okay=False),
+              help="Write clubs.json and competitions.json (or gudlft.db "
+                   "with the sqlite backend) to this directory instead "
+                   "of the configured storage.")
+@click.option("--force", is_flag=True,
+              help="Overwrite the data shipped with the app.")
+def generate_data_command(
+    clubs, competitions, seed, load_test, output, force
+):
+    """Replace the data by synthetic clubs and competitions"""
+    settings = dict(app.config)
+    if output:
+        os.makedirs(output, exist_ok=True)
+        settings.update(
+            JSON_CLUBS=os.path.join(output, "clubs.json"),
+            JSON_COMPETITIONS=os.path.join(output, "competitions.json"),
+            JSON_JOURNAL=os.path.join(output, "bookings.journal"),
+            SQLITE_DATABASE=os.path.join(output, "gudlft.db"),
+        )
+    if uses_shipped_data(settings) and not force:
+        raise click.UsageError(
+            "This would overwrite the data shipped with the app: give an "
+            "--output directory, or --force to overwrite it"
+        )
+    club_list, competition_list = generate_dataset(
+        clubs, competitions, seed,
+        capacity=LOAD_TEST_CAPACITY if load_test else None
+    )
+    create_storage(settings).replace(club_list, competition_list)
+    click.echo(
+        f"Generated {clubs} clubs and {competitions} competitions "
+        f"(seed {seed})"
+    )
+
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
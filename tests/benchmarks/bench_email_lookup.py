@@ -0,0 +1,63 @@
+"""Microbenchmark of the login email check.
+
+Times `mail_is_unknown` against the shared email index for growing
+numbers of clubs: the time per check should stay flat.
+
+Usage: python tests/benchmarks/bench_email_lookup.py [--max 1000000]
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from data_manager import build_index, get_email_index  # noqa: E402
+from validators import mail_is_unknown  # noqa: E402
+
+
+def generate_clubs(count: int) -> list:
+    """Generate `count` clubs with distinct emails"""
+    return [
+        {"name": f"Club {i}", "email": f"club{i}@test.com", "points": "10"}
+        for i in range(count)
+    ]
+
+
+def bench(count: int, number: int) -> tuple[float, float]:
+    """
+    Return the mean time (in µs) of a known and an unknown email check
+    against an indexed list of `count` clubs.
+    """
+    clubs = generate_clubs(count)
+    build_index("clubs", clubs)
+    known = f"CLUB{count // 2}@test.com "
+
+    def check(email):
+        return mail_is_unknown(email, get_email_index(clubs))
+
+    hit = timeit.timeit(lambda: check(known), number=number)
+    miss = timeit.timeit(lambda: check("nobody@test.com"), number=number)
+    return hit / number * 1e6, miss / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max", type=int, default=1_000_000,
+                        help="largest number of clubs (default: 1000000)")
+    parser.add_argument("--number", type=int, default=100_000,
+                        help="checks timed per size (default: 100000)")
+    args = parser.parse_args()
+
+    print(f"{'clubs':>10} {'known (µs)':>12} {'unknown (µs)':>14}")
+    count = 10
+    while count <= args.max:
+        hit, miss = bench(count, args.number)
+        print(f"{count:>10} {hit:>12.3f} {miss:>14.3f}")
+        count *= 10
+
+
+if __name__ == "__main__":
+    main()
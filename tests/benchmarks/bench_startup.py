@@ -0,0 +1,107 @@
+"""Startup benchmark of the app.
+
+For growing numbers of clubs, times in a fresh interpreter:
+- the import of `server` (which builds the app),
+- the first request, which reads no data (the index page),
+- the first request using the data (a login), which loads it.
+The import and first request should stay flat, the data being loaded
+on first use only.
+
+Usage: python tests/benchmarks/bench_startup.py [--max 1000000]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from data_manager import create_storage  # noqa: E402
+from dataset import generate_dataset  # noqa: E402
+
+# Run in the child interpreter, from outside the project directory
+CHILD = """
+import json
+import os
+import time
+
+start = time.perf_counter()
+import server
+imported = time.perf_counter()
+client = server.app.test_client()
+client.get("/")
+first_request = time.perf_counter()
+response = client.post(
+    "/show_summary", data={"email": os.environ["BENCH_EMAIL"]}
+)
+assert response.status_code == 200
+first_login = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "first_request": first_request - imported,
+    "first_login": first_login - first_request,
+}))
+"""
+
+
+def write_dataset(directory: str, count: int) -> dict:
+    """
+    Write the data files of `count` generated clubs and 100 competitions
+    to `directory`, and return the environment pointing the app to them
+    with the email of a club to log in with.
+    """
+    settings = {
+        "STORAGE_BACKEND": "json",
+        "JSON_CLUBS": os.path.join(directory, "clubs.json"),
+        "JSON_COMPETITIONS": os.path.join(directory, "competitions.json"),
+        "JSON_JOURNAL": os.path.join(directory, "bookings.journal"),
+    }
+    clubs, competitions = generate_dataset(count, 100)
+    create_storage(settings).replace(clubs, competitions)
+    return {**settings, "BENCH_EMAIL": clubs[0]["email"]}
+
+
+def bench(count: int) -> dict:
+    """Return the startup timings (in s) of the app with `count` clubs"""
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            **write_dataset(directory, count),
+            "PYTHONPATH": str(PROJECT_ROOT),
+            "FLASK_DEBUG": "0",
+        }
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD],
+            cwd=directory,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max", type=int, default=1_000_000,
+                        help="largest number of clubs (default: 1000000)")
+    args = parser.parse_args()
+
+    print(f"{'clubs':>10} {'import (ms)':>12} {'1st request (ms)':>17} "
+          f"{'1st login (ms)':>15}")
+    count = 10
+    while count <= args.max:
+        timings = bench(count)
+        print(f"{count:>10} {timings['import'] * 1e3:>12.1f} "
+              f"{timings['first_request'] * 1e3:>17.1f} "
+              f"{timings['first_login'] * 1e3:>15.1f}")
+        count *= 10
+
+
+if __name__ == "__main__":
+    main()
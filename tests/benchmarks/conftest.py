@@ -0,0 +1,205 @@
+"""Fixtures of the benchmark suite.
+
+The benchmarks only run with --bench-sizes, once per size. Each one
+reports its ops/sec and the peak memory allocated by one operation,
+saved with the other results to a JSON file. With --bench-compare,
+the benchmarks slower than a previous run fail.
+
+Usage: pytest tests/benchmarks --bench-sizes 10,1000,100000,1000000
+"""
+
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+import data_manager
+from dataset import generate_dataset
+from models import Club, Competition
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# Timing rounds of each benchmark, the best one being kept
+ROUNDS = 3
+
+# Results of the session's benchmarks, by name
+RESULTS = pytest.StashKey[dict]()
+
+
+def bench_sizes(config) -> list:
+    """Return the sizes given with --bench-sizes"""
+    sizes = config.getoption("bench_sizes")
+    return [int(size) for size in sizes.split(",") if size.strip()]
+
+
+def pytest_generate_tests(metafunc):
+    """Run the benchmarks using a dataset once per size"""
+    if "dataset" not in metafunc.fixturenames:
+        return
+    sizes = bench_sizes(metafunc.config) or [
+        pytest.param(0, marks=pytest.mark.skip(
+            reason="benchmarks only run with --bench-sizes"
+        ))
+    ]
+    metafunc.parametrize("dataset", sizes, indirect=True, scope="session")
+
+
+########################################################
+#                   DATASETS
+########################################################
+
+
+class Dataset:
+    """
+    `size` generated clubs and competitions, indexed like the app's data
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.clubs, self.competitions = generate_dataset(size, size)
+        data_manager.build_index("clubs", self.clubs)
+        data_manager.build_index("competitions", self.competitions)
+        data_manager.build_calendar(self.competitions)
+
+    @property
+    def club(self) -> Club:
+        """A club in the middle of the list"""
+        return self.clubs[self.size // 2]
+
+    @property
+    def competition(self) -> Competition:
+        """A competition in the middle of the list"""
+        return self.competitions[self.size // 2]
+
+
+@pytest.fixture(scope="session")
+def dataset(request):
+    """The data of the size the benchmark runs with"""
+    return Dataset(request.param)
+
+
+@pytest.fixture
+def app_data(dataset, monkeypatch):
+    """Serve the dataset as the app's data"""
+    monkeypatch.setattr(data_manager, "CLUBS", dataset.clubs)
+    monkeypatch.setattr(data_manager, "COMPETITIONS", dataset.competitions)
+    yield dataset
+    # A benchmark may have replaced the indexed lists: index the
+    # dataset again
+    data_manager.build_index("clubs", dataset.clubs)
+    data_manager.build_index("competitions", dataset.competitions)
+    data_manager.build_calendar(dataset.competitions)
+
+
+########################################################
+#                   MEASURES
+########################################################
+
+
+@pytest.fixture(scope="session")
+def bench_results(request):
+    """
+    Results of the session's benchmarks by name, saved once they all
+    ran.
+    """
+    results = request.config.stash.setdefault(RESULTS, {})
+    yield results
+    if not results:
+        return
+    path = request.config.getoption("bench_json") or (
+        PROJECT_ROOT / ".benchmarks"
+        / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "sizes": bench_sizes(request.config),
+            "benchmarks": results,
+        }, f, indent=2, sort_keys=True)
+
+
+@pytest.fixture(scope="session")
+def bench_baseline(request) -> dict:
+    """Results of the run given with --bench-compare"""
+    path = request.config.getoption("bench_compare")
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)["benchmarks"]
+
+
+def measure(func, *args, **kwargs) -> dict:
+    """
+    Return the ops/sec of `func(*args, **kwargs)`, over the best of ROUNDS rounds
+    of at least 0.2s, and the peak memory allocated by one call.
+    """
+    timer = timeit.Timer(lambda: func(*args, **kwargs))
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=ROUNDS, number=number))
+
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "ops_per_sec": number / best,
+        "mean_us": best / number * 1e6,
+        "peak_memory_kib": peak / 1024,
+        "calls": number * ROUNDS,
+    }
+
+
+@pytest.fixture
+def benchmark(request, bench_results, bench_baseline):
+    """
+    Measure a function, `benchmark(func, *args, **kwargs)`, under the
+    name of the test and its size, and check it against the baseline.
+    """
+    tolerance = request.config.getoption("bench_tolerance")
+
+    def run(func, *args, **kwargs):
+        size = request.getfixturevalue("dataset").size
+        name = f"{request.node.originalname.removeprefix('test_')}[{size}]"
+        result = measure(func, *args, **kwargs)
+        bench_results[name] = {"size": size, **result}
+
+        baseline = bench_baseline.get(name)
+        if baseline is not None:
+            floor = baseline["ops_per_sec"] * (1 - tolerance)
+            if result["ops_per_sec"] < floor:
+                pytest.fail(
+                    f"{name} regressed: {result['ops_per_sec']:.1f} ops/s "
+                    f"against {baseline['ops_per_sec']:.1f} ops/s"
+                )
+        return result
+
+    return run
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    """Print the results of the benchmarks"""
+    results = config.stash.get(RESULTS, {})
+    if not results:
+        return
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(
+        f"{'benchmark':<45} {'ops/sec':>14} {'mean (µs)':>14} "
+        f"{'peak (KiB)':>12}"
+    )
+    for name, result in results.items():
+        terminalreporter.write_line(
+            f"{name:<45} {result['ops_per_sec']:>14.1f} "
+            f"{result['mean_us']:>14.2f} {result['peak_memory_kib']:>12.1f}"
+        )
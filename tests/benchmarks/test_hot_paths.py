@@ -0,0 +1,98 @@
+"""Benchmarks of the data and validation hot paths as the data grows.
+
+Usage: pytest tests/benchmarks --bench-sizes 10,1000,100000,1000000
+"""
+
+from flask import render_template
+
+import data_manager
+from data_manager import (
+    get_competitions_page,
+    get_email_index,
+    get_obj_by_field,
+    save_json,
+    update_clubs_and_competitions
+)
+from server import app
+from validators import mail_is_unknown, validate_places_required
+
+
+########################################################
+#                   LOOKUPS
+########################################################
+
+
+def test_get_obj_by_field(dataset, benchmark):
+    """Look up a club by email"""
+    email = dataset.club["email"]
+    benchmark(get_obj_by_field, "email", email, dataset.clubs)
+
+
+def test_get_obj_by_field_missing(dataset, benchmark):
+    """Look up a competition which does not exist"""
+    benchmark(get_obj_by_field, "name", "Nowhere", dataset.competitions)
+
+
+def test_mail_is_unknown(dataset, benchmark):
+    """Check a login email"""
+    email = f" {dataset.club['email'].upper()} "
+
+    def check():
+        return mail_is_unknown(email, get_email_index(dataset.clubs))
+
+    benchmark(check)
+
+
+########################################################
+#                   BOOKING
+########################################################
+
+
+def test_validate_places_required(dataset, benchmark):
+    """Validate a booking"""
+    benchmark(validate_places_required, "5", dataset.club,
+              dataset.competition)
+
+
+def test_update_clubs_and_competitions(app_data, benchmark):
+    """Update the lists after a booking"""
+    benchmark(
+        update_clubs_and_competitions, app_data.club, app_data.competition
+    )
+
+
+def test_save_json(dataset, benchmark, tmp_path):
+    """Save the clubs file"""
+    benchmark(save_json, str(tmp_path / "clubs.json"), dataset.clubs, "clubs")
+
+
+########################################################
+#                   RENDERING
+########################################################
+
+
+def test_render_points(dataset, benchmark):
+    """Render the points page of all the clubs"""
+    with app.test_request_context("/display_points"):
+        benchmark(render_template, "points.html", clubs=dataset.clubs)
+
+
+def test_render_welcome(app_data, benchmark):
+    """Render the welcome page with its first page of competitions"""
+
+    def render():
+        competitions, next_cursor = get_competitions_page(
+            data_manager.COMPETITIONS,
+            limit=app.config["COMPETITIONS_PAGE_SIZE"],
+        )
+        return render_template(
+            "welcome.html",
+            club=app_data.club,
+            competitions=competitions,
+            next_cursor=next_cursor,
+            upcoming_only=True,
+            with_places=False,
+        )
+
+    with app.test_request_context("/show_summary"):
+        benchmark(render)
@@ -5,3 +5,28 @@ from pathlib import Path
 PROJECT_ROOT = str(Path(__file__).resolve().parents[1])
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
+
+
+def pytest_addoption(parser):
+    """Options of the benchmark suite (tests/benchmarks)"""
+    group = parser.getgroup("benchmarks")
+    group.addoption(
+        "--bench-sizes", default="",
+        help="comma-separated numbers of clubs and competitions to run "
+             "the benchmarks with, e.g. 10,1000,100000,1000000 "
+             "(the benchmarks are skipped without it)"
+    )
+    group.addoption(
+        "--bench-json", default=None,
+        help="file to save the benchmark results to "
+             "(default: .benchmarks/<date>.json)"
+    )
+    group.addoption(
+        "--bench-compare", default=None,
+        help="results of a previous run: benchmarks slower than them by "
+             "more than --bench-tolerance fail"
+    )
+    group.addoption(
+        "--bench-tolerance", type=float, default=0.25,
+        help="slowdown allowed against --bench-compare (default: 0.25)"
+    )
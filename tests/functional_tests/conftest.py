@@ -1,10 +1,10 @@
 import pytest
 import json
 from unittest.mock import patch
-from copy import deepcopy
 
 from server import app
 from config import Config
+from models import Club, Competition
 
 
 ########################################################
@@ -20,8 +20,8 @@ with open("competitions.json", "r") as f:
     competitions_data.extend(json.load(f)["competitions"])
 
 # Changed the date to open it to booking
-competitions_data[0]["date"] = "2026-03-27 10:00:00"
-competitions_data[1]["date"] = "2026-10-22 13:30:00"
+competitions_data[0]["date"] = "2099-03-27 10:00:00"
+competitions_data[1]["date"] = "2099-10-22 13:30:00"
 
 # An old version of the competition so 
 # we"re still able to test a past one
@@ -48,8 +48,11 @@ class MockDataManager:
         """Reset data to initial state"""
         # Creating independent copies of the initial loaded data
         # (So we don"t modify the original data throughout the tests)
-        self.stored_clubs = deepcopy(clubs_data)
-        self.stored_competitions = deepcopy(competitions_data)
+        self.stored_clubs = [Club.from_dict(club) for club in clubs_data]
+        self.stored_competitions = [
+            Competition.from_dict(competition)
+            for competition in competitions_data
+        ]
     
     def load_data(self, file_path, key=None):
         """Mock load_data function that returns current state"""
@@ -107,10 +110,6 @@ def mock_json_functions(mock_data_manager):
                 side_effect=mock_data_manager.load_data), \
          patch("data_manager.save_json", 
                 side_effect=mock_data_manager.save_json), \
-         patch("server.CLUBS", 
-                mock_data_manager.stored_clubs), \
-         patch("server.COMPETITIONS", 
-                mock_data_manager.stored_competitions), \
          patch("data_manager.CLUBS", 
                 mock_data_manager.stored_clubs), \
          patch("data_manager.COMPETITIONS", 
@@ -0,0 +1,462 @@
+"""Functional tests for the JSON API."""
+
+import base64
+import json
+from copy import deepcopy
+from unittest.mock import patch
+
+import msgpack
+import pytest
+
+import data_manager
+from api import find_booked
+from data_manager import BATCH_CANCELLED
+
+
+########################################################
+#                   CLUBS ENDPOINT
+########################################################
+
+
+def test_list_clubs(test_app, mock_json_functions):
+    """Test that the clubs are listed without their emails"""
+    with test_app.test_client() as client:
+        response = client.get("/api/clubs")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+    data = response.get_json()
+    assert data["clubs"][2] == {"name": "Simply Lift", "points": 13}
+    assert all("email" not in club for club in data["clubs"])
+    assert data["next_cursor"] is None
+
+
+def test_list_clubs_with_selected_fields(test_app, mock_json_functions):
+    """Test that only the selected fields are returned, by name"""
+    with test_app.test_client() as client:
+        response = client.get("/api/clubs?fields=name")
+
+    assert response.get_json()["clubs"] == [
+        {"name": "Iron Temple"}, {"name": "She Lifts"}, {"name": "Simply Lift"}
+    ]
+
+
+def test_list_clubs_with_unknown_field(test_app, mock_json_functions):
+    """Test that an unknown (or private) field is refused"""
+    with test_app.test_client() as client:
+        response = client.get("/api/clubs?fields=name,email")
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Unknown field: email"}
+
+
+def test_list_clubs_pages(test_app, mock_json_functions):
+    """Test that the clubs are listed page by page, by name"""
+    with test_app.test_client() as client:
+        first = client.get("/api/clubs?fields=name&limit=2").get_json()
+        second = client.get(
+            f"/api/clubs?fields=name&limit=2&after={first['next_cursor']}"
+        ).get_json()
+
+    assert first["clubs"] == [{"name": "Iron Temple"}, {"name": "She Lifts"}]
+    assert first["next_cursor"] is not None
+    assert second == {"clubs": [{"name": "Simply Lift"}], "next_cursor": None}
+
+
+def test_list_clubs_pages_follow_reloads(test_app, mock_json_functions):
+    """
+    Test when the clubs are reloaded in another order between two pages:
+    the next page neither skips nor repeats a club.
+    """
+    with test_app.test_client() as client:
+        first = client.get("/api/clubs?fields=name&limit=2").get_json()
+        with patch(
+            "data_manager.CLUBS", list(reversed(data_manager.get_clubs()))
+        ):
+            second = client.get(
+                f"/api/clubs?fields=name&limit=2&after={first['next_cursor']}"
+            ).get_json()
+
+    assert second["clubs"] == [{"name": "Simply Lift"}]
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=x"])
+def test_list_clubs_with_invalid_page(test_app, mock_json_functions, query):
+    """Test that invalid page arguments are refused"""
+    with test_app.test_client() as client:
+        response = client.get(f"/api/clubs?{query}")
+    assert response.status_code == 400
+
+
+def test_page_size_is_capped(test_app, mock_json_functions):
+    """Test that a page is never larger than API_MAX_PAGE_SIZE"""
+    with patch.dict(test_app.config, {"API_MAX_PAGE_SIZE": 1}), \
+         test_app.test_client() as client:
+        response = client.get("/api/clubs?limit=500")
+    assert len(response.get_json()["clubs"]) == 1
+
+
+########################################################
+#               COMPETITIONS ENDPOINT
+########################################################
+
+
+def test_list_competitions(test_app, mock_json_functions):
+    """Test that the upcoming competitions are listed by date"""
+    with test_app.test_client() as client:
+        response = client.get("/api/competitions")
+
+    assert response.get_json() == {
+        "competitions": [
+            {
+                "name": "Spring Festival",
+                "date": "2099-03-27 10:00:00",
+                "number_of_places": 25
+            },
+            {
+                "name": "Fall Classic",
+                "date": "2099-10-22 13:30:00",
+                "number_of_places": 13
+            },
+        ],
+        "next_cursor": None,
+    }
+
+
+def test_list_competitions_pages(test_app, mock_json_functions):
+    """Test that the competitions are listed page by page"""
+    with test_app.test_client() as client:
+        first = client.get(
+            "/api/competitions?upcoming=0&fields=name&limit=2"
+        ).get_json()
+        second = client.get(
+            "/api/competitions?upcoming=0&fields=name&limit=2"
+            f"&after={first['next_cursor']}"
+        ).get_json()
+
+    assert first["competitions"] == [
+        {"name": "Fall Classics"}, {"name": "Spring Festival"}
+    ]
+    assert second == {
+        "competitions": [{"name": "Fall Classic"}], "next_cursor": None
+    }
+
+
+def test_list_competitions_with_aware_cursor(test_app, mock_json_functions):
+    """Test that a cursor with a time zone gives the first page"""
+    cursor = base64.urlsafe_b64encode(
+        json.dumps(["2099-01-01T00:00:00+00:00", "Spring Festival"]).encode()
+    ).decode()
+    with test_app.test_client() as client:
+        response = client.get(f"/api/competitions?fields=name&after={cursor}")
+
+    assert response.status_code == 200
+    assert response.get_json()["competitions"][0] == {
+        "name": "Spring Festival"
+    }
+
+
+def test_list_competitions_as_msgpack(test_app, mock_json_functions):
+    """Test that msgpack is returned to clients preferring it"""
+    with test_app.test_client() as client:
+        response = client.get(
+            "/api/competitions?fields=name",
+            headers={"Accept": "application/msgpack"}
+        )
+
+    assert response.mimetype == "application/msgpack"
+    assert msgpack.unpackb(response.data)["competitions"][0] == {
+        "name": "Spring Festival"
+    }
+
+
+def test_json_is_returned_without_msgpack(test_app, mock_json_functions):
+    """Test that JSON is returned when msgpack is not installed"""
+    with patch("api.msgpack", None), test_app.test_client() as client:
+        response = client.get(
+            "/api/clubs", headers={"Accept": "application/msgpack"}
+        )
+    assert response.mimetype == "application/json"
+
+
+########################################################
+#                 BOOKINGS ENDPOINT
+########################################################
+
+
+def test_create_booking(test_app, mock_json_functions):
+    """Test that a booking is made and the new values returned"""
+    with test_app.test_client() as client:
+        response = client.post("/api/bookings", json={
+            "club": "Simply Lift",
+            "competition": "Spring Festival",
+            "places": 2
+        })
+
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data["club"]["points"] == 11
+    assert data["competition"]["number_of_places"] == 23
+    assert mock_json_functions.get_club_by_name("Simply Lift")["points"] == 11
+
+
+def stale_records(competition_name, club_name):
+    """
+    The competition and club of a booking as looked up before a reload
+    replaced them, with other values
+    """
+    competition, club = find_booked(competition_name, club_name)
+    competition, club = deepcopy(competition), deepcopy(club)
+    competition["number_of_places"] = 99
+    club["points"] = 99
+    return competition, club
+
+
+def test_booking_answers_the_records_booked(test_app, mock_json_functions):
+    """
+    Test when the records were reloaded after they were looked up: the
+    values of the records booked are returned.
+    """
+    with patch("api.find_booked", side_effect=stale_records), \
+         test_app.test_client() as client:
+        response = client.post("/api/bookings", json={
+            "club": "Simply Lift",
+            "competition": "Spring Festival",
+            "places": 2
+        })
+
+    data = response.get_json()
+    assert data["club"]["points"] == 11
+    assert data["competition"]["number_of_places"] == 23
+
+
+def test_create_booking_from_msgpack(test_app, mock_json_functions):
+    """Test that a booking can be sent as msgpack"""
+    with test_app.test_client() as client:
+        response = client.post(
+            "/api/bookings",
+            data=msgpack.packb({
+                "club": "Simply Lift",
+                "competition": "Spring Festival",
+                "places": 1
+            }),
+            content_type="application/msgpack"
+        )
+    assert response.status_code == 201
+
+
+def test_refused_booking(test_app, mock_json_functions):
+    """Test that a refused booking returns the validation message"""
+    with test_app.test_client() as client:
+        response = client.post("/api/bookings", json={
+            "club": "Iron Temple",
+            "competition": "Spring Festival",
+            "places": 5
+        })
+
+    assert response.status_code == 409
+    assert response.get_json() == {
+        "error": "The club does not have enough points"
+    }
+
+
+def test_booking_of_unknown_competition(test_app, mock_json_functions):
+    """Test that an unknown competition is answered 404"""
+    with test_app.test_client() as client:
+        response = client.post("/api/bookings", json={
+            "club": "Simply Lift",
+            "competition": "Unknown",
+            "places": 1
+        })
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("body", [
+    json.dumps({"club": "Simply Lift", "competition": "Spring Festival"}),
+    json.dumps({"club": "Simply Lift", "competition": "Spring Festival",
+                "places": "many"}),
+    json.dumps({"club": "Simply Lift", "competition": "Spring Festival",
+                "places": -50}),
+    json.dumps({"club": "Simply Lift", "competition": "Spring Festival",
+                "places": "-1"}),
+    json.dumps({"club": "Simply Lift", "competition": "Spring Festival",
+                "places": True}),
+    json.dumps({"club": "Simply Lift", "competition": "Spring Festival",
+                "places": 1.5}),
+    json.dumps(["not", "an", "object"]),
+    "not json",
+])
+def test_invalid_booking_request(test_app, mock_json_functions, body):
+    """Test that invalid booking requests are answered 400"""
+    with test_app.test_client() as client:
+        response = client.post(
+            "/api/bookings", data=body, content_type="application/json"
+        )
+    assert response.status_code == 400
+    assert mock_json_functions.get_club_by_name("Simply Lift")["points"] == 13
+
+
+########################################################
+#               BATCH BOOKINGS ENDPOINT
+########################################################
+
+
+def test_create_bookings(test_app, mock_json_functions):
+    """Test that all the bookings of a batch are made with one save"""
+    with patch("data_manager.save_clubs_and_competitions") as mock_save, \
+         test_app.test_client() as client:
+        response = client.post("/api/bookings/batch", json={"bookings": [
+            {"club": "Simply Lift", "competition": "Spring Festival",
+             "places": 2},
+            {"club": "Simply Lift", "competition": "Fall Classic",
+             "places": 3},
+        ]})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["booked"] == 2
+    assert [result["status"] for result in data["results"]] == [
+        "booked", "booked"
+    ]
+    assert data["results"][1]["club"]["points"] == 8
+    mock_save.assert_called_once()
+
+
+def test_batch_answers_the_records_booked(test_app, mock_json_functions):
+    """
+    Test when the records were reloaded after they were looked up: each
+    result gives the values of the records booked.
+    """
+    with patch("api.find_booked", side_effect=stale_records), \
+         test_app.test_client() as client:
+        response = client.post("/api/bookings/batch", json={"bookings": [
+            {"club": "Simply Lift", "competition": "Spring Festival",
+             "places": 2},
+        ]})
+
+    result = response.get_json()["results"][0]
+    assert result["club"]["points"] == 11
+    assert result["competition"]["number_of_places"] == 23
+
+
+def test_refused_atomic_batch(test_app, mock_json_functions):
+    """Test that nothing is booked when a booking of the batch is refused"""
+    with test_app.test_client() as client:
+        response = client.post("/api/bookings/batch", json={"bookings": [
+            {"club": "Iron Temple", "competition": "Spring Festival",
+             "places": 3},
+            {"club": "Iron Temple", "competition": "Fall Classic",
+             "places": 3},
+        ]})
+
+    assert response.status_code == 409
+    data = response.get_json()
+    assert data["booked"] == 0
+    assert data["results"] == [
+        {"status": "refused", "error": BATCH_CANCELLED},
+        {"status": "refused",
+         "error": "The club does not have enough points"},
+    ]
+    assert mock_json_functions.get_club_by_name("Iron Temple")["points"] == 4
+
+
+def test_partial_batch(test_app, mock_json_functions):
+    """Test that the possible bookings are made when atomic is false"""
+    with test_app.test_client() as client:
+        response = client.post("/api/bookings/batch", json={
+            "atomic": False,
+            "bookings": [
+                {"club": "Iron Temple", "competition": "Spring Festival",
+                 "places": 3},
+                {"club": "Unknown", "competition": "Fall Classic",
+                 "places": 1},
+                {"club": "Iron Temple", "competition": "Fall Classic",
+                 "places": 3},
+            ],
+        })
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["booked"] == 1
+    assert data["results"][1:] == [
+        {"status": "refused", "error": "Invalid competition or club"},
+        {"status": "refused",
+         "error": "The club does not have enough points"},
+    ]
+    assert mock_json_functions.get_club_by_name("Iron Temple")["points"] == 1
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"bookings": []},
+    {"bookings": [{"club": "Simply Lift"}]},
+    {"bookings": [{"club": "Simply Lift", "competition": "Spring Festival",
+                   "places": 1}], "atomic": "no"},
+])
+def test_invalid_batch_request(test_app, mock_json_functions, body):
+    """Test that invalid batch requests are answered 400"""
+    with test_app.test_client() as client:
+        response = client.post("/api/bookings/batch", json=body)
+    assert response.status_code == 400
+
+
+def test_atomic_batch_with_negative_places(test_app, mock_json_functions):
+    """Test that an atomic batch with a negative booking is answered 400"""
+    with test_app.test_client() as client:
+        response = client.post("/api/bookings/batch", json={
+            "bookings": [
+                {"club": "Simply Lift", "competition": "Spring Festival",
+                 "places": 1},
+                {"club": "Simply Lift", "competition": "Fall Classic",
+                 "places": -50},
+            ],
+        })
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid data provided"}
+    assert mock_json_functions.get_club_by_name("Simply Lift")["points"] == 13
+
+
+@pytest.mark.parametrize("item", [
+    {"club": "Simply Lift", "competition": "Fall Classic", "places": -50},
+    {"club": "Simply Lift", "competition": "Fall Classic"},
+    "not a booking",
+])
+def test_non_atomic_batch_refuses_invalid_item(
+    test_app, mock_json_functions, item
+):
+    """
+    Test that an invalid booking of a non-atomic batch is refused, and
+    the other bookings made.
+    """
+    with test_app.test_client() as client:
+        response = client.post("/api/bookings/batch", json={
+            "atomic": False,
+            "bookings": [
+                {"club": "Simply Lift", "competition": "Spring Festival",
+                 "places": 1},
+                item,
+            ],
+        })
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["booked"] == 1
+    assert data["results"][0]["status"] == "booked"
+    assert data["results"][1]["status"] == "refused"
+    assert data["results"][1]["error"] in (
+        "Invalid data provided", "Missing required data"
+    )
+    assert mock_json_functions.get_club_by_name("Simply Lift")["points"] == 12
+
+
+def test_batch_size_is_capped(test_app, mock_json_functions):
+    """Test that a batch larger than API_MAX_BATCH_SIZE is refused"""
+    booking = {"club": "Simply Lift", "competition": "Spring Festival",
+               "places": 1}
+    with patch.dict(test_app.config, {"API_MAX_BATCH_SIZE": 1}), \
+         test_app.test_client() as client:
+        response = client.post(
+            "/api/bookings/batch", json={"bookings": [booking, booking]}
+        )
+    assert response.status_code == 400
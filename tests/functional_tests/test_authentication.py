@@ -34,3 +34,21 @@ def test_unknown_email_displays_error_message(test_app):
             follow_redirects=True
         )
         assert "Please enter a valid email" in response.data.decode("utf-8")
+
+
+########################################################
+#           EMAIL CASE AND SPACES ARE IGNORED
+########################################################
+
+
+def test_email_case_and_spaces_are_ignored(test_app):
+    """
+    Test that a known email typed with other case and spaces logs in
+    """
+    with test_app.test_client() as client:
+        response = client.post(
+            "/show_summary", 
+            data={"email": " John@SimplyLift.co "}
+        )
+        assert response.status_code == 200
+        assert "Welcome, john@simplylift.co" in response.data.decode("utf-8")
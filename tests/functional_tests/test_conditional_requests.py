@@ -0,0 +1,133 @@
+"""Functional tests for ETags and conditional GET requests."""
+
+from unittest.mock import patch
+
+
+########################################################
+#               HELPERS
+########################################################
+
+
+def _book(client, places="1"):
+    """Book places of Spring Festival for Simply Lift"""
+    client.post(
+        "/purchase_places",
+        data={
+            "club": "Simply Lift",
+            "competition": "Spring Festival",
+            "places": places
+        }
+    )
+    # Consume the flash message of the booking
+    client.get("/")
+
+
+########################################################
+#           DISPLAY POINTS CONDITIONAL REQUESTS
+########################################################
+
+
+def test_display_points_has_etag(test_app, mock_json_functions):
+    """Test that the display points page is tagged"""
+    with test_app.test_client() as client:
+        response = client.get("/display_points")
+        assert response.status_code == 200
+        assert response.get_etag() == (response.headers["ETag"][1:-1], False)
+
+
+def test_display_points_not_modified(test_app, mock_json_functions):
+    """Test that a known version is answered without rendering"""
+    with test_app.test_client() as client:
+        etag = client.get("/display_points").headers["ETag"]
+
+        with patch("server.render_template") as mock_render, \
+             patch.object(test_app.extensions["render_cache"],
+                          "get_or_render") as mock_cache:
+            response = client.get(
+                "/display_points", headers={"If-None-Match": etag}
+            )
+            mock_render.assert_not_called()
+            mock_cache.assert_not_called()
+
+        assert response.status_code == 304
+        assert response.data == b""
+        assert response.headers["ETag"] == etag
+
+
+def test_display_points_modified_after_booking(test_app, mock_json_functions):
+    """Test that a booking changes the ETag of the display points page"""
+    with test_app.test_client() as client:
+        etag = client.get("/display_points").headers["ETag"]
+        _book(client)
+
+        response = client.get(
+            "/display_points", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+
+########################################################
+#           BOOKING PAGE CONDITIONAL REQUESTS
+########################################################
+
+
+def test_booking_page_not_modified(test_app, mock_json_functions):
+    """Test that the booking page is answered 304 when unchanged"""
+    with test_app.test_client() as client:
+        url = "/book/Spring Festival/Simply Lift"
+        etag = client.get(url).headers["ETag"]
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+
+def test_booking_page_modified_after_booking(test_app, mock_json_functions):
+    """Test that booking the competition changes the booking page ETag"""
+    with test_app.test_client() as client:
+        url = "/book/Spring Festival/Simply Lift"
+        etag = client.get(url).headers["ETag"]
+        other_etag = client.get("/book/Fall Classic/She Lifts").headers["ETag"]
+        _book(client)
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert "Places available: 24" in response.data.decode("utf-8")
+
+        # Other competitions and clubs keep their version
+        response = client.get(
+            "/book/Fall Classic/She Lifts",
+            headers={"If-None-Match": other_etag}
+        )
+        assert response.status_code == 304
+
+
+def test_page_with_flash_message_is_not_tagged(test_app, mock_json_functions):
+    """Test that a page showing a flash message is always rendered"""
+    with test_app.test_client() as client:
+        client.post("/show_summary", data={"email": "unknown@example.com"})
+        response = client.get("/book/Spring Festival/Simply Lift")
+        assert "Please enter a valid email" in response.data.decode("utf-8")
+        assert "ETag" not in response.headers
+
+
+########################################################
+#           WELCOME PAGE CONDITIONAL REQUESTS
+########################################################
+
+
+def test_competitions_page_not_modified(test_app, mock_json_functions):
+    """Test that the competitions page is answered 304 when unchanged"""
+    with test_app.test_client() as client:
+        with client.session_transaction() as session:
+            session["club"] = "Simply Lift"
+        url = "/competitions/Simply Lift?upcoming=0"
+        etag = client.get(url).headers["ETag"]
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+        response = client.get(
+            "/competitions/Simply Lift", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
@@ -0,0 +1,46 @@
+"""Functional tests for the /metrics endpoint."""
+
+import pytest
+
+from metrics import BOOKINGS, METRICS
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    """Start each test without recorded metrics"""
+    METRICS.clear()
+    yield
+    METRICS.clear()
+
+
+def test_metrics_endpoint(test_app, mock_json_functions):
+    """Test that the latency of the pages is exposed at /metrics"""
+    with test_app.test_client() as client:
+        client.get("/")
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    page = response.data.decode()
+    assert (
+        'gudlft_request_duration_seconds_count'
+        '{route="/",method="GET",status="200"} 1'
+    ) in page
+    assert 'gudlft_stage_duration_seconds_count{stage="render"} 1' in page
+
+
+def test_refused_booking_is_counted(test_app, mock_json_functions):
+    """Test that a refused booking is counted with its reason"""
+    with test_app.test_client() as client:
+        response = client.post("/api/bookings", json={
+            "club": "Iron Temple",
+            "competition": "Spring Festival",
+            "places": 5
+        })
+        page = client.get("/metrics").data.decode()
+
+    assert "validate;dur=" in response.headers["Server-Timing"]
+    assert (
+        f'{BOOKINGS}{{result="refused",'
+        f'reason="The club does not have enough points"}} 1'
+    ) in page
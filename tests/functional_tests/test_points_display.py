@@ -21,10 +21,46 @@ def test_display_points(test_app):
 def test_display_points_with_no_clubs(test_app):
     """Test that the display points page is rendered with no clubs"""
     # Patch the CLUBS variable to an empty list
-    with patch('server.CLUBS', []):
+    with patch('data_manager.CLUBS', []):
         # Calling the display points page
         with test_app.test_client() as client:
             response = client.get("/display_points")
             
             # Check on the error message that is displayed
             assert "No clubs found" in response.data.decode("utf-8")
+
+
+def test_display_points_after_booking(test_app, mock_json_functions):
+    """Test that the display points page shows the points after a booking"""
+    with test_app.test_client() as client:
+        response = client.get("/display_points")
+        assert "<td>13</td>" in response.data.decode("utf-8")
+
+        client.post(
+            "/purchase_places",
+            data={
+                "club": "Simply Lift",
+                "competition": "Spring Festival",
+                "places": "2"
+            }
+        )
+
+        response = client.get("/display_points")
+        assert "<td>11</td>" in response.data.decode("utf-8")
+
+
+def test_display_points_lists_club_after_booking(
+    test_app, mock_json_functions
+):
+    """Test that the points page shows the points left after a booking"""
+    with test_app.test_client() as client:
+        client.post("/purchase_places", data={
+            "competition": "Spring Festival",
+            "club": "Simply Lift",
+            "places": "3"
+        })
+        response = client.get("/display_points")
+
+    page = response.data.decode("utf-8")
+    assert "<td>Simply Lift</td>" in page
+    assert "<td>10</td>" in page
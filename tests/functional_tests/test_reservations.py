@@ -1,6 +1,13 @@
 """Tests fonctionnels pour les réservations de places."""
 
+from copy import deepcopy
 from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from data_manager import get_obj_by_field
+from models import Club
 
 ########################################################
 # BOOKING TESTS
@@ -56,6 +63,61 @@ def test_club_points_updated_after_purchase(test_app, mock_json_functions):
     assert int(updated_competition["number_of_places"]) == int(initial_places) - 1
 
 
+def test_purchase_shows_the_records_booked(test_app, mock_json_functions):
+    """
+    Test when the club was reloaded after it was looked up: the page
+    shows the points left to the club booked.
+    """
+    def stale_lookup(key, value, list_of_dicts):
+        record = get_obj_by_field(key, value, list_of_dicts)
+        stale = deepcopy(record)
+        if isinstance(stale, Club):
+            stale["points"] = 99
+        return stale
+
+    with patch("server.get_obj_by_field", side_effect=stale_lookup), \
+         test_app.test_client() as client:
+        response = client.post(
+            "/purchase_places",
+            data={
+                "club": "Simply Lift",
+                "competition": "Spring Festival",
+                "places": "2"
+            }
+        )
+
+    assert "Points available: 11" in response.data.decode("utf-8")
+
+
+@pytest.mark.parametrize("durability", ["memory", "disk"])
+def test_purchase_is_saved_by_async_writer(
+    test_app, mock_json_functions, durability
+):
+    """
+    Test that a purchase is saved by the writer thread with ASYNC_WRITES
+    """
+    with patch.dict(test_app.config, {
+        "ASYNC_WRITES": True, "ASYNC_DURABILITY": durability
+    }), test_app.test_client() as client:
+        response = client.post(
+            "/purchase_places",
+            data={
+                "club": "Simply Lift",
+                "competition": "Spring Festival",
+                "places": "2"
+            }
+        )
+        test_app.extensions.pop("async_writer").close()
+
+    assert "Great-booking complete!" in response.data.decode("utf-8")
+    club = mock_json_functions.get_club_by_name("Simply Lift")
+    competition = mock_json_functions.get_competition_by_name(
+        "Spring Festival"
+    )
+    assert int(club["points"]) == 11
+    assert int(competition["number_of_places"]) == 23
+
+
 def test_clubs_cannot_book_past_competitions(test_app, 
                                             mock_json_functions):
     """Test that clubs cannot book past competitions"""
@@ -71,6 +133,20 @@ def test_clubs_cannot_book_past_competitions(test_app,
         )
 
         competition = mock_json_functions.get_competition_by_name("Fall Classics")
-        assert competition["date"] < datetime.now().isoformat()
+        assert competition["date"] < datetime.now()
         assert "This competition has already ended" in response.data.decode("utf-8")
 
+
+
+def test_welcome_page_lists_upcoming_competitions(test_app, 
+                                                  mock_json_functions):
+    """Test that only upcoming competitions are listed, by date"""
+
+    with test_app.test_client() as client:
+        response = client.post(
+            "/show_summary", data={"email": "john@simplylift.co"}
+        )
+
+    page = response.data.decode("utf-8")
+    assert "Fall Classics" not in page
+    assert page.index("Spring Festival") < page.index("Fall Classic")
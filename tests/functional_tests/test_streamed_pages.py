@@ -0,0 +1,99 @@
+"""Functional tests for the streaming mode of the large pages."""
+
+from unittest.mock import patch
+
+import pytest
+
+from models import Club
+
+
+########################################################
+#                   FIXTURES
+########################################################
+
+
+@pytest.fixture
+def streaming_app(test_app):
+    """The test app in streaming mode, with small chunks"""
+    with patch.dict(test_app.config,
+                    {"STREAM_PAGES": True, "STREAM_CHUNK_SIZE": 4}):
+        yield test_app
+
+
+########################################################
+#           STREAMED DISPLAY POINTS PAGE TESTS
+########################################################
+
+
+def test_display_points_is_streamed(streaming_app, mock_json_functions):
+    """Test that the display points page is streamed in chunks"""
+    clubs = [
+        Club(f"Club {i}", f"club{i}@test.com", i) for i in range(50)
+    ]
+    with patch("data_manager.CLUBS", clubs), \
+         streaming_app.test_client() as client:
+        response = client.get("/display_points", buffered=False)
+        assert response.is_streamed
+        chunks = list(response.response)
+
+    page = b"".join(chunks).decode("utf-8")
+    assert len(chunks) > 1
+    assert "<td>Club 0</td>" in page
+    assert "<td>Club 49</td>" in page
+    assert page.count("<table>") == 1
+    assert page.count("</table>") == 1
+
+
+def test_streamed_display_points_with_no_clubs(streaming_app):
+    """Test that the streamed page handles an empty list of clubs"""
+    with patch("data_manager.CLUBS", []), streaming_app.test_client() as client:
+        response = client.get("/display_points")
+        assert "No clubs found" in response.data.decode("utf-8")
+        assert "<table>" not in response.data.decode("utf-8")
+
+
+def test_streamed_page_matches_rendered_page(
+    test_app, mock_json_functions):
+    """Test that streaming does not change the page content"""
+    with test_app.test_client() as client:
+        rendered = client.get("/display_points").data
+        with patch.dict(test_app.config, {"STREAM_PAGES": True}):
+            streamed = client.get("/display_points").data
+    assert streamed == rendered
+
+
+########################################################
+#               STREAMED WELCOME PAGE TESTS
+########################################################
+
+
+def test_welcome_page_is_streamed(streaming_app, mock_json_functions):
+    """Test that the welcome page is streamed"""
+    with streaming_app.test_client() as client:
+        response = client.post(
+            "/show_summary", data={"email": "john@simplylift.co"}
+        )
+        assert response.is_streamed
+        assert "Spring Festival" in response.data.decode("utf-8")
+
+
+def test_streamed_flash_message_is_shown_once(
+    streaming_app, mock_json_functions):
+    """Test that a flash message of a streamed page is consumed"""
+    with streaming_app.test_client() as client:
+        response = client.post(
+            "/purchase_places",
+            data={
+                "club": "Simply Lift",
+                "competition": "Spring Festival",
+                "places": "1"
+            }
+        )
+        assert "Great-booking complete!" in response.data.decode("utf-8")
+
+        with client.session_transaction() as session:
+            session["club"] = "Simply Lift"
+        response = client.get("/competitions/Simply Lift")
+        page = response.data.decode("utf-8")
+        assert "Points available" in page
+        assert "Great-booking complete!" not in page
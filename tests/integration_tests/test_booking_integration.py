@@ -54,8 +54,6 @@ def _patch_environment(clubs, competitions):
     with ExitStack() as stack:
         stack.enter_context(patch("data_manager.CLUBS", clubs))
         stack.enter_context(patch("data_manager.COMPETITIONS", competitions))
-        stack.enter_context(patch("server.CLUBS", clubs))
-        stack.enter_context(patch("server.COMPETITIONS", competitions))
         # Neutralize the disk write
         stack.enter_context(patch("data_manager.save_clubs_and_competitions"))
         yield
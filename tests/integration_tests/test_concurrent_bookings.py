@@ -0,0 +1,104 @@
+"""Contention tests for the booking flow.
+
+Many threads book places through the Flask route `/purchase_places`
+at the same time. The per-competition and per-club locks of
+`data_manager.update_data_after_booking` must prevent any overselling:
+places and points never go negative and every accepted booking is
+accounted for.
+"""
+
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from models import Club, Competition
+from validators import validate_competition_date
+from server import app
+
+THREADS = 16
+REQUESTS_PER_THREAD = 20
+TOMORROW = datetime.now() + timedelta(days=1)
+
+
+def _slow_validate_competition_date(competition):
+    """Widen the window between validation and update"""
+    time.sleep(0.001)
+    return validate_competition_date(competition)
+
+
+def _hammer(clubs, competitions):
+    """
+    Book places from many threads at once.
+    Returns the places accepted per (club, competition).
+    """
+    accepted = {}
+    accepted_lock = threading.Lock()
+    barrier = threading.Barrier(THREADS)
+
+    def worker(index):
+        club = clubs[index % len(clubs)]
+        competition = competitions[index % len(competitions)]
+        barrier.wait()
+        with app.test_client() as client:
+            for _ in range(REQUESTS_PER_THREAD):
+                response = client.post("/purchase_places", data={
+                    "competition": competition["name"],
+                    "club": club["name"],
+                    "places": "2",
+                })
+                if b"Great-booking complete!" in response.data:
+                    key = (club["name"], competition["name"])
+                    with accepted_lock:
+                        accepted[key] = accepted.get(key, 0) + 2
+
+    with ExitStack() as stack:
+        stack.enter_context(patch("data_manager.CLUBS", clubs))
+        stack.enter_context(patch("data_manager.COMPETITIONS", competitions))
+        stack.enter_context(patch("data_manager.save_clubs_and_competitions"))
+        stack.enter_context(patch(
+            "data_manager.validate_competition_date",
+            side_effect=_slow_validate_competition_date,
+        ))
+        threads = [
+            threading.Thread(target=worker, args=(i,)) for i in range(THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return accepted
+
+
+def test_concurrent_bookings_never_oversell_a_competition():
+    """Many clubs book the same competition, which has few places."""
+    clubs = [
+        Club(f"Club {i}", f"club{i}@test.com", 1000) for i in range(THREADS)
+    ]
+    competitions = [Competition("Contended", TOMORROW, 30)]
+
+    accepted = _hammer(clubs, competitions)
+
+    assert competitions[0].number_of_places == 0
+    assert sum(accepted.values()) == 30
+    for club in clubs:
+        assert club.points >= 0
+
+
+def test_concurrent_bookings_never_overspend_a_club():
+    """One club books many competitions, and has few points."""
+    clubs = [Club("Club", "club@test.com", 40)]
+    competitions = [
+        Competition(f"Competition {i}", TOMORROW, 1000)
+        for i in range(THREADS)
+    ]
+
+    accepted = _hammer(clubs, competitions)
+
+    assert clubs[0].points == 0
+    assert sum(accepted.values()) == 40
+    for competition in competitions:
+        booked = accepted.get(("Club", competition["name"]), 0)
+        assert competition.number_of_places >= 0
+        assert competition.number_of_places == 1000 - booked
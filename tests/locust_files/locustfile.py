@@ -1,5 +1,60 @@
+import json
+import os
 import random
-from locust import HttpUser, task, between
+from datetime import datetime
+
+import requests
+from locust import HttpUser, events, task, between
+from locust.runners import WorkerRunner
+
+
+def load_test_data(variable, default, key):
+    """Load a data file of the app, as set in its environment"""
+    with open(os.environ.get(variable, default)) as f:
+        return json.load(f)[key]
+
+
+# The clubs and competitions the app serves, e.g. generated with
+# `flask --app server generate-data`: (name, email) of each club, and the
+# names of the competitions still open to booking
+CLUBS = [
+    (club["name"], club["email"])
+    for club in load_test_data("JSON_CLUBS", "clubs.json", "clubs")
+]
+COMPETITIONS = [
+    competition["name"]
+    for competition in load_test_data(
+        "JSON_COMPETITIONS", "competitions.json", "competitions"
+    )
+    if datetime.fromisoformat(competition["date"]) > datetime.now()
+] or ["Spring Festival"]
+
+
+@events.test_start.add_listener
+def reset_load_test_data(environment, **kwargs):
+    """
+    Reset the data of an app in load test mode (LOAD_TEST=1) before each
+    run, when LOAD_TEST_CLUBS is set: the bookings of the previous runs
+    are dropped, and every booking can succeed again.
+    The sizes and LOAD_TEST_SEED must be those of the data files read
+    above, e.g. generated with `flask --app server generate-data
+    --load-test`.
+    """
+    if "LOAD_TEST_CLUBS" not in os.environ or \
+            isinstance(environment.runner, WorkerRunner):
+        return
+    response = requests.post(
+        f"{environment.host}/_load_test/reset",
+        json={
+            "clubs": int(os.environ["LOAD_TEST_CLUBS"]),
+            "competitions": int(
+                os.environ.get("LOAD_TEST_COMPETITIONS", "100")
+            ),
+            "seed": int(os.environ.get("LOAD_TEST_SEED", "0")),
+        },
+        timeout=300,
+    )
+    response.raise_for_status()
 
 
 class GudLFTUser(HttpUser):
@@ -10,20 +65,11 @@ class GudLFTUser(HttpUser):
     def on_start(self):
         """Actions to perform when a user starts"""
         # Data to be loaded
-        self.test_emails = [
-            "john@simplylift.co",
-            "admin@irontemple.com",
-            "kate@shelifts.co.uk"
-        ]
-        self.test_clubs = [
-            "Simply Lift",
-            "Iron Temple",
-            "She Lifts"
-        ]
-        self.test_competitions = [
-            "Spring Festival",
-            "Fall Classic"
-        ]
+        self.test_emails = [email for _, email in random.sample(
+            CLUBS, min(len(CLUBS), 100)
+        )]
+        self.test_clubs = CLUBS
+        self.test_competitions = COMPETITIONS
         
     @task(3)
     def visit_homepage(self):
@@ -40,18 +86,19 @@ class GudLFTUser(HttpUser):
 
     @task
     def book_places(self):
-        club = random.choice(self.test_clubs)
+        club, _ = random.choice(self.test_clubs)
         competition = random.choice(self.test_competitions)
-        self.client.post(f"/book/{competition}/{club}")
+        self.client.get(
+            f"/book/{competition}/{club}", name="/book/[competition]/[club]"
+        )
 
     @task(1)
     def make_booking(self):
-        club = random.choice(self.test_clubs)
+        club, email = random.choice(self.test_clubs)
         competition = random.choice(self.test_competitions)
         places = random.randint(1, 12)
 
         # First the user needs to login
-        email = next(email for email in self.test_emails if email.split("@")[0] in club.lower())
         self.client.post("/show_summary", data={"email": email})
 
         # Then the user can book places
@@ -79,10 +126,11 @@ class StressTestUser(HttpUser):
 
     @task(5)
     def concurrent_bookings(self):
-        self.client.post("/show_summary", data={"email": "john@simplylift.co"})
+        club, email = random.choice(CLUBS)
+        self.client.post("/show_summary", data={"email": email})
         self.client.post("/purchase_places", data={
-            "club": "Simply Lift",
-            "competition": "Spring Festival",
+            "club": club,
+            "competition": random.choice(COMPETITIONS),
             "places": "1"
         })
 
@@ -90,8 +138,8 @@ class StressTestUser(HttpUser):
 class LoadTestConfig:
 
     @staticmethod
-    def get_test_emails():
-        """Returns the tests configurations"""
+    def get_profiles():
+        """Returns the load profiles run by slo_gate.py"""
         return {
             "normal_load": {
                 "users": 10,
@@ -0,0 +1,312 @@
+"""Saturation sweep: where the app stops serving more requests.
+
+For each server configuration, starts the app on generated load test
+data (or a copy of its data), runs the users of locustfile.py with a load
+growing by steps (sweep_locustfile.py), and records the throughput,
+latency and error rate of each step. The saturation point is the last
+step after which the throughput grew by less than --min-gain.
+Writes a CSV and an HTML chart per configuration to --output.
+
+Configurations: "dev" is Flask's threaded server, "WxT" gunicorn with W
+workers of T threads (sharing the data with SHARED_STATE=1).
+
+Usage: python tests/locust_files/saturation.py --configs dev,1x8,4x8
+       [--step-users 10 --step-seconds 30 --max-users 200]
+       [--clubs 10000 --competitions 500] [--output reports/saturation]
+"""
+
+import argparse
+import csv
+import html
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+LOCUST_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(LOCUST_DIR))
+
+from slo_gate import (  # noqa: E402
+    PERCENTILES,
+    PROJECT_ROOT,
+    flask_command,
+    number,
+    prepare_data,
+    running_app
+)
+
+SWEEP_LOCUSTFILE = LOCUST_DIR / "sweep_locustfile.py"
+
+STEP_FIELDS = ("users", "rps", "error_rate") + tuple(PERCENTILES)
+
+
+########################################################
+# SWEEP
+########################################################
+
+
+def server_command(config: str):
+    """Return the function giving the server command of a configuration"""
+    if config == "dev":
+        return flask_command
+    workers, threads = (int(n) for n in config.split("x"))
+
+    def gunicorn_command(port):
+        return [sys.executable, "-m", "gunicorn",
+                "--workers", str(workers), "--threads", str(threads),
+                "--bind", f"127.0.0.1:{port}", "server:app"]
+
+    return gunicorn_command
+
+
+def run_sweep(host: str, csv_prefix: str, env: dict):
+    """Run the step load against `host`, saving its history as CSV"""
+    subprocess.run(
+        [sys.executable, "-m", "locust", "-f", str(SWEEP_LOCUSTFILE),
+         "--headless", "--only-summary",
+         "--host", host,
+         "--csv", csv_prefix,
+         "--exit-code-on-error", "0"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        check=True,
+    )
+
+
+########################################################
+# ANALYSIS
+########################################################
+
+
+def mean(values: list) -> float | None:
+    """Return the mean of the values, ignoring the missing ones"""
+    values = [value for value in values if value is not None]
+    return sum(values) / len(values) if values else None
+
+
+def read_steps(history_file: str, warmup: float = 10) -> list:
+    """
+    Return the users, requests per second, error rate and p50/p95/p99
+    (in ms) of each step of a Locust stats history CSV, averaged over
+    the step once `warmup` seconds passed (the latencies being those of
+    the last seconds, they first include the previous step).
+    """
+    rows_by_users = {}
+    with open(history_file, newline="") as f:
+        for row in csv.DictReader(f):
+            if row["Name"] != "Aggregated" or int(row["User Count"]) == 0:
+                continue
+            rows_by_users.setdefault(int(row["User Count"]), []).append(row)
+
+    steps = []
+    for users, rows in sorted(rows_by_users.items()):
+        start = int(rows[0]["Timestamp"])
+        steady = [
+            row for row in rows if int(row["Timestamp"]) - start >= warmup
+        ] or rows
+        rps = mean([number(row["Requests/s"]) for row in steady]) or 0.0
+        failures = mean([number(row["Failures/s"]) for row in steady]) or 0.0
+        steps.append({
+            "users": users,
+            "rps": rps,
+            "error_rate": failures / rps if rps else 0.0,
+            **{
+                name: mean([number(row[column]) for row in steady])
+                for name, column in PERCENTILES.items()
+            },
+        })
+    return steps
+
+
+def find_saturation(steps: list, min_gain: float = 0.05) -> dict | None:
+    """
+    Return the step after which the throughput grew by less than
+    `min_gain`, None if it never stopped growing.
+    """
+    for step, following in zip(steps, steps[1:]):
+        if following["rps"] < step["rps"] * (1 + min_gain):
+            return step
+    return None
+
+
+########################################################
+# REPORT
+########################################################
+
+
+def write_csv(steps: list, path: Path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=STEP_FIELDS)
+        writer.writeheader()
+        writer.writerows(steps)
+
+
+def svg_chart(points: list, title: str, unit: str, mark=None,
+              width: int = 600, height: int = 300) -> str:
+    """
+    Return an SVG line chart of the (users, value) `points`, with the
+    users `mark` shown by a vertical line.
+    """
+    points = [(x, y) for x, y in points if y is not None]
+    if not points:
+        return f"<p>{html.escape(title)}: no data</p>"
+    margin = 50
+    max_x = max(x for x, _ in points) or 1
+    max_y = max(y for _, y in points) or 1
+
+    def position(x, y):
+        return (
+            margin + x / max_x * (width - 2 * margin),
+            height - margin - y / max_y * (height - 2 * margin),
+        )
+
+    line = " ".join(
+        "{:.1f},{:.1f}".format(*position(x, y)) for x, y in points
+    )
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+        f'height="{height}">',
+        f'<text x="{width / 2}" y="20" text-anchor="middle">'
+        f'{html.escape(title)}</text>',
+        f'<line x1="{margin}" y1="{height - margin}" x2="{width - margin}" '
+        f'y2="{height - margin}" stroke="black"/>',
+        f'<line x1="{margin}" y1="{margin}" x2="{margin}" '
+        f'y2="{height - margin}" stroke="black"/>',
+        f'<text x="{width / 2}" y="{height - 10}" text-anchor="middle">'
+        f'users (max {max_x})</text>',
+        f'<text x="5" y="{margin - 10}">{max_y:.1f} {unit}</text>',
+        f'<polyline points="{line}" fill="none" stroke="steelblue" '
+        f'stroke-width="2"/>',
+    ]
+    if mark is not None:
+        x, _ = position(mark, 0)
+        parts.append(
+            f'<line x1="{x:.1f}" y1="{margin}" x2="{x:.1f}" '
+            f'y2="{height - margin}" stroke="red" stroke-dasharray="4"/>'
+        )
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def write_html(config: str, steps: list, saturation: dict | None,
+               path: Path):
+    """Write the charts and table of the steps of a configuration"""
+    mark = saturation and saturation["users"]
+    if saturation:
+        summary = (
+            f"Saturated at {saturation['users']} users, "
+            f"{saturation['rps']:.1f} requests/s"
+        )
+    elif steps:
+        summary = (
+            f"Throughput still growing at {steps[-1]['users']} users: "
+            f"raise --max-users"
+        )
+    else:
+        summary = "No data"
+    rows = "\n".join(
+        "<tr>" + "".join(
+            f"<td>{step[field]:.2f}</td>" if isinstance(step[field], float)
+            else f"<td>{step[field] if step[field] is not None else '-'}</td>"
+            for field in STEP_FIELDS
+        ) + "</tr>"
+        for step in steps
+    )
+    header = "".join(f"<th>{field}</th>" for field in STEP_FIELDS)
+    with open(path, "w") as f:
+        f.write(f"""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Saturation: {html.escape(config)}</title>
+</head>
+<body>
+<h1>Saturation sweep: {html.escape(config)}</h1>
+<p>{summary}</p>
+{svg_chart([(s["users"], s["rps"]) for s in steps],
+           "Throughput", "req/s", mark)}
+{svg_chart([(s["users"], s["p95"]) for s in steps],
+           "p95 latency", "ms", mark)}
+<table border="1">
+<tr>{header}</tr>
+{rows}
+</table>
+</body>
+</html>
+""")
+
+
+########################################################
+# MAIN
+########################################################
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--configs", default="dev",
+                        help="comma-separated server configurations: dev "
+                             "or WxT (default: dev)")
+    parser.add_argument("--step-users", type=int, default=10,
+                        help="users added at each step (default: 10)")
+    parser.add_argument("--step-seconds", type=int, default=30,
+                        help="duration of a step (default: 30)")
+    parser.add_argument("--max-users", type=int, default=200,
+                        help="users of the last step (default: 200)")
+    parser.add_argument("--min-gain", type=float, default=0.05,
+                        help="throughput gain under which a step is "
+                             "saturated (default: 0.05)")
+    parser.add_argument("--clubs", type=int, default=1000,
+                        help="generated clubs (default: 1000), 0 to test "
+                             "on a copy of the configured data instead")
+    parser.add_argument("--competitions", type=int, default=100,
+                        help="generated competitions (default: 100)")
+    parser.add_argument("--output", default="reports/saturation",
+                        help="report directory (default: "
+                             "reports/saturation)")
+    args = parser.parse_args()
+    configs = args.configs.split(",")
+    # Checked before any sweep, rather than when its server fails to start
+    if any(config != "dev" for config in configs) and \
+            importlib.util.find_spec("gunicorn") is None:
+        parser.error("the WxT configurations run gunicorn, which is not "
+                     "installed (pip install gunicorn)")
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+
+    print(f"{'config':<10} {'users':>6} {'req/s':>9} {'p95 (ms)':>9}")
+    for config in configs:
+        command = server_command(config)
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                **prepare_data(directory, args.clubs, args.competitions),
+                "SWEEP_STEP_USERS": str(args.step_users),
+                "SWEEP_STEP_SECONDS": str(args.step_seconds),
+                "SWEEP_MAX_USERS": str(args.max_users),
+            }
+            if config != "dev" and int(config.split("x")[0]) > 1:
+                env["SHARED_STATE"] = "1"
+            csv_prefix = os.path.join(directory, "locust")
+            log_file = os.path.join(directory, "app.log")
+            with running_app(env, log_file, command) as host:
+                run_sweep(host, csv_prefix, env)
+            steps = read_steps(
+                csv_prefix + "_stats_history.csv",
+                warmup=min(10, args.step_seconds / 2)
+            )
+
+        saturation = find_saturation(steps, args.min_gain)
+        write_csv(steps, output / f"{config}.csv")
+        write_html(config, steps, saturation, output / f"{config}.html")
+        if saturation:
+            p95 = saturation["p95"]
+            print(f"{config:<10} {saturation['users']:>6} "
+                  f"{saturation['rps']:>9.1f} "
+                  f"{p95 if p95 is not None else float('nan'):>9.1f}")
+        else:
+            print(f"{config:<10} not saturated")
+    print(f"Reports written to {output}")
+
+
+if __name__ == "__main__":
+    main()
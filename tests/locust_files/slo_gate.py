@@ -0,0 +1,349 @@
+"""Headless load test gating a release on its latency and error SLOs.
+
+Starts the app on generated load test data (or a copy of its data),
+runs a load profile of `LoadTestConfig` with Locust in headless mode,
+then checks for each endpoint:
+- its p50/p95/p99 latencies and error rate against the thresholds of
+  the SLO file (slo.json by default),
+- that it is not slower than the stored baseline of the profile by more
+  than --tolerance, nor failing more often.
+Exits with 1 if a check failed.
+
+Usage: python tests/locust_files/slo_gate.py normal_load
+       [--run-time 1m] [--clubs 10000 --competitions 500]
+       [--slo slo.json] [--baseline FILE] [--update-baseline]
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+
+LOCUST_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = LOCUST_DIR.parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import config  # noqa: E402
+from data_manager import create_storage  # noqa: E402
+from dataset import LOAD_TEST_CAPACITY, generate_dataset  # noqa: E402
+
+LOCUSTFILE = LOCUST_DIR / "locustfile.py"
+SLO_FILE = LOCUST_DIR / "slo.json"
+BASELINES_DIR = LOCUST_DIR / "baselines"
+
+PERCENTILES = {"p50": "50%", "p95": "95%", "p99": "99%"}
+
+# Endpoints with fewer requests are not compared with the baseline,
+# their percentiles being too noisy
+MIN_REQUESTS = 20
+# Latency (in ms) an endpoint may gain on the baseline whatever the
+# tolerance, for the fastest endpoints
+SLACK_MS = 5
+# Error rate an endpoint may gain on the baseline
+ERROR_RATE_SLACK = 0.01
+
+
+########################################################
+# DATA & APP
+########################################################
+
+
+def prepare_data(directory: str, clubs: int = 0, competitions: int = 0,
+                 seed: int = 0) -> dict:
+    """
+    Write the data the app is tested on to `directory`: generated for
+    load tests if `clubs` is set (so the bookings succeed, and can be
+    reset at the start of each run), else a copy of the configured data
+    files.
+    Return the environment pointing the app and the locustfile to it.
+    """
+    settings = {
+        "STORAGE_BACKEND": "json",
+        "JSON_CLUBS": os.path.join(directory, "clubs.json"),
+        "JSON_COMPETITIONS": os.path.join(directory, "competitions.json"),
+        "JSON_JOURNAL": os.path.join(directory, "bookings.journal"),
+        "SQLITE_DATABASE": os.path.join(directory, "gudlft.db"),
+    }
+    if clubs:
+        create_storage(settings).replace(*generate_dataset(
+            clubs, competitions, seed, capacity=LOAD_TEST_CAPACITY
+        ))
+        settings.update(
+            LOAD_TEST="1",
+            LOAD_TEST_CLUBS=str(clubs),
+            LOAD_TEST_COMPETITIONS=str(competitions),
+            LOAD_TEST_SEED=str(seed),
+        )
+    else:
+        shutil.copy(config["default"].JSON_CLUBS, settings["JSON_CLUBS"])
+        shutil.copy(
+            config["default"].JSON_COMPETITIONS,
+            settings["JSON_COMPETITIONS"]
+        )
+    return settings
+
+
+def free_port() -> int:
+    """Return a free TCP port"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def flask_command(port: int) -> list:
+    """Return the command serving the app with Flask's server"""
+    return [sys.executable, "-m", "flask", "--app", "server", "run",
+            "--port", str(port), "--no-reload", "--no-debugger"]
+
+
+@contextmanager
+def running_app(env: dict, log_file: str, command=flask_command,
+                timeout: float = 30):
+    """
+    Run the app in the background with the server `command(port)`, and
+    yield its URL once it answers.
+    """
+    port = free_port()
+    host = f"http://127.0.0.1:{port}"
+    with open(log_file, "w") as log:
+        process = subprocess.Popen(
+            command(port),
+            cwd=PROJECT_ROOT,
+            env={**env, "FLASK_DEBUG": "0"},
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise SystemExit(
+                    f"The app exited: see {log_file}\n"
+                    + Path(log_file).read_text()
+                )
+            try:
+                urllib.request.urlopen(host, timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise SystemExit(f"The app did not start: see {log_file}")
+                time.sleep(0.2)
+        yield host
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def run_locust(host: str, profile: dict, csv_prefix: str, env: dict):
+    """Run the load profile against `host`, saving its stats as CSV"""
+    subprocess.run(
+        [sys.executable, "-m", "locust", "-f", str(LOCUSTFILE),
+         "--headless", "--only-summary",
+         "--host", host,
+         "--users", str(profile["users"]),
+         "--spawn-rate", str(profile["spawn_rate"]),
+         "--run-time", profile["run_time"],
+         "--csv", csv_prefix,
+         # The failures are checked against the SLOs instead
+         "--exit-code-on-error", "0"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        check=True,
+    )
+
+
+########################################################
+# CHECKS
+########################################################
+
+
+def number(value: str) -> float | None:
+    """Return a number of the Locust CSV, None for "N/A" """
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def read_stats(stats_file: str) -> dict:
+    """
+    Return the requests, p50/p95/p99 (in ms) and error rate of each
+    endpoint ("METHOD /name", and "Aggregated") of a Locust stats CSV.
+    """
+    stats = {}
+    with open(stats_file, newline="") as f:
+        for row in csv.DictReader(f):
+            endpoint = f"{row['Type']} {row['Name']}".strip()
+            requests = int(row["Request Count"])
+            failures = int(row["Failure Count"])
+            stats[endpoint] = {
+                "requests": requests,
+                "error_rate": failures / requests if requests else 0.0,
+                **{
+                    name: number(row[column])
+                    for name, column in PERCENTILES.items()
+                },
+            }
+    return stats
+
+
+def check_slos(stats: dict, slos: dict) -> list:
+    """
+    Return the SLO violations of the stats: the thresholds of
+    slos["endpoints"][endpoint], or else slos["default"].
+    """
+    violations = []
+    for endpoint, values in stats.items():
+        thresholds = {
+            **slos.get("default", {}),
+            **slos.get("endpoints", {}).get(endpoint, {}),
+        }
+        for name, limit in thresholds.items():
+            value = values.get(name)
+            if value is not None and value > limit:
+                violations.append(
+                    f"{endpoint}: {name} {value:g} above the SLO {limit:g}"
+                )
+    return violations
+
+
+def compare_with_baseline(
+    stats: dict, baseline: dict, tolerance: float
+) -> list:
+    """
+    Return the regressions of the stats: endpoints slower than in the
+    baseline by more than `tolerance` (and SLACK_MS), or failing more
+    often by more than ERROR_RATE_SLACK.
+    """
+    regressions = []
+    for endpoint, values in stats.items():
+        before = baseline.get(endpoint)
+        if before is None or min(
+            values["requests"], before["requests"]
+        ) < MIN_REQUESTS:
+            continue
+        for name in PERCENTILES:
+            if values[name] is None or before[name] is None:
+                continue
+            limit = before[name] * (1 + tolerance) + SLACK_MS
+            if values[name] > limit:
+                regressions.append(
+                    f"{endpoint}: {name} {values[name]:g} ms against "
+                    f"{before[name]:g} ms in the baseline"
+                )
+        if values["error_rate"] > before["error_rate"] + ERROR_RATE_SLACK:
+            regressions.append(
+                f"{endpoint}: error rate {values['error_rate']:.2%} against "
+                f"{before['error_rate']:.2%} in the baseline"
+            )
+    return regressions
+
+
+def print_stats(stats: dict):
+    print(f"{'endpoint':<40} {'requests':>9} {'p50':>7} {'p95':>7} "
+          f"{'p99':>7} {'errors':>8}")
+    for endpoint, values in stats.items():
+        latencies = " ".join(
+            f"{values[name]:>7g}" if values[name] is not None else
+            f"{'-':>7}"
+            for name in PERCENTILES
+        )
+        print(f"{endpoint:<40} {values['requests']:>9} {latencies} "
+              f"{values['error_rate']:>8.2%}")
+
+
+########################################################
+# GATE
+########################################################
+
+
+def load_profiles() -> dict:
+    """Return the load profiles of the locustfile"""
+    sys.path.insert(0, str(LOCUST_DIR))
+    from locustfile import LoadTestConfig
+    return LoadTestConfig.get_profiles()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("profile", help="profile of LoadTestConfig "
+                                        "(normal_load, high_load...)")
+    parser.add_argument("--run-time",
+                        help="run time overriding the profile's, e.g. 1m")
+    parser.add_argument("--clubs", type=int, default=1000,
+                        help="generated clubs (default: 1000), 0 to test "
+                             "on a copy of the configured data instead")
+    parser.add_argument("--competitions", type=int, default=100,
+                        help="generated competitions (default: 100)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the generated data (default: 0)")
+    parser.add_argument("--slo", default=str(SLO_FILE),
+                        help="SLO thresholds file (default: slo.json)")
+    parser.add_argument("--baseline",
+                        help="baseline stats file (default: "
+                             "baselines/<profile>.json)")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="latency increase allowed against the "
+                             "baseline (default: 0.2)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="save the stats of this run as the baseline")
+    args = parser.parse_args()
+    baseline_file = Path(
+        args.baseline or BASELINES_DIR / f"{args.profile}.json"
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            **prepare_data(
+                directory, args.clubs, args.competitions, args.seed
+            ),
+        }
+        # The locustfile reads the data the app is tested on
+        os.environ.update(env)
+        profiles = load_profiles()
+        if args.profile not in profiles:
+            parser.error(f"unknown profile {args.profile!r}, "
+                         f"choose from {', '.join(profiles)}")
+        profile = dict(profiles[args.profile])
+        if args.run_time:
+            profile["run_time"] = args.run_time
+
+        csv_prefix = os.path.join(directory, "locust")
+        with running_app(env, os.path.join(directory, "app.log")) as host:
+            run_locust(host, profile, csv_prefix, env)
+        stats = read_stats(csv_prefix + "_stats.csv")
+
+    print_stats(stats)
+    with open(args.slo) as f:
+        failures = check_slos(stats, json.load(f))
+    if baseline_file.exists():
+        with open(baseline_file) as f:
+            failures += compare_with_baseline(
+                stats, json.load(f)["stats"], args.tolerance
+            )
+    else:
+        print(f"No baseline at {baseline_file}: only the SLOs are checked")
+
+    if args.update_baseline:
+        baseline_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_file, "w") as f:
+            json.dump({"profile": profile, "stats": stats}, f, indent=2)
+        print(f"Baseline saved to {baseline_file}")
+
+    for failure in failures:
+        print(f"FAILED {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Locustfile of the saturation sweep (see saturation.py).
+
+Runs the users of locustfile.py with a load growing by steps, set in the
+environment:
+- SWEEP_STEP_USERS users are added at each step (default: 10),
+- every SWEEP_STEP_SECONDS seconds (default: 30),
+- up to SWEEP_MAX_USERS users (default: 200), after which it stops.
+"""
+
+import os
+
+from locust import LoadTestShape
+
+from locustfile import GudLFTUser, StressTestUser  # noqa: F401
+
+
+class StepLoadShape(LoadTestShape):
+    """Add `step_users` users every `step_seconds`, up to `max_users`"""
+
+    step_users = int(os.environ.get("SWEEP_STEP_USERS", "10"))
+    step_seconds = int(os.environ.get("SWEEP_STEP_SECONDS", "30"))
+    max_users = int(os.environ.get("SWEEP_MAX_USERS", "200"))
+
+    def tick(self):
+        step = int(self.get_run_time() // self.step_seconds)
+        users = (step + 1) * self.step_users
+        if users > self.max_users:
+            return None
+        # The users of the step are all started within a second
+        return users, self.step_users
@@ -1,6 +1,6 @@
 import pytest
 import os
-from config import Config, config
+from config import BASE_DIR, Config, config
 from unittest.mock import patch
 
 
@@ -53,6 +53,89 @@ class TestConfig:
             config_obj = Config()
             assert config_obj.RUN_PORT == "8080"
     
+    def test_persistence_mode_is_snapshot_by_default(self):
+        """Test the default persistence mode"""
+        with patch.dict(os.environ, {}, clear=True):
+            config_obj = Config()
+            assert config_obj.PERSISTENCE_MODE == "snapshot"
+            assert config_obj.JOURNAL_COMPACT_EVERY == 1000
+
+    def test_persistence_mode_is_loaded_from_env(self):
+        """Test the persistence mode from environment variables"""
+        with patch.dict(os.environ, {"PERSISTENCE_MODE": "journal"}, clear=True):
+            config_obj = Config()
+            assert config_obj.PERSISTENCE_MODE == "journal"
+
+    def test_group_commit_is_disabled_by_default(self):
+        """Test the default group commit window"""
+        with patch.dict(os.environ, {}, clear=True):
+            config_obj = Config()
+            assert config_obj.GROUP_COMMIT_WINDOW == 0
+
+    def test_async_writes_are_disabled_by_default(self):
+        """Test that bookings are saved by the request thread by default"""
+        with patch.dict(os.environ, {}, clear=True):
+            config_obj = Config()
+            assert config_obj.ASYNC_WRITES is False
+            assert config_obj.ASYNC_DURABILITY == "memory"
+            assert config_obj.ASYNC_QUEUE_SIZE == 1000
+
+    def test_storage_backend_is_json_by_default(self):
+        """Test the default storage backend"""
+        with patch.dict(os.environ, {}, clear=True):
+            config_obj = Config()
+            assert config_obj.STORAGE_BACKEND == "json"
+            assert config_obj.SQLITE_DATABASE == str(BASE_DIR / "gudlft.db")
+
+    def test_data_files_are_next_to_the_app(self):
+        """Test the default data files, whatever the working directory"""
+        with patch.dict(os.environ, {}, clear=True):
+            config_obj = Config()
+            assert config_obj.JSON_CLUBS == str(BASE_DIR / "clubs.json")
+            assert config_obj.JSON_COMPETITIONS == str(
+                BASE_DIR / "competitions.json"
+            )
+
+    def test_data_files_are_loaded_from_env(self):
+        """Test the data files from environment variables"""
+        with patch.dict(
+            os.environ, {"JSON_CLUBS": "/data/clubs.json"}, clear=True
+        ):
+            config_obj = Config()
+            assert config_obj.JSON_CLUBS == "/data/clubs.json"
+
+    def test_profiling_is_disabled_by_default(self):
+        """Test that no request is profiled by default"""
+        with patch.dict(os.environ, {}, clear=True):
+            config_obj = Config()
+            assert config_obj.PROFILE_DIR == ""
+            assert config_obj.PROFILE_ROUTES == ()
+
+    def test_profiled_routes_are_loaded_from_env(self):
+        """Test the profiled routes from environment variables"""
+        with patch.dict(
+            os.environ,
+            {"PROFILE_ROUTES": "/purchase_places, /show_summary"},
+            clear=True
+        ):
+            config_obj = Config()
+            assert config_obj.PROFILE_ROUTES == (
+                "/purchase_places", "/show_summary"
+            )
+
+    def test_load_test_is_disabled_by_default(self):
+        """Test that the data cannot be reset by default"""
+        with patch.dict(os.environ, {}, clear=True):
+            assert Config().LOAD_TEST is False
+        with patch.dict(os.environ, {"LOAD_TEST": "1"}, clear=True):
+            assert Config().LOAD_TEST is True
+
+    def test_competitions_page_size_is_default(self):
+        """Test the default number of competitions per page"""
+        with patch.dict(os.environ, {}, clear=True):
+            config_obj = Config()
+            assert config_obj.COMPETITIONS_PAGE_SIZE == 20
+
     def test_testing_mode_is_false_by_default(self):
         """Test the default testing mode"""
         config_obj = Config()
@@ -1,17 +1,62 @@
 import pytest
 from unittest.mock import patch, mock_open, MagicMock
+import base64
 import json
+import os
+import stat
+import subprocess
+import sys
+import threading
+from contextlib import contextmanager
 from copy import deepcopy
+from datetime import datetime, timedelta
 from flask import Flask
 
 import data_manager
+from models import Club, Competition
 from data_manager import (
+    NEW_FILE_MODE,
     load_data,
+    refresh_data,
+    write_app_bookings,
     save_json,
     get_obj_by_field,
+    build_index,
+    get_index,
+    get_email_index,
     update_clubs_and_competitions,
     save_clubs_and_competitions,
-    update_data_after_booking
+    book_places,
+    update_data_after_booking,
+    update_data_after_bookings,
+    BATCH_CANCELLED,
+    append_to_journal,
+    read_journal_tail,
+    replay_journal,
+    compact_journal,
+    persist_booking,
+    GroupCommitter,
+    AsyncWriter,
+    booking_lock,
+    get_lock,
+    create_storage,
+    JsonStorage,
+    SqliteStorage,
+    CompetitionCalendar,
+    get_calendar,
+    encode_cursor,
+    decode_cursor,
+    get_competitions_page,
+    encode_name_cursor,
+    decode_name_cursor,
+    get_clubs_page,
+    get_clubs,
+    get_competitions,
+    get_data_version,
+    get_object_version,
+    init_data,
+    reset_data,
+    DataWatcher
 )
 
 
@@ -58,39 +103,309 @@ def test_file_not_found():
 ########################################################
 
 
-def test_save_clubs_data():
+def test_save_clubs_data(tmp_path):
     """
     Test when the clubs data is saved to the file.
     """
     mock_data = [{"name": "Test Club", "email": "test@test.com"}]
-    mock_file = mock_open()
-    with patch("builtins.open", mock_file), \
-        patch("json.dump") as mock_dump:
-        save_json("clubs.json", mock_data, "clubs")
-
-        mock_file.assert_called_once_with("clubs.json", "w")
-        handle = mock_file()
-        expected_data = {"clubs": mock_data}
-        mock_dump.assert_called_once_with(
-            expected_data, handle, ensure_ascii=True, indent=4
-        )
+    file_path = tmp_path / "clubs.json"
+    save_json(str(file_path), mock_data, "clubs")
+
+    assert file_path.read_text() == json.dumps(
+        {"clubs": mock_data}, ensure_ascii=True, indent=4
+    )
+    assert [p.name for p in tmp_path.iterdir()] == ["clubs.json"]
 
 
-def test_save_competitions_data():
+def test_save_competitions_data(tmp_path):
     """
     Test when the competitions data is saved to the file.
     """
     mock_data = [{"name": "Test Comp", "date": "2024-01-01"}]
-    mock_file = mock_open()
-    with patch("builtins.open", mock_file), patch("json.dump") as mock_dump:
-        save_json("competitions.json", mock_data, "competitions")
-
-        mock_file.assert_called_once_with("competitions.json", "w")
-        handle = mock_file()
-        expected_data = {"competitions": mock_data}
-        mock_dump.assert_called_once_with(
-            expected_data, handle, ensure_ascii=True, indent=4
-        )
+    file_path = tmp_path / "competitions.json"
+    save_json(str(file_path), mock_data, "competitions")
+
+    assert load_data(str(file_path), "competitions") == mock_data
+
+
+def test_save_json_is_atomic(tmp_path):
+    """
+    Test when the write fails: the previous file is left untouched.
+    """
+    file_path = tmp_path / "clubs.json"
+    save_json(str(file_path), [{"name": "Old Club"}], "clubs")
+    before = file_path.read_text()
+
+    with patch("json.dump", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            save_json(str(file_path), [{"name": "New Club"}], "clubs")
+
+    assert file_path.read_text() == before
+    assert [p.name for p in tmp_path.iterdir()] == ["clubs.json"]
+
+
+def test_save_json_syncs_before_replacing(tmp_path):
+    """
+    Test when the file is saved: it is synced before being renamed.
+    """
+    calls = []
+    with patch("os.fsync", side_effect=lambda fd: calls.append("fsync")), \
+         patch("os.replace", side_effect=lambda *a: calls.append("replace")):
+        save_json(str(tmp_path / "clubs.json"), [], "clubs")
+    assert calls[:2] == ["fsync", "replace"]
+
+
+
+def test_save_json_keeps_the_file_mode(tmp_path):
+    """
+    Test when a file is saved again: it keeps its permissions, not
+    those of the temporary file.
+    """
+    file_path = tmp_path / "clubs.json"
+    save_json(str(file_path), [], "clubs")
+    file_path.chmod(0o644)
+
+    save_json(str(file_path), [{"name": "New Club"}], "clubs")
+
+    assert stat.S_IMODE(file_path.stat().st_mode) == 0o644
+
+
+def test_save_json_creates_file_with_default_mode(tmp_path):
+    """
+    Test when a file is saved for the first time: it has the mode of a
+    file created under the umask.
+    """
+    file_path = tmp_path / "clubs.json"
+
+    save_json(str(file_path), [], "clubs")
+
+    assert stat.S_IMODE(file_path.stat().st_mode) == NEW_FILE_MODE
+
+########################################################
+#                 GROUP COMMIT TESTS
+########################################################
+
+
+def test_group_commit_batches_concurrent_saves():
+    """
+    Test when several saves are requested within the window.
+    """
+    flushes = []
+    committer = GroupCommitter(lambda: flushes.append(1), window=0.2)
+    threads = [threading.Thread(target=committer.commit) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(flushes) == 1
+
+
+def test_group_commit_returns_after_flush():
+    """
+    Test when a save is committed: the flush is done when it returns.
+    """
+    flushes = []
+    committer = GroupCommitter(lambda: flushes.append(1), window=0)
+    committer.commit()
+    assert flushes == [1]
+    committer.commit()
+    assert flushes == [1, 1]
+
+
+def test_group_commit_raises_flush_error():
+    """
+    Test when the flush fails: every caller of the batch gets the error.
+    """
+    def flush():
+        raise OSError("disk full")
+
+    committer = GroupCommitter(flush, window=0)
+    with pytest.raises(OSError):
+        committer.commit()
+
+
+def test_persist_booking_with_group_commit(journal_app):
+    """
+    Test when group commit is enabled in snapshot mode.
+    """
+    journal_app.config["PERSISTENCE_MODE"] = "snapshot"
+    journal_app.config["GROUP_COMMIT_WINDOW"] = 0.01
+    journal_app.extensions = {}
+    with patch("data_manager.save_clubs_and_competitions") as mock_save:
+        persist_booking(journal_app, {"name": "Comp A"}, {"name": "Club A"}, 1)
+        mock_save.assert_called_once()
+    assert isinstance(
+        journal_app.extensions["group_committer"], GroupCommitter
+    )
+
+
+########################################################
+#                 ASYNC WRITES TESTS
+########################################################
+
+
+def test_async_writer_saves_from_its_thread():
+    """
+    Test when bookings are submitted: they are saved by the writer
+    thread, not the caller's.
+    """
+    writes = []
+    writer = AsyncWriter(
+        lambda bookings: writes.append(
+            (bookings, threading.current_thread().name)
+        ),
+        queue_size=10,
+    )
+    writer.submit(["booking"])
+    writer.flush()
+    writer.close()
+    assert writes == [(["booking"], "async-writer")]
+
+
+def test_async_writer_groups_queued_bookings():
+    """
+    Test when bookings are queued during a save: the next save writes
+    them all at once.
+    """
+    writes = []
+    saving = threading.Event()
+    release = threading.Event()
+
+    def write(bookings):
+        writes.append(bookings)
+        saving.set()
+        release.wait()
+
+    writer = AsyncWriter(write, queue_size=10)
+    writer.submit(["a"])
+    saving.wait()
+    writer.submit(["b"])
+    writer.submit(["c"])
+    release.set()
+    writer.close()
+    assert writes == [["a"], ["b", "c"]]
+
+
+def test_async_writer_applies_backpressure():
+    """
+    Test when the queue is full: submitting waits for the writer.
+    """
+    saving = threading.Event()
+    release = threading.Event()
+
+    def write(bookings):
+        saving.set()
+        release.wait()
+
+    writer = AsyncWriter(write, queue_size=1)
+    writer.submit(["a"])
+    saving.wait()
+    writer.submit(["b"])
+    blocked = threading.Thread(target=writer.submit, args=(["c"],))
+    blocked.start()
+    blocked.join(0.1)
+    assert blocked.is_alive()
+
+    release.set()
+    blocked.join(1)
+    assert not blocked.is_alive()
+    writer.close()
+
+
+def test_async_writer_wait_raises_and_retries():
+    """
+    Test when a save fails: the waiting caller gets the error, and the
+    bookings are saved again with the next ones.
+    """
+    writes = []
+    logger = MagicMock()
+
+    def write(bookings):
+        writes.append(bookings)
+        if len(writes) == 1:
+            raise OSError("disk full")
+
+    writer = AsyncWriter(write, queue_size=10, logger=logger)
+    with pytest.raises(OSError):
+        writer.submit(["a"], wait=True)
+    writer.submit(["b"], wait=True)
+    writer.close()
+    assert writes == [["a"], ["a", "b"]]
+    logger.warning.assert_called_once()
+
+
+def test_async_writer_calls_saved_once_written():
+    """
+    Test when a save fails: its bookings are only reported saved once
+    they are written by a later save.
+    """
+    attempts = []
+    saved = MagicMock()
+
+    def write(bookings):
+        attempts.append(bookings)
+        if len(attempts) == 1:
+            raise OSError("disk full")
+
+    writer = AsyncWriter(write, queue_size=10)
+    with pytest.raises(OSError):
+        writer.submit(["a"], wait=True, saved=saved)
+    saved.assert_not_called()
+
+    writer.submit(["b"], wait=True)
+    saved.assert_called_once()
+    writer.close()
+
+
+def test_async_writer_close_saves_queued_bookings():
+    """
+    Test when the writer is closed: the queued bookings are saved, and
+    later ones are saved right away.
+    """
+    writes = []
+    writer = AsyncWriter(writes.append, queue_size=10)
+    writer.submit(["a"])
+    writer.close()
+    assert writes == [["a"]]
+
+    writer.submit(["b"])
+    assert writes == [["a"], ["b"]]
+
+
+@pytest.mark.parametrize("durability", ["memory", "disk"])
+def test_persist_booking_with_async_writes(journal_app, durability):
+    """
+    Test when async writes are enabled: the booking is saved by the
+    writer, before the booking returns with "disk" durability.
+    """
+    journal_app.config.update(
+        ASYNC_WRITES=True, ASYNC_DURABILITY=durability, ASYNC_QUEUE_SIZE=10
+    )
+    journal_app.extensions = {}
+    competition = {"name": "Comp A", "number_of_places": 8}
+    club = {"name": "Club A", "points": 3}
+
+    persist_booking(journal_app, competition, club, 2)
+    writer = journal_app.extensions["async_writer"]
+    if durability == "memory":
+        writer.flush()
+
+    with open(journal_app.config["JSON_JOURNAL"]) as f:
+        assert json.loads(f.readline())["club"] == "Club A"
+    writer.close()
+
+
+def test_async_writes_ignored_with_shared_state(journal_app):
+    """
+    Test when the workers share their state: a booking is on disk
+    before the next worker books.
+    """
+    journal_app.config.update(ASYNC_WRITES=True, SHARED_STATE=True)
+    journal_app.extensions = {}
+    with patch("data_manager.write_bookings") as mock_write:
+        persist_booking(journal_app, {"name": "Comp A"}, {"name": "Club A"}, 1)
+        mock_write.assert_called_once()
+    assert "async_writer" not in journal_app.extensions
 
 
 ########################################################
@@ -120,8 +435,96 @@ def test_object_not_found():
     Test when the object is not found.
     """
     clubs = [{"name": "Club A", "email": "a@test.com"}]
-    with pytest.raises(IndexError):
-        get_obj_by_field("name", "Unknown Club", clubs)
+    assert get_obj_by_field("name", "Unknown Club", clubs) is None
+
+
+########################################################
+#                   INDEXES TESTS
+########################################################
+
+
+@pytest.fixture
+def indexed_clubs():
+    """Index a list of clubs, restoring the real indexes afterwards"""
+    clubs = [{"name": "Club A", "email": "a@test.com", "points": "10"},
+             {"name": "Club B", "email": "b@test.com", "points": "5"}]
+    with patch.dict(data_manager._INDEXES):
+        build_index("clubs", clubs)
+        yield clubs
+
+
+def test_indexed_list_is_looked_up_in_index(indexed_clubs):
+    """
+    Test when the list is indexed: the lookup does not scan it.
+    """
+    with patch("data_manager.next") as mock_next:
+        result = get_obj_by_field("email", "b@test.com", indexed_clubs)
+    assert result is indexed_clubs[1]
+    mock_next.assert_not_called()
+
+
+def test_indexed_list_object_not_found(indexed_clubs):
+    """
+    Test when the object is not found in an indexed list.
+    """
+    assert get_obj_by_field("name", "Unknown Club", indexed_clubs) is None
+
+
+def test_unindexed_field_falls_back_to_scan(indexed_clubs):
+    """
+    Test when the field is not indexed.
+    """
+    assert get_index("points", indexed_clubs) is None
+    assert get_obj_by_field("points", "5", indexed_clubs) is indexed_clubs[1]
+
+
+def test_index_keeps_first_duplicate():
+    """
+    Test when several objects share the same value.
+    """
+    clubs = [{"name": "Club A", "email": "a@test.com"},
+             {"name": "Club A", "email": "other@test.com"}]
+    with patch.dict(data_manager._INDEXES):
+        build_index("clubs", clubs)
+        assert get_obj_by_field("name", "Club A", clubs) is clubs[0]
+
+
+def test_email_index_is_shared(indexed_clubs):
+    """
+    Test when the clubs list is indexed: the email index is not rebuilt.
+    """
+    index = get_email_index(indexed_clubs)
+    assert index is get_email_index(indexed_clubs)
+    assert index["b@test.com"] is indexed_clubs[1]
+
+
+def test_email_index_of_unindexed_list():
+    """
+    Test when the clubs list is not indexed.
+    """
+    clubs = [{"name": "Club A", "email": " A@Test.com"}]
+    assert get_email_index(clubs) == {"a@test.com": clubs[0]}
+
+
+def test_indexes_follow_update(indexed_clubs):
+    """
+    Test when a club is replaced by update_clubs_and_competitions.
+    """
+    competitions = [{"name": "Competition A", "number_of_places": 20}]
+    with patch.object(data_manager, "CLUBS", indexed_clubs), \
+         patch.object(data_manager, "COMPETITIONS", competitions):
+        updated_club = {"name": "Club A", "email": "new@test.com", "points": 5}
+        update_clubs_and_competitions(updated_club, competitions[0])
+
+        clubs = data_manager.CLUBS
+        assert get_obj_by_field("name", "Club A", clubs) is updated_club
+        assert get_obj_by_field("email", "new@test.com", clubs) is updated_club
+        assert get_obj_by_field("email", "a@test.com", clubs) is None
+        assert get_email_index(clubs)["new@test.com"] is updated_club
+        assert "a@test.com" not in get_email_index(clubs)
+        assert get_obj_by_field(
+            "name", "Competition A", data_manager.COMPETITIONS
+        ) is competitions[0]
 
 
 ########################################################
@@ -175,6 +578,22 @@ def test_update_new_objects():
         assert data_manager.CLUBS[0]["name"] == "New Club"
         assert data_manager.COMPETITIONS[0]["name"] == "New Competition"
 
+
+def test_update_records_already_held():
+    """
+    Test when the booked records are those of the lists, changed in
+    place: the lists are kept as they are.
+    """
+    clubs = [{"name": "Club A", "points": 5}, {"name": "Club B", "points": 3}]
+    competitions = [{"name": "Competition A", "number_of_places": 15}]
+
+    with patch.object(data_manager, 'CLUBS', clubs), \
+         patch.object(data_manager, 'COMPETITIONS', competitions):
+        update_clubs_and_competitions(clubs[0], competitions[0])
+
+        assert data_manager.CLUBS is clubs
+        assert data_manager.COMPETITIONS is competitions
+
 ########################################################
 # SAVE CLUBS AND COMPETITIONS TESTS
 ########################################################
@@ -202,6 +621,184 @@ def test_save_clubs_and_competitions():
         )
 
 
+########################################################
+#                BOOKING JOURNAL TESTS
+########################################################
+
+
+@pytest.fixture
+def journal_app(tmp_path):
+    """A mock app persisting to files of a temporary directory"""
+    mock_app = MagicMock()
+    mock_app.config = {
+        "JSON_CLUBS": str(tmp_path / "clubs.json"),
+        "JSON_COMPETITIONS": str(tmp_path / "competitions.json"),
+        "JSON_JOURNAL": str(tmp_path / "bookings.journal"),
+        "PERSISTENCE_MODE": "journal",
+        "JOURNAL_COMPACT_EVERY": 3,
+    }
+    with patch.object(data_manager, "_journal_records", 0):
+        yield mock_app
+
+
+def test_journal_record_is_one_compact_line(journal_app):
+    """
+    Test when a booking is appended to the journal.
+    """
+    journal = journal_app.config["JSON_JOURNAL"]
+    competition = {"name": "Comp A", "number_of_places": 8}
+    club = {"name": "Club A", "points": 3}
+
+    append_to_journal(journal, competition, club, 2)
+
+    with open(journal) as f:
+        lines = f.readlines()
+    assert lines == [
+        '{"competition":"Comp A","club":"Club A","places":2,'
+        '"number_of_places":8,"points":3}\n'
+    ]
+    assert data_manager._journal_records == 1
+
+
+def test_replay_journal(journal_app):
+    """
+    Test when the journal is replayed on top of the snapshots.
+    """
+    journal = journal_app.config["JSON_JOURNAL"]
+    clubs = [{"name": "Club A", "points": "10"}]
+    competitions = [{"name": "Comp A", "number_of_places": "20"}]
+    append_to_journal(journal, {"name": "Comp A", "number_of_places": 18},
+                      {"name": "Club A", "points": 8}, 2)
+    append_to_journal(journal, {"name": "Comp A", "number_of_places": 17},
+                      {"name": "Club A", "points": 7}, 1)
+
+    assert replay_journal(journal, clubs, competitions) == 2
+    assert clubs[0]["points"] == 7
+    assert competitions[0]["number_of_places"] == 17
+
+
+def test_replay_journal_ignores_truncated_record(journal_app):
+    """
+    Test when the last record was only partly written.
+    """
+    journal = journal_app.config["JSON_JOURNAL"]
+    clubs = [{"name": "Club A", "points": "10"}]
+    competitions = [{"name": "Comp A", "number_of_places": "20"}]
+    append_to_journal(journal, {"name": "Comp A", "number_of_places": 18},
+                      {"name": "Club A", "points": 8}, 2)
+    with open(journal, "a") as f:
+        f.write('{"competition":"Comp A","club"')
+
+    assert replay_journal(journal, clubs, competitions) == 1
+    assert clubs[0]["points"] == 8
+
+
+def test_append_after_truncated_record(journal_app):
+    """
+    Test when a booking is journaled after a crash mid-append: the
+    partial record is cut off, and both bookings are replayed.
+    """
+    journal = journal_app.config["JSON_JOURNAL"]
+    clubs = [{"name": "Club A", "points": "10"}]
+    competitions = [{"name": "Comp A", "number_of_places": "20"}]
+    append_to_journal(journal, {"name": "Comp A", "number_of_places": 18},
+                      {"name": "Club A", "points": 8}, 2)
+    with open(journal, "a") as f:
+        f.write('{"competition":"Comp A","club"')
+
+    append_to_journal(journal, {"name": "Comp A", "number_of_places": 17},
+                      {"name": "Club A", "points": 7}, 1)
+
+    assert replay_journal(journal, clubs, competitions) == 2
+    assert clubs[0]["points"] == 7
+
+
+def test_replay_journal_rejects_corrupt_record(journal_app):
+    """
+    Test when a record before the last one is unreadable.
+    """
+    journal = journal_app.config["JSON_JOURNAL"]
+    with open(journal, "w") as f:
+        f.write('{"competition":\n')
+    append_to_journal(journal, {"name": "Comp A", "number_of_places": 18},
+                      {"name": "Club A", "points": 8}, 2)
+
+    with pytest.raises(ValueError, match="line 1"):
+        replay_journal(journal, [], [])
+
+
+def test_read_journal_tail(tmp_path):
+    """
+    Test when the records appended after an offset are read: only whole
+    records starting at that offset are returned.
+    """
+    journal = tmp_path / "bookings.journal"
+    first = '{"competition":"Comp A","number_of_places":18}\n'
+    second = '{"competition":"Comp A","number_of_places":17}\n'
+    journal.write_text(first + second)
+    end = len(first + second)
+
+    assert read_journal_tail(str(journal), len(first), end) == [
+        {"competition": "Comp A", "number_of_places": 17}
+    ]
+    assert len(read_journal_tail(str(journal), 0, end)) == 2
+    # Mid-record offsets, e.g. a truncated record cut off since
+    assert read_journal_tail(str(journal), 5, end) is None
+    assert read_journal_tail(str(journal), len(first), end - 1) is None
+
+
+def test_replay_missing_journal(tmp_path):
+    """
+    Test when there is no journal file.
+    """
+    assert replay_journal(str(tmp_path / "none.journal"), [], []) == 0
+
+
+def test_compact_journal(journal_app):
+    """
+    Test when the journal is folded into the snapshots.
+    """
+    journal = journal_app.config["JSON_JOURNAL"]
+    clubs = [{"name": "Club A", "points": 8}]
+    competitions = [{"name": "Comp A", "number_of_places": 18}]
+    append_to_journal(journal, competitions[0], clubs[0], 2)
+
+    compact_journal(journal_app, clubs, competitions)
+
+    assert load_data(journal_app.config["JSON_CLUBS"], "clubs") == clubs
+    assert load_data(
+        journal_app.config["JSON_COMPETITIONS"], "competitions"
+    ) == competitions
+    assert replay_journal(journal, clubs, competitions) == 0
+    assert data_manager._journal_records == 0
+
+
+def test_persist_booking_in_journal_mode(journal_app):
+    """
+    Test when bookings are journaled until the compaction threshold.
+    """
+    competition = {"name": "Comp A", "number_of_places": 18}
+    club = {"name": "Club A", "points": 8}
+    with patch("data_manager.compact_journal") as mock_compact, \
+         patch("data_manager.save_clubs_and_competitions") as mock_save:
+        persist_booking(journal_app, competition, club, 2)
+        persist_booking(journal_app, competition, club, 2)
+        mock_compact.assert_not_called()
+        persist_booking(journal_app, competition, club, 2)
+        mock_compact.assert_called_once()
+        mock_save.assert_not_called()
+
+
+def test_persist_booking_in_snapshot_mode(journal_app):
+    """
+    Test when each booking rewrites both files.
+    """
+    journal_app.config["PERSISTENCE_MODE"] = "snapshot"
+    with patch("data_manager.save_clubs_and_competitions") as mock_save:
+        persist_booking(journal_app, {"name": "Comp A"}, {"name": "Club A"}, 1)
+        mock_save.assert_called_once()
+
+
 ########################################################
 #           UPDATE DATA AFTER BOOKING TESTS
 ########################################################
@@ -214,6 +811,20 @@ def app_context():
     with app.app_context():
         yield app
 
+
+@contextmanager
+def booked_data(competitions: list, clubs: list):
+    """
+    Make the competitions and clubs of a test the app's data, as
+    bookings look their records up again, on storage files unchanged
+    since they were loaded.
+    """
+    storage = data_manager.get_storage()
+    with patch.object(data_manager, "CLUBS", clubs), \
+         patch.object(data_manager, "COMPETITIONS", competitions), \
+         patch.object(storage, "loaded_stamp", storage.stamp()):
+        yield
+
 def test_successful_booking(app_context):
     """
     Test when the booking is successful.
@@ -224,17 +835,20 @@ def test_successful_booking(app_context):
         "date": "2025-01-01 10:00:00"
     }
     club = {"name": "Test Club", "points": "15"}
+    version = get_data_version()
     
     with patch('data_manager.validate_places_required', return_value=None), \
          patch('data_manager.validate_competition_date', return_value=None), \
          patch('data_manager.update_clubs_and_competitions') as mock_update, \
-         patch('data_manager.save_clubs_and_competitions') as mock_save:
+         patch('data_manager.save_clubs_and_competitions') as mock_save, \
+         booked_data([competition], [club]):
         
         result = update_data_after_booking(competition, club, 5)
         
         assert result is None
         assert competition["number_of_places"] == 5
         assert club["points"] == 10
+        assert data_manager.get_data_version() == version + 1
         mock_update.assert_called_once_with(club, competition)
         mock_save.assert_called_once()
 
@@ -254,10 +868,1217 @@ def test_booking_with_validation_error():
         return_value="Not enough places"), \
          patch(
         'data_manager.validate_competition_date', 
-        return_value=None):
+        return_value=None), \
+         booked_data([competition], [club]):
         
         result = update_data_after_booking(competition, club, 15)
         
         assert result == "Not enough places"
         assert competition["number_of_places"] == "10"
-        assert club["points"] == "15"
\ No newline at end of file
+        assert club["points"] == "15"
+
+
+def test_batch_is_validated_against_running_totals(app_context):
+    """
+    Test when a batch books the same club twice: the second booking is
+    validated against the points left by the first.
+    """
+    competitions = [
+        {"name": f"Comp {n}", "number_of_places": "10",
+         "date": "2099-01-01 10:00:00"}
+        for n in "AB"
+    ]
+    club = {"name": "Test Club", "points": "5"}
+    bookings = [(competitions[0], club, 3), (competitions[1], club, 3)]
+
+    with patch('data_manager.save_clubs_and_competitions') as mock_save, \
+         booked_data(competitions, [club]):
+        errors = update_data_after_bookings(bookings)
+        assert errors == [
+            BATCH_CANCELLED, "The club does not have enough points"
+        ]
+        assert club["points"] == "5"
+        mock_save.assert_not_called()
+
+        errors = update_data_after_bookings(bookings, atomic=False)
+        assert errors == [None, "The club does not have enough points"]
+        assert club["points"] == 2
+        assert competitions[1]["number_of_places"] == "10"
+        mock_save.assert_called_once()
+
+
+@pytest.mark.parametrize("atomic", [True, False])
+def test_batch_refuses_negative_places(app_context, atomic):
+    """
+    Test when a batch books a negative number of places: it is refused,
+    and the running totals do not grow.
+    """
+    competition = {"name": "Comp A", "number_of_places": "10",
+                   "date": "2099-01-01 10:00:00"}
+    club = {"name": "Test Club", "points": "5"}
+    bookings = [(competition, club, -50), (competition, club, 6)]
+
+    with patch('data_manager.save_clubs_and_competitions'), \
+         booked_data([competition], [club]):
+        errors = update_data_after_bookings(bookings, atomic)
+
+    assert errors[0] == "You must book at least one place"
+    assert errors[1] == "The club does not have enough points"
+    assert club["points"] == "5"
+
+
+def test_bookings_of_a_competition_share_a_group_commit(app_context):
+    """
+    Test when a competition is booked by several clubs at once: the
+    bookings do not hold its lock while saving, so they are saved by
+    one group commit.
+    """
+    competition = {"name": "Comp A", "number_of_places": "20",
+                   "date": "2099-01-01 10:00:00"}
+    clubs = [{"name": f"Club {n}", "points": "5"} for n in range(5)]
+    app_context.extensions.pop("group_committer", None)
+
+    with patch.dict(app_context.config, {
+             "PERSISTENCE_MODE": "snapshot",
+             "GROUP_COMMIT_WINDOW": 0.2,
+             "SHARED_STATE": False,
+         }), \
+         patch('data_manager.save_clubs_and_competitions') as mock_save, \
+         booked_data([competition], clubs):
+        def book(club):
+            with app_context.app_context():
+                update_data_after_booking(competition, club, 1)
+
+        threads = [
+            threading.Thread(target=book, args=(club,)) for club in clubs
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    app_context.extensions.pop("group_committer", None)
+
+    assert competition["number_of_places"] == 15
+    assert mock_save.call_count == 1
+
+
+def test_batch_is_journaled_in_one_write(app_context, journal_app):
+    """
+    Test when a batch is saved in journal mode: one append, one record
+    per booking.
+    """
+    competition = {"name": "Comp A", "number_of_places": "10",
+                   "date": "2099-01-01 10:00:00"}
+    clubs = [{"name": f"Club {n}", "points": "5"} for n in "AB"]
+
+    with patch.dict(app_context.config, journal_app.config), \
+         patch('data_manager.os.fsync') as mock_fsync, \
+         booked_data([competition], clubs):
+        errors = update_data_after_bookings(
+            [(competition, clubs[0], 2), (competition, clubs[1], 1)]
+        )
+
+    assert errors == [None, None]
+    assert competition["number_of_places"] == 7
+    mock_fsync.assert_called_once()
+    with open(journal_app.config["JSON_JOURNAL"]) as f:
+        assert len(f.readlines()) == 2
+
+
+########################################################
+#                   LOCKING TESTS
+########################################################
+
+
+def test_lock_is_shared_per_name():
+    """
+    Test when the lock of the same competition is asked twice.
+    """
+    assert get_lock("competition", "Comp A") is get_lock(
+        "competition", "Comp A"
+    )
+    assert get_lock("competition", "Comp A") is not get_lock(
+        "club", "Comp A"
+    )
+
+
+def test_other_competitions_are_not_blocked(app_context):
+    """
+    Test when a competition is locked: another one can still be booked.
+    """
+    competition = {
+        "name": "Other Comp", 
+        "number_of_places": "10", 
+        "date": "2099-01-01 10:00:00"
+    }
+    club = {"name": "Other Club", "points": "15"}
+    results = []
+
+    def book():
+        with app_context.app_context():
+            results.append(update_data_after_booking(competition, club, 2))
+
+    with patch('data_manager.save_clubs_and_competitions'), \
+         booked_data([competition], [club]), \
+         booking_lock({"name": "Locked Comp"}, {"name": "Locked Club"}):
+        thread = threading.Thread(target=book)
+        thread.start()
+        thread.join(timeout=5)
+
+    assert results == [None]
+    assert competition["number_of_places"] == 8
+
+
+def test_same_competition_waits_for_lock(app_context):
+    """
+    Test when a competition is locked: its bookings wait for the lock.
+    """
+    competition = {
+        "name": "Locked Comp", 
+        "number_of_places": "10", 
+        "date": "2099-01-01 10:00:00"
+    }
+    club = {"name": "Other Club", "points": "15"}
+
+    def book():
+        with app_context.app_context():
+            update_data_after_booking(competition, club, 2)
+
+    with patch('data_manager.save_clubs_and_competitions'), \
+         booked_data([competition], [club]):
+        with booking_lock(competition, {"name": "Locked Club"}):
+            thread = threading.Thread(target=book)
+            thread.start()
+            thread.join(timeout=0.1)
+            assert thread.is_alive()
+            assert competition["number_of_places"] == "10"
+        thread.join(timeout=5)
+
+    assert competition["number_of_places"] == 8
+
+
+
+########################################################
+#               STORAGE BACKENDS TESTS
+########################################################
+
+
+@pytest.fixture
+def json_files(tmp_path):
+    """Clubs and competitions JSON files in a temporary directory"""
+    clubs_file = tmp_path / "clubs.json"
+    competitions_file = tmp_path / "competitions.json"
+    save_json(str(clubs_file), [
+        {"name": "Club A", "email": "a@test.com", "points": "10"},
+        {"name": "Club B", "email": "b@test.com", "points": "3"},
+    ], "clubs")
+    save_json(str(competitions_file), [
+        {"name": "Comp A", "date": "2099-01-01 10:00:00",
+         "number_of_places": "5"},
+    ], "competitions")
+    return str(clubs_file), str(competitions_file)
+
+
+@pytest.fixture
+def sqlite_storage(tmp_path, json_files):
+    """An SQLite storage filled from the JSON files"""
+    return SqliteStorage(str(tmp_path / "gudlft.db"), *json_files)
+
+
+def test_create_storage():
+    """
+    Test when the storage backend is selected by the configuration.
+    """
+    settings = {
+        "STORAGE_BACKEND": "json",
+        "JSON_CLUBS": "clubs.json",
+        "JSON_COMPETITIONS": "competitions.json",
+        "JSON_JOURNAL": "bookings.journal",
+        "SQLITE_DATABASE": "gudlft.db",
+    }
+    assert create_storage(settings).persistence_mode == "snapshot"
+    settings["PERSISTENCE_MODE"] = "journal"
+    assert create_storage(settings).persistence_mode == "journal"
+    settings["STORAGE_BACKEND"] = "sqlite"
+    assert isinstance(create_storage(settings), SqliteStorage)
+    settings["STORAGE_BACKEND"] = "unknown"
+    with pytest.raises(ValueError):
+        create_storage(settings)
+
+
+def test_json_storage_load_replays_journal(tmp_path, json_files):
+    """
+    Test when the JSON storage is loaded with a journal.
+    """
+    journal = str(tmp_path / "bookings.journal")
+    with patch.object(data_manager, "_journal_records", 0):
+        append_to_journal(journal, {"name": "Comp A", "number_of_places": 4},
+                          {"name": "Club A", "points": 9}, 1)
+        clubs, competitions = JsonStorage(*json_files, journal).load()
+        assert data_manager._journal_records == 1
+    assert clubs[0]["points"] == 9
+    assert competitions[0]["number_of_places"] == 4
+
+
+def test_json_storage_refuses_journal_in_snapshot_mode(tmp_path, json_files):
+    """
+    Test when the JSON storage is loaded in snapshot mode with a journal
+    left over: it is not replayed, the load is refused.
+    """
+    journal = str(tmp_path / "bookings.journal")
+    with patch.object(data_manager, "_journal_records", 0):
+        append_to_journal(journal, {"name": "Comp A", "number_of_places": 4},
+                          {"name": "Club A", "points": 9}, 1)
+    storage = JsonStorage(*json_files, journal, "snapshot")
+
+    with pytest.raises(RuntimeError, match="PERSISTENCE_MODE=journal"):
+        storage.load()
+
+
+def test_json_storage_ignores_empty_journal_in_snapshot_mode(
+    tmp_path, json_files
+):
+    """
+    Test when the JSON storage is loaded in snapshot mode with an empty
+    journal, e.g. one just compacted: the snapshots are loaded.
+    """
+    journal = tmp_path / "bookings.journal"
+    journal.write_text("")
+
+    clubs, _ = JsonStorage(*json_files, str(journal), "snapshot").load()
+
+    assert clubs[0]["points"] == 10
+
+
+def test_sqlite_storage_is_filled_from_json(sqlite_storage):
+    """
+    Test when the SQLite database is empty.
+    """
+    clubs, competitions = sqlite_storage.load()
+    assert clubs == [
+        Club("Club A", "a@test.com", 10),
+        Club("Club B", "b@test.com", 3),
+    ]
+    assert competitions == [
+        Competition("Comp A", datetime(2099, 1, 1, 10), 5),
+    ]
+
+
+def test_sqlite_storage_schema(sqlite_storage):
+    """
+    Test when the SQLite database is created: WAL mode and indexes.
+    """
+    connection = sqlite_storage.connect()
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {row[1] for row in connection.execute("PRAGMA index_list(clubs)")}
+    assert "clubs_email" in indexes
+
+
+def test_sqlite_storage_book(sqlite_storage, tmp_path, json_files):
+    """
+    Test when a booking is saved to the SQLite database.
+    """
+    clubs, competitions = sqlite_storage.load()
+    error = sqlite_storage.book(None, competitions[0], clubs[0], 2)
+
+    assert error is None
+    assert competitions[0]["number_of_places"] == 3
+    assert clubs[0]["points"] == 8
+    # Another worker sees the booking
+    other = SqliteStorage(str(tmp_path / "gudlft.db"), *json_files)
+    other_clubs, other_competitions = other.load()
+    assert other_clubs[0]["points"] == 8
+    assert other_competitions[0]["number_of_places"] == 3
+
+
+def test_sqlite_storage_refuses_overselling(
+    sqlite_storage, tmp_path, json_files
+):
+    """
+    Test when another worker booked the places in the meantime.
+    """
+    clubs, competitions = sqlite_storage.load()
+    other = SqliteStorage(str(tmp_path / "gudlft.db"), *json_files)
+    other_clubs, other_competitions = other.load()
+    assert other.book(None, other_competitions[0], other_clubs[0], 4) is None
+
+    error = sqlite_storage.book(None, competitions[0], clubs[1], 2)
+
+    assert error == "Not enough places available"
+    assert competitions[0]["number_of_places"] == 1
+    assert clubs[1]["points"] == 3
+
+
+def test_sqlite_storage_refuses_overspending(sqlite_storage):
+    """
+    Test when the club does not have the points: nothing is booked.
+    """
+    clubs, competitions = sqlite_storage.load()
+    clubs[1]["points"] = 10
+
+    error = sqlite_storage.book(None, competitions[0], clubs[1], 4)
+
+    assert error == "The club does not have enough points"
+    assert competitions[0]["number_of_places"] == 5
+    assert clubs[1]["points"] == 3
+
+
+
+def test_sqlite_storage_book_many(sqlite_storage, tmp_path, json_files):
+    """
+    Test when a batch is refused by the database: all or nothing in
+    atomic mode, only the refused booking otherwise.
+    """
+    clubs, competitions = sqlite_storage.load()
+    # Club B only has 3 points in the database
+    clubs[1]["points"] = 10
+    bookings = [(competitions[0], clubs[0], 1), (competitions[0], clubs[1], 4)]
+
+    errors = sqlite_storage.book_many(None, bookings)
+
+    assert errors == [BATCH_CANCELLED, "The club does not have enough points"]
+    assert competitions[0]["number_of_places"] == 5
+    assert clubs[0]["points"] == 10
+
+    errors = sqlite_storage.book_many(None, bookings, atomic=False)
+
+    assert errors == [None, "The club does not have enough points"]
+    assert competitions[0]["number_of_places"] == 4
+    assert clubs[0]["points"] == 9
+    assert clubs[1]["points"] == 3
+
+
+def test_sqlite_storage_detects_other_workers(
+    sqlite_storage, tmp_path, json_files
+):
+    """
+    Test when another worker books: the storage stamp changes, but not
+    for this worker's own bookings.
+    """
+    clubs, competitions = sqlite_storage.load()
+    other = SqliteStorage(str(tmp_path / "gudlft.db"), *json_files)
+    other_clubs, other_competitions = other.load()
+    assert not sqlite_storage.changed()
+
+    other.book(None, other_competitions[0], other_clubs[0], 1)
+    assert sqlite_storage.changed()
+
+    clubs, competitions = sqlite_storage.load()
+    sqlite_storage.book(None, competitions[0], clubs[0], 1)
+    assert not sqlite_storage.changed()
+    assert other.changed()
+
+
+def test_json_storage_replace(tmp_path, json_files):
+    """
+    Test when the data is replaced: the files are rewritten and the
+    journal of the replaced data dropped.
+    """
+    journal = tmp_path / "bookings.journal"
+    journal.write_text("")
+    storage = JsonStorage(*json_files, str(journal))
+
+    storage.replace([Club("Club C", "c@test.com", 7)], [])
+
+    assert not journal.exists()
+    assert load_data(json_files[0], "clubs") == [
+        {"name": "Club C", "email": "c@test.com", "points": "7"}
+    ]
+    assert load_data(json_files[1], "competitions") == []
+
+
+def test_sqlite_storage_replace(sqlite_storage, tmp_path, json_files):
+    """
+    Test when the data of the SQLite database is replaced: the other
+    workers see the change.
+    """
+    sqlite_storage.load()
+    other = SqliteStorage(str(tmp_path / "gudlft.db"), *json_files)
+    other.load()
+
+    other.replace(
+        [Club("Club C", "c@test.com", 7)],
+        [Competition("Comp C", datetime(2099, 2, 1, 9), 20)],
+    )
+
+    assert sqlite_storage.changed()
+    assert sqlite_storage.load() == (
+        [Club("Club C", "c@test.com", 7)],
+        [Competition("Comp C", datetime(2099, 2, 1, 9), 20)],
+    )
+
+
+def test_reset_data(tmp_path, json_files):
+    """
+    Test when the data is reset: the storage and the lists in memory
+    are replaced, and the pages of the reset records are stale.
+    """
+    storage = JsonStorage(*json_files, str(tmp_path / "bookings.journal"))
+    clubs, competitions = storage.load()
+    # The app's data, indexed again once the test data is dropped
+    get_clubs()
+    version = get_data_version()
+    new_clubs = [Club("Club A", "a@test.com", 100)]
+    new_competitions = [Competition("Comp C", datetime(2099, 2, 1, 9), 20)]
+    with patch.object(data_manager, "STORAGE", storage), \
+         patch.object(data_manager, "CLUBS", clubs), \
+         patch.object(data_manager, "COMPETITIONS", competitions):
+        data_manager.build_indexes()
+        reset_data(new_clubs, new_competitions)
+
+        assert get_clubs() is new_clubs
+        assert get_competitions() is new_competitions
+        assert get_obj_by_field("email", "a@test.com", new_clubs)["points"] \
+            == 100
+        assert storage.load() == (new_clubs, new_competitions)
+        assert get_object_version("club", "Club A") > version
+    data_manager.build_indexes()
+
+
+
+def test_reset_data_waits_for_the_storage_first(tmp_path, json_files):
+    """
+    Test when the data is reset while another booking holds the storage:
+    the reset waits without holding the reload lock, which the booking
+    takes next, so they cannot deadlock.
+    """
+    storage = JsonStorage(*json_files, str(tmp_path / "bookings.journal"))
+    clubs, competitions = storage.load()
+    get_clubs()
+    held = threading.Event()
+    release = threading.Event()
+
+    def book():
+        with storage.exclusive():
+            held.set()
+            release.wait(5)
+
+    with patch.object(data_manager, "STORAGE", storage), \
+         patch.object(data_manager, "CLUBS", clubs), \
+         patch.object(data_manager, "COMPETITIONS", competitions):
+        booking = threading.Thread(target=book)
+        booking.start()
+        held.wait(5)
+        reset = threading.Thread(target=reset_data, args=(
+            [Club("Club A", "a@test.com", 100)], []
+        ))
+        reset.start()
+        try:
+            reset.join(0.2)
+            free = data_manager._RELOAD_LOCK.acquire(blocking=False)
+            if free:
+                data_manager._RELOAD_LOCK.release()
+        finally:
+            release.set()
+            booking.join(5)
+            reset.join(5)
+
+        assert free
+        assert not reset.is_alive()
+        assert [club["name"] for club in get_clubs()] == ["Club A"]
+    data_manager.build_indexes()
+
+
+def test_exclusive_is_reentrant(tmp_path, json_files):
+    """
+    Test when a thread holding the storage replaces its data: it does
+    not wait for itself.
+    """
+    storage = JsonStorage(*json_files, str(tmp_path / "bookings.journal"))
+
+    def hold_and_replace():
+        with storage.exclusive():
+            storage.replace([Club("Club C", "c@test.com", 7)], [])
+
+    replaced = threading.Thread(target=hold_and_replace, daemon=True)
+
+    replaced.start()
+    replaced.join(5)
+
+    assert not replaced.is_alive()
+    assert load_data(json_files[0], "clubs")[0]["name"] == "Club C"
+
+########################################################
+#                   DATA LOADING TESTS
+########################################################
+
+
+def test_data_is_loaded_on_first_use(tmp_path, json_files):
+    """
+    Test when an app is created: its data files are only read once the
+    data is used.
+    """
+    mock_app = Flask("lazy")
+    mock_app.config.update(
+        STORAGE_BACKEND="json",
+        JSON_CLUBS=json_files[0],
+        JSON_COMPETITIONS=json_files[1],
+        JSON_JOURNAL=str(tmp_path / "bookings.journal"),
+    )
+    with patch.object(data_manager, "STORAGE", None), \
+         patch.object(data_manager, "CLUBS", None), \
+         patch.object(data_manager, "COMPETITIONS", None), \
+         patch("data_manager.load_data", wraps=load_data) as mock_load:
+        init_data(mock_app)
+        mock_load.assert_not_called()
+
+        clubs = get_clubs()
+        assert get_competitions()[0]["name"] == "Comp A"
+        assert get_clubs() is clubs
+        assert mock_load.call_count == 2
+        assert [club["name"] for club in clubs] == ["Club A", "Club B"]
+        assert get_obj_by_field("name", "Club B", clubs) is clubs[1]
+    data_manager.build_indexes()
+
+
+def test_import_reads_no_data(tmp_path):
+    """
+    Test when the app is imported from another directory: nothing is
+    read, and the data files are found on first use.
+    """
+    root = os.path.dirname(data_manager.__file__)
+    code = (
+        "import server, data_manager\n"
+        "assert data_manager.CLUBS is None\n"
+        "assert data_manager.get_clubs()\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": root},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+
+########################################################
+#                  SHARED STATE TESTS
+########################################################
+
+
+@pytest.fixture
+def shared_app(tmp_path, json_files):
+    """A worker of an app sharing its JSON files with other workers"""
+    clubs_file, competitions_file = json_files
+    mock_app = Flask("shared")
+    mock_app.config.update(
+        JSON_CLUBS=clubs_file,
+        JSON_COMPETITIONS=competitions_file,
+        JSON_JOURNAL=str(tmp_path / "bookings.journal"),
+        PERSISTENCE_MODE="snapshot",
+        SHARED_STATE=True,
+    )
+    storage = JsonStorage(
+        clubs_file, competitions_file, mock_app.config["JSON_JOURNAL"]
+    )
+    clubs, competitions = storage.load()
+    with patch.object(data_manager, "STORAGE", storage), \
+         patch.object(data_manager, "CLUBS", clubs), \
+         patch.object(data_manager, "COMPETITIONS", competitions), \
+         mock_app.app_context():
+        data_manager.build_indexes()
+        yield mock_app
+    data_manager.build_indexes()
+
+
+def book_in_other_worker(app_instance, places_required):
+    """Book places of Comp A for Club A from another worker's data"""
+    storage = JsonStorage(
+        app_instance.config["JSON_CLUBS"],
+        app_instance.config["JSON_COMPETITIONS"],
+        app_instance.config["JSON_JOURNAL"],
+    )
+    with storage.exclusive():
+        clubs, competitions = storage.load()
+        competitions[0]["number_of_places"] -= places_required
+        clubs[0]["points"] -= places_required
+        # Written as the other process would, unknown to this one
+        save_json(app_instance.config["JSON_CLUBS"], clubs, "clubs")
+        save_json(
+            app_instance.config["JSON_COMPETITIONS"],
+            competitions,
+            "competitions"
+        )
+
+
+def test_other_workers_changes_are_reloaded(shared_app):
+    """
+    Test when another worker booked: the data is reloaded on next read.
+    """
+    clubs = get_clubs()
+    version = get_object_version("club", "Club A")
+
+    book_in_other_worker(shared_app, 2)
+
+    assert get_clubs() is not clubs
+    assert get_clubs()[0]["points"] == 8
+    assert get_competitions()[0]["number_of_places"] == 3
+    assert get_object_version("club", "Club A") > version
+    assert get_obj_by_field("name", "Club A", get_clubs()) is get_clubs()[0]
+
+
+def journal_in_other_worker(app_instance, points, places):
+    """Append a booking of Comp A for Club A by another worker"""
+    with open(app_instance.config["JSON_JOURNAL"], "a") as f:
+        f.write(json.dumps({
+            "competition": "Comp A", "club": "Club A", "places": 1,
+            "number_of_places": places, "points": points,
+        }) + "\n")
+
+
+def test_other_workers_journaled_bookings_are_read_alone(shared_app):
+    """
+    Test when another worker appended bookings to the journal: only
+    they are read, not both JSON files, and only their records change.
+    """
+    journal_in_other_worker(shared_app, 9, 4)
+    club_b = get_clubs()[1]
+    version = get_object_version("club", "Club A")
+
+    journal_in_other_worker(shared_app, 8, 3)
+    with patch.object(
+        data_manager.STORAGE, "read", side_effect=AssertionError
+    ):
+        assert get_clubs()[0]["points"] == 8
+        assert get_competitions()[0]["number_of_places"] == 3
+
+    assert get_clubs()[1] is club_b
+    assert get_object_version("club", "Club A") > version
+    assert get_obj_by_field("name", "Club A", get_clubs()) is get_clubs()[0]
+
+
+def test_own_bookings_are_not_reloaded(shared_app):
+    """
+    Test when this worker booked: its data is kept as it is.
+    """
+    club = get_clubs()[0]
+    competition = get_competitions()[0]
+
+    assert update_data_after_booking(competition, club, 1) is None
+
+    assert not data_manager.STORAGE.changed()
+    version = get_data_version()
+    assert get_clubs()[0] is club
+    assert get_data_version() == version
+
+
+def test_booking_sees_other_workers_bookings(shared_app):
+    """
+    Test when another worker booked places this worker still shows:
+    they cannot be booked twice, nor the other booking overwritten.
+    """
+    club = get_clubs()[0]
+    competition = get_competitions()[0]
+    book_in_other_worker(shared_app, 4)
+
+    error = update_data_after_booking(competition, club, 2)
+
+    assert error == "Not enough places available"
+    assert load_data(
+        shared_app.config["JSON_COMPETITIONS"], "competitions"
+    )[0]["number_of_places"] == 1
+
+    assert update_data_after_booking(competition, club, 1) is None
+    assert load_data(
+        shared_app.config["JSON_COMPETITIONS"], "competitions"
+    )[0]["number_of_places"] == 0
+    assert get_obj_by_field(
+        "name", "Club A", load_data(shared_app.config["JSON_CLUBS"], "clubs")
+    )["points"] == "5"
+
+
+@pytest.mark.skipif(data_manager.fcntl is None, reason="needs fcntl")
+def test_exclusive_lock_is_shared_by_workers(json_files, tmp_path):
+    """
+    Test when a worker holds the lock file: the others wait for it.
+    """
+    journal = str(tmp_path / "bookings.journal")
+    storage = JsonStorage(*json_files, journal)
+    other = JsonStorage(*json_files, journal)
+
+    def book():
+        with other.exclusive():
+            pass
+
+    with storage.exclusive():
+        thread = threading.Thread(target=book)
+        thread.start()
+        thread.join(timeout=0.1)
+        assert thread.is_alive()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+
+########################################################
+#                   HOT RELOAD TESTS
+########################################################
+
+
+def edit_competitions(app_instance, competitions):
+    """Replace the competitions file, as staff editing it would"""
+    save_json(
+        app_instance.config["JSON_COMPETITIONS"], competitions, "competitions"
+    )
+
+
+def test_edited_records_are_swapped_in(shared_app):
+    """
+    Test when staff edit the competitions file: only the changed
+    records are replaced, and the indexes and calendar follow.
+    """
+    clubs = get_clubs()
+    comp_a = get_competitions()[0]
+    club_version = get_object_version("club", "Club A")
+    edit_competitions(shared_app, [
+        {"name": "Comp A", "date": "2099-01-01 10:00:00",
+         "number_of_places": "5"},
+        {"name": "Comp B", "date": "2098-06-01 10:00:00",
+         "number_of_places": "30"},
+    ])
+
+    assert DataWatcher(shared_app, 1).check() is True
+
+    competitions = get_competitions()
+    assert get_clubs() is clubs
+    assert competitions[0] is comp_a
+    assert competitions[1] == Competition(
+        "Comp B", datetime(2098, 6, 1, 10), 30
+    )
+    assert get_obj_by_field("name", "Comp B", competitions) is competitions[1]
+    assert get_calendar(competitions).all() == [competitions[1], comp_a]
+    assert get_object_version("competition", "Comp B") > 0
+    assert get_object_version("club", "Club A") == club_version
+
+
+def test_removed_records_are_dropped(shared_app):
+    """
+    Test when a competition is removed from the file.
+    """
+    edit_competitions(shared_app, [])
+
+    assert DataWatcher(shared_app, 1).check() is True
+
+    assert get_competitions() == []
+    assert get_obj_by_field("name", "Comp A", get_competitions()) is None
+    assert get_calendar(get_competitions()).all() == []
+
+
+def test_unchanged_files_are_not_read(shared_app):
+    """
+    Test when nothing changed, or only this app wrote the files.
+    """
+    watcher = DataWatcher(shared_app, 1)
+    with patch("data_manager.load_data") as mock_load:
+        assert watcher.check() is False
+        mock_load.assert_not_called()
+
+    save_clubs_and_competitions(shared_app, get_clubs(), get_competitions())
+    with patch("data_manager.load_data") as mock_load:
+        assert watcher.check() is False
+        mock_load.assert_not_called()
+
+
+def test_only_the_changed_file_is_read(shared_app):
+    """
+    Test when only the competitions file changed.
+    """
+    clubs = get_clubs()
+    edit_competitions(shared_app, [])
+
+    with patch(
+        "data_manager.load_data", wraps=load_data
+    ) as mock_load:
+        DataWatcher(shared_app, 1).check()
+
+    mock_load.assert_called_once_with(
+        shared_app.config["JSON_COMPETITIONS"], "competitions"
+    )
+    assert get_clubs() is clubs
+
+
+def test_invalid_file_is_read_again(shared_app):
+    """
+    Test when the file is caught mid-edit: the data is kept until the
+    file loads.
+    """
+    competitions = get_competitions()
+    with open(shared_app.config["JSON_COMPETITIONS"], "w") as f:
+        f.write('{"competitions": [')
+    watcher = DataWatcher(shared_app, 1)
+
+    assert watcher.check() is False
+    assert get_competitions() is competitions
+
+    edit_competitions(shared_app, [])
+    assert watcher.check() is True
+    assert get_competitions() == []
+
+
+def test_record_being_booked_is_kept(shared_app):
+    """
+    Test when a competition is edited while it is being booked: it keeps
+    the version being booked, which its booking will save.
+    """
+    comp_a = get_competitions()[0]
+    edit_competitions(shared_app, [
+        {"name": "Comp A", "date": "2099-01-01 10:00:00",
+         "number_of_places": "50"},
+    ])
+
+    with get_lock("competition", "Comp A"):
+        DataWatcher(shared_app, 1).check()
+
+    assert get_competitions()[0] is comp_a
+    assert comp_a["number_of_places"] == 5
+
+
+def test_record_booked_but_not_saved_is_kept(shared_app):
+    """
+    Test when a competition is edited after a booking released its lock,
+    but before the booking was saved: the booked version is kept.
+    """
+    comp_a = get_competitions()[0]
+    club_a = get_clubs()[0]
+    edit_competitions(shared_app, [
+        {"name": "Comp A", "date": "2099-01-01 10:00:00",
+         "number_of_places": "50"},
+    ])
+
+    data_manager.mark_unsaved(comp_a, club_a)
+    try:
+        DataWatcher(shared_app, 1).check()
+    finally:
+        data_manager.mark_saved(comp_a, club_a)
+
+    assert get_competitions()[0] is comp_a
+    assert not data_manager._UNSAVED
+
+
+def test_snapshot_save_keeps_staff_edits(shared_app):
+    """
+    Test when staff add a competition before a booking is saved by a
+    single worker: the file keeps it, and so does the app.
+    """
+    shared_app.config["SHARED_STATE"] = False
+    edit_competitions(shared_app, [
+        {"name": "Comp A", "date": "2099-01-01 10:00:00",
+         "number_of_places": "5"},
+        {"name": "Comp B", "date": "2098-06-01 10:00:00",
+         "number_of_places": "30"},
+    ])
+
+    competition = get_competitions()[0]
+    assert update_data_after_booking(competition, get_clubs()[0], 1) is None
+
+    saved = load_data(shared_app.config["JSON_COMPETITIONS"], "competitions")
+    assert [comp["name"] for comp in saved] == ["Comp A", "Comp B"]
+    assert saved[0]["number_of_places"] == 4
+    assert get_obj_by_field("name", "Comp B", get_competitions()) is not None
+
+
+def test_booking_of_a_replaced_record_books_the_current_one(shared_app):
+    """
+    Test when a competition was reloaded after a page looked it up: the
+    booking is made on the record now in the data.
+    """
+    stale = get_competitions()[0]
+    edit_competitions(shared_app, [
+        {"name": "Comp A", "date": "2099-01-01 10:00:00",
+         "number_of_places": "50"},
+    ])
+    DataWatcher(shared_app, 1).check()
+
+    error, competition, _ = book_places(stale, get_clubs()[0], 2)
+
+    assert error is None
+    assert competition is get_competitions()[0]
+    assert competition["number_of_places"] == 48
+    assert stale["number_of_places"] == 5
+    saved = load_data(shared_app.config["JSON_COMPETITIONS"], "competitions")
+    assert saved[0]["number_of_places"] == 48
+
+
+def test_record_queued_for_async_write_is_kept(shared_app):
+    """
+    Test when staff edit a competition booked in memory, but not written
+    yet by the async writer: the booking is kept, and then written.
+    """
+    shared_app.config.update(
+        SHARED_STATE=False, ASYNC_WRITES=True,
+        ASYNC_DURABILITY="memory", ASYNC_QUEUE_SIZE=10,
+    )
+    comp_a = get_competitions()[0]
+    release = threading.Event()
+
+    def slow_write(app_instance, bookings):
+        release.wait()
+        write_app_bookings(app_instance, bookings)
+
+    with patch("data_manager.write_app_bookings", side_effect=slow_write):
+        try:
+            assert update_data_after_booking(
+                comp_a, get_clubs()[0], 3
+            ) is None
+            edit_competitions(shared_app, [
+                {"name": "Comp A", "date": "2099-01-01 10:00:00",
+                 "number_of_places": "5"},
+            ])
+            refresh_data()
+            assert get_competitions()[0] is comp_a
+        finally:
+            release.set()
+            shared_app.extensions.pop("async_writer").close()
+
+    competitions = load_data(
+        shared_app.config["JSON_COMPETITIONS"], "competitions"
+    )
+    clubs = load_data(shared_app.config["JSON_CLUBS"], "clubs")
+    assert int(competitions[0]["number_of_places"]) == 2
+    assert int(clubs[0]["points"]) == 7
+    assert not data_manager._UNSAVED
+
+
+def test_data_watcher_polls_until_stopped(shared_app):
+    """
+    Test when the watcher runs: it checks the data at each interval.
+    """
+    watcher = DataWatcher(shared_app, 0.01)
+    checked = threading.Event()
+    with patch.object(watcher, "check", side_effect=checked.set):
+        watcher.start()
+        assert checked.wait(timeout=5)
+        watcher.stop()
+    assert not watcher._thread.is_alive()
+
+
+
+########################################################
+#             COMPETITION CALENDAR TESTS
+########################################################
+
+
+NOW = datetime(2030, 6, 1, 12)
+
+
+@pytest.fixture
+def frozen_now():
+    """Freeze the current time seen by the calendar"""
+    with patch("data_manager.datetime") as mock_datetime:
+        mock_datetime.now.return_value = NOW
+        mock_datetime.fromisoformat = datetime.fromisoformat
+        yield mock_datetime
+
+
+def _competition(name, days_delta):
+    return Competition(name, NOW + timedelta(days=days_delta), 10)
+
+
+def test_calendar_orders_and_splits_competitions(frozen_now):
+    """
+    Test when the calendar is built from unordered competitions.
+    """
+    competitions = [_competition("C", 3), _competition("A", -2),
+                    _competition("B", 1), _competition("Z", -5)]
+    calendar = CompetitionCalendar(competitions)
+
+    assert [c.name for c in calendar.all()] == ["Z", "A", "B", "C"]
+    assert [c.name for c in calendar.past()] == ["Z", "A"]
+    assert [c.name for c in calendar.upcoming()] == ["B", "C"]
+
+
+def test_calendar_split_follows_time(frozen_now):
+    """
+    Test when a competition starts: it moves to the past ones.
+    """
+    calendar = CompetitionCalendar(
+        [_competition("A", 1), _competition("B", 2)]
+    )
+    assert [c.name for c in calendar.upcoming()] == ["A", "B"]
+
+    frozen_now.now.return_value = NOW + timedelta(days=1, hours=1)
+
+    assert [c.name for c in calendar.past()] == ["A"]
+    assert [c.name for c in calendar.upcoming()] == ["B"]
+
+
+def test_calendar_add_remove_replace(frozen_now):
+    """
+    Test when competitions are added, removed and replaced.
+    """
+    a, b = _competition("A", -1), _competition("B", 2)
+    calendar = CompetitionCalendar([a, b])
+    calendar.upcoming()
+
+    old = _competition("Old", -3)
+    calendar.add(old)
+    calendar.add(_competition("Soon", 1))
+    assert [c.name for c in calendar.past()] == ["Old", "A"]
+    assert [c.name for c in calendar.upcoming()] == ["Soon", "B"]
+
+    calendar.remove(old)
+    assert [c.name for c in calendar.past()] == ["A"]
+
+    moved = _competition("A", 5)
+    calendar.replace(a, moved)
+    assert calendar.past() == []
+    assert calendar.upcoming()[-1] is moved
+
+
+def test_calendar_accepts_plain_dicts(frozen_now):
+    """
+    Test when the competitions are dicts from the JSON files.
+    """
+    calendar = CompetitionCalendar([
+        {"name": "B", "date": "2030-06-03 10:00:00"},
+        {"name": "A", "date": "2030-05-01 10:00:00"},
+    ])
+    assert [c["name"] for c in calendar.past()] == ["A"]
+    assert [c["name"] for c in calendar.upcoming()] == ["B"]
+
+
+def test_unindexed_list_gets_its_own_calendar(frozen_now):
+    """
+    Test when the competitions list has no maintained calendar.
+    """
+    competitions = [_competition("A", 1)]
+    assert get_calendar(competitions).upcoming() == competitions
+
+
+
+########################################################
+#               COMPETITIONS PAGES TESTS
+########################################################
+
+
+def _names(competitions):
+    return [competition.name for competition in competitions]
+
+
+def test_calendar_pages_follow_each_other(frozen_now):
+    """
+    Test when the upcoming competitions span several pages.
+    """
+    calendar = CompetitionCalendar(
+        [_competition(f"C{i}", i) for i in range(-2, 6)]
+    )
+
+    page, after = calendar.page(limit=2)
+    assert _names(page) == ["C1", "C2"]
+    page, after = calendar.page(after=after, limit=2)
+    assert _names(page) == ["C3", "C4"]
+    page, after = calendar.page(after=after, limit=2)
+    assert _names(page) == ["C5"]
+    assert after is None
+
+
+def test_calendar_page_with_past_competitions(frozen_now):
+    """
+    Test when past competitions are listed too.
+    """
+    calendar = CompetitionCalendar(
+        [_competition("Past", -1), _competition("Next", 1)]
+    )
+    page, after = calendar.page(limit=5, upcoming_only=False)
+    assert _names(page) == ["Past", "Next"]
+    assert after is None
+
+
+def test_calendar_page_with_places_left(frozen_now):
+    """
+    Test when only the competitions with places left are listed.
+    """
+    full = _competition("Full", 1)
+    full.number_of_places = 0
+    calendar = CompetitionCalendar(
+        [full, _competition("Open", 2), _competition("Later", 3)]
+    )
+    page, after = calendar.page(limit=1, with_places=True)
+    assert _names(page) == ["Open"]
+    page, after = calendar.page(after=after, limit=1, with_places=True)
+    assert _names(page) == ["Later"]
+
+
+def test_calendar_page_orders_same_date_by_name(frozen_now):
+    """
+    Test when competitions share the same date.
+    """
+    date = NOW + timedelta(days=1)
+    calendar = CompetitionCalendar(
+        [Competition(name, date, 10) for name in ("B", "C", "A")]
+    )
+    page, after = calendar.page(limit=2)
+    assert _names(page) == ["A", "B"]
+    page, after = calendar.page(after=after, limit=2)
+    assert _names(page) == ["C"]
+
+
+def test_cursor_round_trip():
+    """
+    Test when a calendar key is encoded into a cursor and back.
+    """
+    key = (datetime(2030, 1, 2, 3, 4, 5), "Comp A")
+    assert decode_cursor(encode_cursor(key)) == key
+
+
+def test_invalid_cursor():
+    """
+    Test when the cursor is missing or invalid: the first page is shown.
+    """
+    assert decode_cursor(None) is None
+    assert decode_cursor("not a cursor!") is None
+    assert decode_cursor("bnVsbA==") is None
+
+
+@pytest.mark.parametrize("key", [
+    ["2030-01-02T03:04:05+00:00", "Comp A"],
+    ["2030-01-02T03:04:05", 1],
+    ["2030-01-02T03:04:05", None],
+])
+def test_cursor_not_comparable_with_the_calendar(frozen_now, key):
+    """
+    Test when the cursor decodes to a key the calendar cannot compare
+    (an aware date, a name which is not a string): the first page is
+    shown.
+    """
+    cursor = base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+    assert decode_cursor(cursor) is None
+    competitions = [_competition("C1", 1)]
+    page, _ = get_competitions_page(competitions, after=cursor)
+    assert _names(page) == ["C1"]
+
+
+def test_get_competitions_page(frozen_now):
+    """
+    Test when the pages are requested with cursors.
+    """
+    competitions = [_competition(f"C{i}", i) for i in range(1, 4)]
+    page, cursor = get_competitions_page(competitions, limit=2)
+    assert _names(page) == ["C1", "C2"]
+    page, cursor = get_competitions_page(competitions, after=cursor, limit=2)
+    assert _names(page) == ["C3"]
+    assert cursor is None
+
+
+def test_name_cursor_round_trip():
+    """
+    Test when a club name is encoded into a cursor and back.
+    """
+    assert decode_name_cursor(encode_name_cursor("Club & Co")) == "Club & Co"
+    assert decode_name_cursor(None) is None
+    assert decode_name_cursor("not a cursor!") is None
+    assert decode_name_cursor(encode_name_cursor(1)) is None
+
+
+def test_get_clubs_page():
+    """
+    Test when the clubs are paged by name, whatever their order.
+    """
+    clubs = [{"name": name} for name in ("Club C", "Club A", "Club B")]
+    page, cursor = get_clubs_page(clubs, limit=2)
+    assert page == [clubs[1], clubs[2]]
+    page, cursor = get_clubs_page(list(reversed(clubs)), after=cursor)
+    assert page == [clubs[0]]
+    assert cursor is None
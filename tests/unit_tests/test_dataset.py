@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from dataset import (
+    FULL_SHARE,
+    LOAD_TEST_CAPACITY,
+    PAST_SHARE,
+    generate_dataset
+)
+from models import Club, Competition
+
+TODAY = datetime(2030, 6, 15, 14, 20)
+
+
+def test_generated_counts():
+    """Test that the requested numbers of records are generated"""
+    clubs, competitions = generate_dataset(50, 20, today=TODAY)
+    assert len(clubs) == 50 and all(isinstance(c, Club) for c in clubs)
+    assert len(competitions) == 20
+    assert all(isinstance(c, Competition) for c in competitions)
+
+
+def test_same_seed_same_data():
+    """Test that a seed always generates the same data on a given day"""
+    assert generate_dataset(100, 100, seed=7, today=TODAY) == \
+        generate_dataset(100, 100, seed=7, today=TODAY)
+    assert generate_dataset(100, 100, seed=7, today=TODAY) != \
+        generate_dataset(100, 100, seed=8, today=TODAY)
+
+
+def test_clubs_do_not_depend_on_competitions():
+    """Test that the clubs are the same whatever the competitions"""
+    assert generate_dataset(100, 1, today=TODAY)[0] == \
+        generate_dataset(100, 50, today=TODAY)[0]
+
+
+def test_names_and_emails_are_unique():
+    """Test that the clubs can be looked up by name and email"""
+    clubs, competitions = generate_dataset(5000, 5000, today=TODAY)
+    assert len({club.name for club in clubs}) == 5000
+    assert len({club.email for club in clubs}) == 5000
+    assert len({comp.name for comp in competitions}) == 5000
+
+
+def test_points_distribution():
+    """Test that most clubs have a few points, and a few many more"""
+    clubs, _ = generate_dataset(5000, 0, today=TODAY)
+    points = sorted(club.points for club in clubs)
+    assert all(0 <= p <= 1000 for p in points)
+    assert 5 <= points[len(points) // 2] <= 15
+    assert points[-1] > 50
+
+
+def test_competition_dates_and_places():
+    """
+    Test that the competitions are mostly upcoming, in the daytime, with
+    a few of them full.
+    """
+    _, competitions = generate_dataset(0, 5000, today=TODAY)
+    past = sum(comp.date < TODAY for comp in competitions) / 5000
+    full = sum(comp.number_of_places == 0 for comp in competitions) / 5000
+    assert abs(past - PAST_SHARE) < 0.03
+    assert abs(full - FULL_SHARE) < 0.02
+    assert all(8 <= comp.date.hour < 18 for comp in competitions)
+    assert all(0 <= comp.number_of_places <= 100 for comp in competitions)
+
+
+def test_load_test_capacity():
+    """
+    Test that load test data has the same names, with every competition
+    upcoming and bookable by every club.
+    """
+    clubs, competitions = generate_dataset(200, 200, today=TODAY)
+    big_clubs, big_competitions = generate_dataset(
+        200, 200, today=TODAY, capacity=LOAD_TEST_CAPACITY
+    )
+    assert [c.name for c in big_clubs] == [c.name for c in clubs]
+    assert [c.name for c in big_competitions] == \
+        [c.name for c in competitions]
+    assert all(club.points == LOAD_TEST_CAPACITY for club in big_clubs)
+    assert all(
+        comp.date > TODAY and comp.number_of_places == LOAD_TEST_CAPACITY
+        for comp in big_competitions
+    )
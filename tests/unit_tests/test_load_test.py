@@ -0,0 +1,145 @@
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+import data_manager
+from config import BASE_DIR
+from data_manager import JsonStorage, load_data, save_json
+from dataset import LOAD_TEST_CAPACITY
+from load_test import (
+    MAX_CLUBS,
+    MAX_COMPETITIONS,
+    init_load_test,
+    uses_shipped_data,
+)
+
+
+@pytest.fixture
+def load_test_app(tmp_path):
+    """An app with the load test endpoints, on data of its own"""
+    settings = {
+        "STORAGE_BACKEND": "json",
+        "JSON_CLUBS": str(tmp_path / "clubs.json"),
+        "JSON_COMPETITIONS": str(tmp_path / "competitions.json"),
+        "JSON_JOURNAL": str(tmp_path / "bookings.journal"),
+    }
+    save_json(settings["JSON_CLUBS"], [
+        {"name": "Club A", "email": "a@test.com", "points": "10"},
+    ], "clubs")
+    save_json(settings["JSON_COMPETITIONS"], [], "competitions")
+    mock_app = Flask("load_test")
+    mock_app.config.update(settings)
+    init_load_test(mock_app)
+
+    storage = JsonStorage(
+        settings["JSON_CLUBS"], settings["JSON_COMPETITIONS"],
+        settings["JSON_JOURNAL"]
+    )
+    # The app's data, indexed again once the test data is dropped
+    data_manager.get_clubs()
+    with patch.object(data_manager, "STORAGE", storage), \
+         patch.object(data_manager, "CLUBS", None), \
+         patch.object(data_manager, "COMPETITIONS", None):
+        yield mock_app
+    data_manager.build_indexes()
+
+
+def test_reset_generates_data(load_test_app):
+    """
+    Test when the data is reset: it is replaced by generated data with
+    room for every booking, in memory and in the files.
+    """
+    with load_test_app.test_client() as client:
+        response = client.post("/_load_test/reset", json={
+            "clubs": 20, "competitions": 5, "seed": 3
+        })
+
+    assert response.status_code == 200
+    assert response.get_json() == {"clubs": 20, "competitions": 5, "seed": 3}
+    clubs = data_manager.get_clubs()
+    assert len(clubs) == 20 and len(data_manager.get_competitions()) == 5
+    assert clubs[0]["points"] == LOAD_TEST_CAPACITY
+    assert data_manager.get_obj_by_field("name", "Club A", clubs) is None
+    saved = load_data(load_test_app.config["JSON_CLUBS"], "clubs")
+    assert [club["name"] for club in saved] == [c["name"] for c in clubs]
+
+
+def test_reset_defaults(load_test_app):
+    """Test when the data is reset without a body: the default sizes"""
+    with load_test_app.test_client() as client:
+        response = client.post("/_load_test/reset")
+
+    assert response.get_json() == {
+        "clubs": 1000, "competitions": 100, "seed": 0
+    }
+    assert len(data_manager.get_clubs()) == 1000
+
+
+@pytest.mark.parametrize("body", [
+    {"clubs": -1},
+    {"clubs": "10"},
+    {"competitions": True},
+    {"seed": 1.5},
+])
+def test_reset_rejects_invalid_sizes(load_test_app, body):
+    """Test when the sizes of a reset are invalid: nothing is replaced"""
+    with load_test_app.test_client() as client:
+        response = client.post("/_load_test/reset", json=body)
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid data provided"}
+    assert [club["name"] for club in data_manager.get_clubs()] == ["Club A"]
+
+
+@pytest.mark.parametrize("body", [
+    {"clubs": MAX_CLUBS + 1},
+    {"competitions": MAX_COMPETITIONS + 1},
+])
+def test_reset_rejects_too_large_sizes(load_test_app, body):
+    """Test when a reset would generate too much data: nothing is replaced"""
+    with load_test_app.test_client() as client:
+        response = client.post("/_load_test/reset", json=body)
+
+    assert response.status_code == 400
+    assert response.get_json() == {
+        "error": "At most 100000 clubs and 10000 competitions can be generated"
+    }
+    assert [club["name"] for club in data_manager.get_clubs()] == ["Club A"]
+
+
+def test_reset_is_post_only(load_test_app):
+    """Test that a GET cannot reset the data"""
+    with load_test_app.test_client() as client:
+        assert client.get("/_load_test/reset").status_code == 405
+
+
+def test_shipped_data_is_detected(tmp_path):
+    """Test that the data shipped with the app is told from other data"""
+    assert uses_shipped_data({
+        "STORAGE_BACKEND": "json",
+        "JSON_CLUBS": str(BASE_DIR / "clubs.json"),
+        "JSON_COMPETITIONS": str(tmp_path / "competitions.json"),
+    })
+    assert uses_shipped_data({
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_DATABASE": str(BASE_DIR / "gudlft.db"),
+    })
+    assert not uses_shipped_data({
+        "STORAGE_BACKEND": "json",
+        "JSON_CLUBS": str(tmp_path / "clubs.json"),
+        "JSON_COMPETITIONS": str(tmp_path / "competitions.json"),
+    })
+
+
+def test_load_test_refused_on_shipped_data():
+    """Test that the endpoints are not added on the shipped data"""
+    mock_app = Flask("shipped")
+    mock_app.config.update(
+        STORAGE_BACKEND="json",
+        JSON_CLUBS=str(BASE_DIR / "clubs.json"),
+        JSON_COMPETITIONS=str(BASE_DIR / "competitions.json"),
+    )
+    with pytest.raises(RuntimeError):
+        init_load_test(mock_app)
+    assert "load_test" not in mock_app.blueprints
@@ -0,0 +1,155 @@
+import pytest
+from flask import Flask, render_template_string
+
+from metrics import (
+    BOOKINGS,
+    METRICS,
+    Metrics,
+    count_booking,
+    format_labels,
+    init_metrics,
+    record_stage,
+    server_timing,
+    timed
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    """Start each test without recorded metrics"""
+    METRICS.clear()
+    yield
+    METRICS.clear()
+
+
+########################################################
+#                   METRICS TESTS
+########################################################
+
+
+def test_histogram_is_cumulative():
+    """Test that the histogram buckets count the values below them"""
+    metrics = Metrics()
+    for value in (0.0001, 0.003, 0.003, 20):
+        metrics.observe("latency", (("route", "/"),), value)
+
+    lines = metrics.render().splitlines()
+
+    assert "# TYPE latency histogram" in lines
+    assert 'latency_bucket{route="/",le="0.0005"} 1' in lines
+    assert 'latency_bucket{route="/",le="0.0025"} 1' in lines
+    assert 'latency_bucket{route="/",le="0.005"} 3' in lines
+    assert 'latency_bucket{route="/",le="10.0"} 3' in lines
+    assert 'latency_bucket{route="/",le="+Inf"} 4' in lines
+    assert 'latency_count{route="/"} 4' in lines
+
+
+def test_counter():
+    """Test that the counters add up"""
+    metrics = Metrics()
+    metrics.inc("bookings", (("result", "booked"),))
+    metrics.inc("bookings", (("result", "booked"),), 2)
+
+    lines = metrics.render().splitlines()
+
+    assert "# TYPE bookings counter" in lines
+    assert 'bookings{result="booked"} 3' in lines
+
+
+def test_label_values_are_escaped():
+    """Test that quotes and backslashes in label values are escaped"""
+    assert format_labels((("reason", 'a "b" \\c'),)) == (
+        '{reason="a \\"b\\" \\\\c"}'
+    )
+    assert format_labels(()) == ""
+
+
+def test_count_booking():
+    """Test that bookings are counted by result and reason"""
+    count_booking(None)
+    count_booking("Not enough places available")
+
+    page = METRICS.render()
+
+    assert f'{BOOKINGS}{{result="booked",reason=""}} 1' in page
+    assert (
+        f'{BOOKINGS}{{result="refused",'
+        f'reason="Not enough places available"}} 1'
+    ) in page
+
+
+def test_disabled_metrics_record_nothing():
+    """Test that nothing is recorded when the metrics are disabled"""
+    METRICS.enabled = False
+    try:
+        with timed("lookup"):
+            pass
+        record_stage("render", 0.1)
+        count_booking(None)
+    finally:
+        METRICS.enabled = True
+
+    assert METRICS.render() == "\n"
+
+
+def test_server_timing():
+    """Test the Server-Timing header value"""
+    assert server_timing({"render": 0.0021}, 0.005) == (
+        "render;dur=2.10, total;dur=5.00"
+    )
+
+
+########################################################
+#                FLASK INTEGRATION TESTS
+########################################################
+
+
+@pytest.fixture
+def metrics_app():
+    """A Flask app with its requests timed"""
+    mock_app = Flask("metrics")
+    init_metrics(mock_app)
+
+    @mock_app.route("/page/<name>")
+    def page(name):
+        with timed("lookup"):
+            pass
+        return render_template_string("Hello {{ name }}", name=name)
+
+    return mock_app
+
+
+def test_requests_are_timed_by_route(metrics_app):
+    """Test that the latency is recorded by route, not by URL"""
+    with metrics_app.test_client() as client:
+        client.get("/page/a")
+        client.get("/page/b")
+        page = client.get("/metrics").data.decode()
+
+    assert (
+        'gudlft_request_duration_seconds_count'
+        '{route="/page/<name>",method="GET",status="200"} 2'
+    ) in page
+    assert 'gudlft_stage_duration_seconds_count{stage="render"} 2' in page
+    assert 'gudlft_stage_duration_seconds_count{stage="lookup"} 2' in page
+
+
+def test_server_timing_header(metrics_app):
+    """Test that each response tells the time of its stages"""
+    with metrics_app.test_client() as client:
+        response = client.get("/page/a")
+
+    header = response.headers["Server-Timing"]
+    assert header.startswith("lookup;dur=")
+    assert ", render;dur=" in header
+    assert ", total;dur=" in header
+
+
+def test_metrics_endpoint_format(metrics_app):
+    """Test that /metrics answers in the Prometheus text format"""
+    with metrics_app.test_client() as client:
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert "version=0.0.4" in response.content_type
@@ -0,0 +1,121 @@
+import json
+import pytest
+from datetime import datetime
+
+from models import Club, Competition, to_json
+
+
+########################################################
+#                   CLUB TESTS
+########################################################
+
+
+def test_club_from_dict_parses_points():
+    """
+    Test when a club is created from its JSON form.
+    """
+    club = Club.from_dict(
+        {"name": "Club A", "email": "a@test.com", "points": "13"}
+    )
+    assert club.name == "Club A"
+    assert club.email == "a@test.com"
+    assert club.points == 13
+
+def test_club_to_dict_keeps_json_shape():
+    """
+    Test when a club is serialized back to its JSON form.
+    """
+    data = {"name": "Club A", "email": "a@test.com", "points": "13"}
+    assert Club.from_dict(data).to_dict() == data
+
+def test_club_has_no_instance_dict():
+    """
+    Test that a club only stores its slots.
+    """
+    club = Club("Club A", "a@test.com", 13)
+    assert not hasattr(club, "__dict__")
+    with pytest.raises(AttributeError):
+        club.unknown = 1
+
+
+########################################################
+#               COMPETITION TESTS
+########################################################
+
+
+def test_competition_from_dict_parses_fields():
+    """
+    Test when a competition is created from its JSON form.
+    """
+    competition = Competition.from_dict({
+        "name": "Comp A",
+        "date": "2020-03-27 10:00:00",
+        "number_of_places": "13"
+    })
+    assert competition.date == datetime(2020, 3, 27, 10)
+    assert competition.number_of_places == 13
+
+def test_competition_to_dict_keeps_json_shape():
+    """
+    Test when a competition is serialized back to its JSON form.
+    """
+    data = {
+        "name": "Comp A",
+        "date": "2020-03-27 10:00:00",
+        "number_of_places": 25
+    }
+    assert Competition.from_dict(data).to_dict() == data
+
+
+########################################################
+#               MAPPING ACCESS TESTS
+########################################################
+
+
+def test_record_item_access():
+    """
+    Test when the fields are read and written like dict items.
+    """
+    club = Club("Club A", "a@test.com", 13)
+    assert club["points"] == 13
+    club["points"] = 10
+    assert club.points == 10
+
+def test_record_unknown_item():
+    """
+    Test when an unknown field is accessed like a dict item.
+    """
+    club = Club("Club A", "a@test.com", 13)
+    with pytest.raises(KeyError):
+        club["unknown"]
+    with pytest.raises(KeyError):
+        club["unknown"] = 1
+
+def test_record_equality():
+    """
+    Test when two records are compared.
+    """
+    assert Club("Club A", "a@test.com", 13) == Club("Club A", "a@test.com", 13)
+    assert Club("Club A", "a@test.com", 13) != Club("Club A", "a@test.com", 1)
+
+
+########################################################
+#               SERIALIZATION TESTS
+########################################################
+
+
+def test_records_are_serialized_to_json():
+    """
+    Test when records are dumped with the to_json hook.
+    """
+    clubs = [Club("Club A", "a@test.com", 13)]
+    assert json.loads(json.dumps({"clubs": clubs}, default=to_json)) == {
+        "clubs": [{"name": "Club A", "email": "a@test.com", "points": "13"}]
+    }
+
+def test_other_objects_are_not_serialized():
+    """
+    Test when an object is neither JSON nor a record.
+    """
+    with pytest.raises(TypeError):
+        json.dumps({"clubs": [object()]}, default=to_json)
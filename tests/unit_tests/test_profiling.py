@@ -0,0 +1,131 @@
+import json
+import pstats
+
+from flask import Flask
+
+from profiling import RequestProfiler, init_profiling
+
+
+def profiled_app(directory, **settings):
+    """A Flask app with a page and a failing page, profiled"""
+    mock_app = Flask("profiled")
+    mock_app.config.update(
+        PROFILE_DIR=str(directory),
+        PROFILE_SAMPLE_RATE=settings.get("sample_rate", 0.0),
+        PROFILE_ROUTES=settings.get("routes", ()),
+        PROFILE_SLOW_MS=settings.get("slow_ms", 0.0),
+        PROFILE_MAX_FILES=settings.get("max_files", 100),
+    )
+    init_profiling(mock_app)
+
+    @mock_app.route("/page/<name>")
+    def page(name):
+        return f"Hello {name}"
+
+    @mock_app.route("/other")
+    def other():
+        return "Other"
+
+    return mock_app
+
+
+def written_profiles(directory):
+    """Return the metadata of the profiles written to `directory`"""
+    profiles = []
+    for path in sorted(directory.glob("*.json")):
+        with open(path) as f:
+            profiles.append(json.load(f))
+        assert path.with_suffix(".prof").exists()
+    return profiles
+
+
+########################################################
+#                   PROFILER TESTS
+########################################################
+
+
+def test_matching_routes_are_profiled(tmp_path):
+    """Test that the requests to PROFILE_ROUTES are all profiled"""
+    mock_app = profiled_app(tmp_path, routes=("/page/<name>",))
+    with mock_app.test_client() as client:
+        client.get("/page/a")
+        client.get("/other")
+
+    profiles = written_profiles(tmp_path)
+    assert len(profiles) == 1
+    assert profiles[0]["route"] == "/page/<name>"
+    assert profiles[0]["path"] == "/page/a"
+    assert profiles[0]["status"] == 200
+    assert profiles[0]["duration_ms"] >= 0
+    assert "clubs" in profiles[0] and "competitions" in profiles[0]
+
+
+def test_profile_can_be_read(tmp_path):
+    """Test that the profiles are readable by pstats"""
+    mock_app = profiled_app(tmp_path, sample_rate=1.0)
+    with mock_app.test_client() as client:
+        client.get("/other")
+
+    (profile,) = tmp_path.glob("*.prof")
+    stats = pstats.Stats(str(profile))
+    assert any(func[2] == "other" for func in stats.stats)
+
+
+def test_sample_rate(tmp_path):
+    """Test that no request is profiled with a null sample rate"""
+    mock_app = profiled_app(tmp_path, sample_rate=0.0)
+    with mock_app.test_client() as client:
+        client.get("/other")
+
+    assert written_profiles(tmp_path) == []
+
+
+def test_only_slow_requests_are_written(tmp_path):
+    """Test that the profiles of the fast requests are dropped"""
+    mock_app = profiled_app(tmp_path, sample_rate=1.0, slow_ms=60_000)
+    with mock_app.test_client() as client:
+        client.get("/other")
+
+    assert written_profiles(tmp_path) == []
+    # The profiler is free for the next request
+    assert mock_app.extensions["profiler"]._busy.acquire(blocking=False)
+
+
+def test_profiles_are_capped(tmp_path):
+    """Test that profiling stops after PROFILE_MAX_FILES profiles"""
+    mock_app = profiled_app(tmp_path, sample_rate=1.0, max_files=2)
+    with mock_app.test_client() as client:
+        for _ in range(4):
+            client.get("/other")
+
+    assert len(written_profiles(tmp_path)) == 2
+
+
+def test_one_request_profiled_at_a_time(tmp_path):
+    """Test that a request is not profiled while another one is"""
+    mock_app = profiled_app(tmp_path, sample_rate=1.0)
+    profiler = mock_app.extensions["profiler"]
+    profiler._busy.acquire()
+    with mock_app.test_client() as client:
+        client.get("/other")
+    profiler._busy.release()
+
+    assert written_profiles(tmp_path) == []
+
+
+def test_failed_write_does_not_fail_the_request(tmp_path):
+    """Test that a request is answered even if its profile is not saved"""
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    mock_app = profiled_app(blocker / "profiles", sample_rate=1.0)
+    with mock_app.test_client() as client:
+        response = client.get("/other")
+
+    assert response.status_code == 200
+
+
+def test_profiler_defaults():
+    """Test that the profiler samples nothing by default"""
+    profiler = RequestProfiler("profiles")
+    assert profiler.sample_rate == 0.0
+    assert not profiler.wants("/")
@@ -0,0 +1,103 @@
+from unittest.mock import patch
+
+import pytest
+
+from locust_files.saturation import (
+    find_saturation,
+    main,
+    read_steps,
+    server_command,
+    svg_chart,
+    write_html
+)
+
+HISTORY_CSV = (
+    "Timestamp,User Count,Type,Name,Requests/s,Failures/s,50%,95%,99%\n"
+    "1000,0,,Aggregated,0.000000,0.000000,N/A,N/A,N/A\n"
+    "1001,10,,Aggregated,5.0,0.0,10,20,30\n"
+    "1002,10,GET,/,2.0,0.0,10,20,30\n"
+    "1012,10,,Aggregated,10.0,0.0,12,24,36\n"
+    "1014,10,,Aggregated,12.0,0.0,14,28,42\n"
+    "1021,20,,Aggregated,15.0,0.0,20,40,60\n"
+    "1031,20,,Aggregated,20.0,1.0,20,50,80\n"
+)
+
+
+def steps(*throughputs):
+    return [
+        {"users": 10 * (i + 1), "rps": rps, "error_rate": 0.0,
+         "p50": 10.0, "p95": 20.0, "p99": 30.0}
+        for i, rps in enumerate(throughputs)
+    ]
+
+
+def test_read_steps(tmp_path):
+    """Test that each step is averaged once its warmup passed"""
+    history = tmp_path / "locust_stats_history.csv"
+    history.write_text(HISTORY_CSV)
+
+    result = read_steps(str(history), warmup=10)
+
+    assert [step["users"] for step in result] == [10, 20]
+    assert result[0]["rps"] == 11.0
+    assert result[0]["p95"] == 26.0
+    assert result[1]["rps"] == 20.0
+    assert result[1]["error_rate"] == 0.05
+
+
+def test_find_saturation():
+    """Test that saturation is the last step before the growth stalls"""
+    assert find_saturation(steps(10, 20, 30, 31, 29))["users"] == 30
+    assert find_saturation(steps(10, 20, 30)) is None
+    assert find_saturation([]) is None
+
+
+def test_server_command():
+    """Test the commands of the server configurations"""
+    assert "flask" in server_command("dev")(5000)
+    command = server_command("4x8")(5000)
+    assert command[command.index("--workers") + 1] == "4"
+    assert command[command.index("--threads") + 1] == "8"
+
+
+def test_missing_gunicorn_is_reported_up_front(tmp_path, capsys):
+    """Test that the WxT configurations are refused without gunicorn"""
+    argv = ["saturation.py", "--configs", "dev,2x4",
+            "--output", str(tmp_path / "reports")]
+    with patch("sys.argv", argv), \
+         patch("importlib.util.find_spec", return_value=None), \
+         patch("locust_files.saturation.running_app") as mock_running:
+        with pytest.raises(SystemExit) as exit_info:
+            main()
+
+    assert exit_info.value.code == 2
+    assert "pip install gunicorn" in capsys.readouterr().err
+    mock_running.assert_not_called()
+    assert not (tmp_path / "reports").exists()
+
+
+def test_report(tmp_path):
+    """Test that the report charts the steps and marks the saturation"""
+    sweep = steps(10, 20, 30, 31)
+    report = tmp_path / "dev.html"
+
+    write_html("dev", sweep, find_saturation(sweep), report)
+
+    page = report.read_text()
+    assert "Saturated at 30 users, 30.0 requests/s" in page
+    assert page.count("<svg") == 2
+    assert 'stroke="red"' in page
+
+
+def test_report_without_saturation(tmp_path):
+    """Test that the report tells when the load was not high enough"""
+    report = tmp_path / "dev.html"
+
+    write_html("dev", steps(10, 20), None, report)
+
+    assert "still growing at 20 users" in report.read_text()
+
+
+def test_chart_without_data():
+    """Test that a chart without values says so"""
+    assert "no data" in svg_chart([(10, None)], "p95 latency", "ms")
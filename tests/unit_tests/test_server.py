@@ -1,7 +1,13 @@
+import json
+
 import pytest
 from unittest.mock import patch, MagicMock
 from flask import Flask
-from server import create_app, app
+import data_manager
+from config import BASE_DIR, config
+from dataset import LOAD_TEST_CAPACITY
+from metrics import METRICS
+from server import create_app, app, RenderCache
 
 
 ########################################################
@@ -31,8 +37,8 @@ def mock_json_functions():
         }
     ]
     
-    with patch('server.CLUBS', clubs_data), \
-         patch('server.COMPETITIONS', competitions_data):
+    with patch('data_manager.CLUBS', clubs_data), \
+         patch('data_manager.COMPETITIONS', competitions_data):
         yield
 
 
@@ -41,6 +47,14 @@ def mock_json_functions():
 ########################################################
 
 
+# The configuration of the data shipped with the app
+SHIPPED_SETTINGS = {
+    "STORAGE_BACKEND": "json",
+    "JSON_CLUBS": str(BASE_DIR / "clubs.json"),
+    "JSON_COMPETITIONS": str(BASE_DIR / "competitions.json"),
+}
+
+
 class TestCreateApp:
     """Unit tests for the create_app function"""
     
@@ -58,6 +72,101 @@ class TestCreateApp:
         """Test that the configuration is loaded"""
         test_app = create_app()
         assert test_app.config is not None
+
+    def test_create_app_starts_data_watcher(self):
+        """Test that the data files are watched if DATA_RELOAD_INTERVAL"""
+        with patch.object(config["default"], "DATA_RELOAD_INTERVAL", 2.0), \
+             patch('server.DataWatcher') as mock_watcher:
+            test_app = create_app()
+        mock_watcher.assert_called_once_with(test_app, 2.0)
+        mock_watcher.return_value.start.assert_called_once()
+        assert test_app.extensions["data_watcher"] is mock_watcher.return_value
+        assert "data_watcher" not in create_app().extensions
+
+    def test_create_app_profiles_requests(self, tmp_path):
+        """Test that the requests are profiled if PROFILE_DIR is set"""
+        with patch.object(config["default"], "PROFILE_DIR", str(tmp_path)):
+            test_app = create_app()
+        assert test_app.extensions["profiler"].directory == str(tmp_path)
+        assert "profiler" not in create_app().extensions
+
+    def test_create_app_disables_metrics(self):
+        """Test that nothing is timed or counted if METRICS is off"""
+        with patch.object(config["default"], "METRICS", False), \
+             patch.object(METRICS, "enabled", True):
+            test_app = create_app()
+            assert METRICS.enabled is False
+        assert "metrics" not in test_app.view_functions
+        create_app()
+        assert METRICS.enabled is True
+
+    def test_create_app_refuses_load_test_on_shipped_data(self):
+        """Test that LOAD_TEST cannot reset the data shipped with the app"""
+        with patch.object(config["default"], "LOAD_TEST", True), \
+             pytest.raises(RuntimeError, match="LOAD_TEST resets the data"):
+            create_app()
+
+    def test_create_app_adds_load_test_endpoints(self, tmp_path):
+        """Test that LOAD_TEST adds the reset endpoint on other data"""
+        with patch.object(config["default"], "LOAD_TEST", True), \
+             patch.object(config["default"], "JSON_CLUBS",
+                          str(tmp_path / "clubs.json")), \
+             patch.object(config["default"], "JSON_COMPETITIONS",
+                          str(tmp_path / "competitions.json")), \
+             patch.object(data_manager, "STORAGE", None):
+            test_app = create_app()
+        assert "load_test" in test_app.blueprints
+        assert "load_test" not in create_app().blueprints
+
+    def test_generate_data_command(self, tmp_path):
+        """Test that the generate-data command writes a dataset"""
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=[
+            "generate-data", "--clubs", "20", "--competitions", "5",
+            "--output", str(tmp_path)
+        ])
+        assert result.exit_code == 0
+        assert "Generated 20 clubs and 5 competitions" in result.output
+        with open(tmp_path / "clubs.json") as f:
+            assert len(json.load(f)["clubs"]) == 20
+        with open(tmp_path / "competitions.json") as f:
+            assert len(json.load(f)["competitions"]) == 5
+
+    def test_generate_data_refuses_shipped_data(self):
+        """Test that the data shipped with the app is kept without --force"""
+        runner = app.test_cli_runner()
+        with patch.dict(app.config, SHIPPED_SETTINGS), \
+             patch("server.create_storage") as mock_storage:
+            result = runner.invoke(args=["generate-data", "--clubs", "2"])
+        assert result.exit_code == 2
+        assert "--force" in result.output
+        mock_storage.assert_not_called()
+
+    def test_generate_data_forced_on_shipped_data(self):
+        """Test that --force overwrites the data shipped with the app"""
+        runner = app.test_cli_runner()
+        with patch.dict(app.config, SHIPPED_SETTINGS), \
+             patch("server.create_storage") as mock_storage:
+            result = runner.invoke(args=[
+                "generate-data", "--clubs", "2", "--competitions", "1",
+                "--force"
+            ])
+        assert result.exit_code == 0
+        mock_storage.return_value.replace.assert_called_once()
+
+    def test_generate_load_test_data_command(self, tmp_path):
+        """Test that --load-test generates data every booking can use"""
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=[
+            "generate-data", "--clubs", "3", "--competitions", "2",
+            "--load-test", "--output", str(tmp_path)
+        ])
+        assert result.exit_code == 0
+        with open(tmp_path / "competitions.json") as f:
+            competitions = json.load(f)["competitions"]
+        assert {c["number_of_places"] for c in competitions} == {
+            LOAD_TEST_CAPACITY
+        }
     
 
 ########################################################
@@ -121,6 +230,90 @@ class TestSummaryRoute:
             assert response.status_code == 302
 
 
+########################################################
+#           SHOW COMPETITIONS ROUTE TESTS
+########################################################
+
+
+def log_in(client, club_name):
+    """Log the club in, as show_summary does"""
+    with client.session_transaction() as session:
+        session["club"] = club_name
+
+
+class TestShowCompetitionsRoute:
+    """Unit tests for the show_competitions route"""
+
+    def test_show_competitions_requires_login(
+        self, test_app, mock_json_functions):
+        """Test that the page of a club is only shown to that club"""
+        with test_app.test_client() as client:
+            response = client.get('/competitions/Iron Temple')
+            assert response.status_code == 302
+
+            log_in(client, "Simply Lift")
+            response = client.get('/competitions/Iron Temple')
+            assert response.status_code == 302
+            assert b"admin@irontemple.com" not in response.data
+
+    def test_show_competitions_after_login(
+        self, test_app, mock_json_functions):
+        """Test that the club logged in sees its pages until logout"""
+        with test_app.test_client() as client:
+            client.post('/show_summary', data={'email': 'john@simplylift.co'})
+            response = client.get('/competitions/Simply Lift')
+            assert response.status_code == 200
+
+            client.get('/logout')
+            response = client.get('/competitions/Simply Lift')
+            assert response.status_code == 302
+
+    def test_show_competitions_with_valid_club(
+        self, test_app, mock_json_functions):
+        """Test that show_competitions returns 200 with a valid club"""
+        with test_app.test_client() as client:
+            log_in(client, "Simply Lift")
+            response = client.get(
+                '/competitions/Simply Lift?upcoming=0'
+            )
+            assert response.status_code == 200
+            assert b"Spring Festival" in response.data
+
+    def test_show_competitions_with_invalid_club(
+        self, test_app, mock_json_functions):
+        """Test that show_competitions returns 302 with an invalid club"""
+        with test_app.test_client() as client:
+            response = client.get('/competitions/Invalid Club')
+            assert response.status_code == 302
+
+    def test_show_competitions_links_next_page(
+        self, test_app, mock_json_functions):
+        """Test that a next page link is shown after a full page"""
+        competitions = [
+            {
+                "name": f"Competition {i}",
+                "date": f"2099-01-{i + 1:02d} 10:00:00",
+                "number_of_places": 10
+            }
+            for i in range(3)
+        ]
+        with patch('data_manager.COMPETITIONS', competitions), \
+             patch.dict(test_app.config, {"COMPETITIONS_PAGE_SIZE": 2}):
+            with test_app.test_client() as client:
+                log_in(client, "Simply Lift")
+                response = client.get('/competitions/Simply Lift')
+                assert b"Competition 1" in response.data
+                assert b"Competition 2" not in response.data
+                assert b"Next competitions" in response.data
+
+                next_url = response.data.decode().split(
+                    'href="/competitions/'
+                )[-1].split('"')[0].replace("&amp;", "&")
+                response = client.get(f'/competitions/{next_url}')
+                assert b"Competition 2" in response.data
+                assert b"Next competitions" not in response.data
+
+
 ########################################################
 #               BOOK ROUTE TESTS
 ########################################################
@@ -161,7 +354,12 @@ class TestPurchasePlacesRoute:
     
     def test_purchase_places_success(self, test_app, mock_json_functions):
         """Test that purchase_places returns 200 with success"""
-        with patch('server.update_data_after_booking', return_value=None), \
+        with patch(
+            'server.book_places',
+            side_effect=lambda competition, club, places: (
+                None, competition, club
+            )
+        ), \
              patch('server.get_obj_by_field') as mock_get:
             mock_get.side_effect = [
                 {
@@ -187,8 +385,10 @@ class TestPurchasePlacesRoute:
     def test_purchase_places_with_error(self, test_app, mock_json_functions):
         """Test that purchase_places returns 200 with an error"""
         with patch(
-            'server.update_data_after_booking', 
-            return_value="Error message"
+            'server.book_places',
+            side_effect=lambda competition, club, places: (
+                "Error message", competition, club
+            )
         ), \
         patch('server.get_obj_by_field') as mock_get:
             mock_get.side_effect = [
@@ -212,6 +412,17 @@ class TestPurchasePlacesRoute:
                 assert response.status_code == 200
                 assert b"Error message" in response.data
     
+    def test_purchase_places_with_unknown_club(
+        self, test_app, mock_json_functions):
+        """Test that purchase_places returns 302 with an unknown club"""
+        with test_app.test_client() as client:
+            response = client.post('/purchase_places', data={
+                'competition': 'Spring Festival',
+                'club': 'Unknown Club',
+                'places': '1'
+            })
+            assert response.status_code == 302
+
     def test_purchase_places_missing_data(self, test_app):
         """Test that purchase_places returns 302 with missing data"""
         with test_app.test_client() as client:
@@ -236,13 +447,71 @@ class TestDisplayPointsRoute:
     
     def test_display_points_without_clubs(self, test_app):
         """Test that display_points returns 200 without clubs"""
-        with patch('server.CLUBS', []):
+        with patch('data_manager.CLUBS', []):
             with test_app.test_client() as client:
                 response = client.get('/display_points')
                 assert response.status_code == 200
                 assert b"No clubs found" in response.data
 
 
+########################################################
+#                 RENDER CACHE TESTS
+########################################################
+
+
+class TestRenderCache:
+    """Unit tests for the render cache"""
+
+    def test_page_is_rendered_once_per_version(self):
+        """Test that a cached page is not rendered again"""
+        cache = RenderCache(4)
+        source = []
+        render = MagicMock(return_value="page")
+        with patch('server.get_data_version', return_value=1):
+            assert cache.get_or_render("points", source, render) == "page"
+            assert cache.get_or_render("points", source, render) == "page"
+        render.assert_called_once()
+
+    def test_page_is_rendered_again_after_data_change(self):
+        """Test that a new data version invalidates the page"""
+        cache = RenderCache(4)
+        source = []
+        render = MagicMock(side_effect=["old", "new"])
+        with patch('server.get_data_version', return_value=1):
+            cache.get_or_render("points", source, render)
+        with patch('server.get_data_version', return_value=2):
+            assert cache.get_or_render("points", source, render) == "new"
+
+    def test_page_is_rendered_again_for_another_source(self):
+        """Test that a page is not reused for another list"""
+        cache = RenderCache(4)
+        render = MagicMock(side_effect=["first", "second"])
+        with patch('server.get_data_version', return_value=1):
+            cache.get_or_render("points", [], render)
+            assert cache.get_or_render("points", [], render) == "second"
+
+    def test_cache_is_bounded(self):
+        """Test that the least recently used pages are dropped"""
+        cache = RenderCache(2)
+        source = []
+        for version in range(1, 4):
+            with patch('server.get_data_version', return_value=version):
+                cache.get_or_render("points", source, lambda: "page")
+        assert len(cache._pages) == 2
+
+    def test_cache_can_be_disabled(self):
+        """Test that nothing is cached without entries"""
+        cache = RenderCache(0)
+        render = MagicMock(return_value="page")
+        cache.get_or_render("points", [], render)
+        assert len(cache._pages) == 0
+
+    def test_app_has_render_cache(self):
+        """Test that the created app has a render cache"""
+        test_app = create_app()
+        assert isinstance(test_app.extensions["render_cache"], RenderCache)
+
+
 ########################################################
 #               LOGOUT ROUTE TESTS
 ########################################################
@@ -0,0 +1,80 @@
+from locust_files.slo_gate import (
+    check_slos,
+    compare_with_baseline,
+    prepare_data,
+    read_stats
+)
+
+STATS_CSV = (
+    "Type,Name,Request Count,Failure Count,Median Response Time,"
+    "50%,95%,99%\n"
+    "GET,/,100,0,10,10,30,60\n"
+    "POST,/purchase_places,50,5,40,40,200,900\n"
+    "GET,/logout,0,0,0,N/A,N/A,N/A\n"
+    ",Aggregated,150,5,12,12,150,800\n"
+)
+
+
+def stats(p95=30.0, error_rate=0.0, requests=100):
+    return {"GET /": {"requests": requests, "error_rate": error_rate,
+                      "p50": 10.0, "p95": p95, "p99": 60.0}}
+
+
+def test_read_stats(tmp_path):
+    """Test that the stats of each endpoint are read from the CSV"""
+    stats_file = tmp_path / "locust_stats.csv"
+    stats_file.write_text(STATS_CSV)
+
+    result = read_stats(str(stats_file))
+
+    assert result["GET /"] == {
+        "requests": 100, "error_rate": 0.0,
+        "p50": 10.0, "p95": 30.0, "p99": 60.0,
+    }
+    assert result["POST /purchase_places"]["error_rate"] == 0.1
+    assert result["GET /logout"]["p95"] is None
+    assert result["Aggregated"]["requests"] == 150
+
+
+def test_check_slos():
+    """Test that the endpoint thresholds override the default ones"""
+    slos = {
+        "default": {"p95": 100, "error_rate": 0.01},
+        "endpoints": {"GET /": {"p95": 20}},
+    }
+    assert check_slos(stats(p95=30.0), slos) == [
+        "GET /: p95 30 above the SLO 20"
+    ]
+    assert check_slos(stats(p95=15.0), slos) == []
+    assert check_slos(stats(p95=15.0, error_rate=0.5), slos) == [
+        "GET /: error_rate 0.5 above the SLO 0.01"
+    ]
+
+
+def test_compare_with_baseline():
+    """Test that only the slowdowns beyond the tolerance fail"""
+    baseline = stats(p95=100.0)
+    assert compare_with_baseline(stats(p95=115.0), baseline, 0.2) == []
+    assert compare_with_baseline(stats(p95=200.0), baseline, 0.2) == [
+        "GET /: p95 200 ms against 100 ms in the baseline"
+    ]
+    assert len(
+        compare_with_baseline(stats(error_rate=0.05), stats(), 0.2)
+    ) == 1
+
+
+def test_compare_skips_rare_endpoints():
+    """Test that endpoints with few requests are not compared"""
+    assert compare_with_baseline(
+        stats(p95=500.0, requests=5), stats(p95=100.0), 0.2
+    ) == []
+
+
+def test_prepare_generated_data(tmp_path):
+    """Test that the app can be tested on generated data"""
+    env = prepare_data(str(tmp_path), clubs=30, competitions=3)
+    assert env["JSON_CLUBS"] == str(tmp_path / "clubs.json")
+    assert (tmp_path / "clubs.json").exists()
+    assert (tmp_path / "competitions.json").exists()
+    # The app resets the data at the start of each run
+    assert env["LOAD_TEST"] == "1" and env["LOAD_TEST_CLUBS"] == "30"
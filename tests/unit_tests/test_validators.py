@@ -1,7 +1,12 @@
 import pytest
 from datetime import datetime, timedelta
 
-from validators import validate_competition_date, validate_places_required
+from validators import (
+    mail_is_unknown,
+    normalize_email,
+    validate_competition_date,
+    validate_places_required
+)
 
 
 ########################################################
@@ -107,3 +112,47 @@ def test_current_competition():
     competition = {"date": current_date}
     result = validate_competition_date(competition)
     assert result == "This competition has already ended"
+
+
+########################################################
+#               MAIL IS UNKNOWN TESTS
+########################################################
+
+
+CLUBS = [{"name": "Club A", "email": "a@test.com"}]
+
+
+def test_known_email():
+    """
+    Test when the email belongs to a club.
+    """
+    assert mail_is_unknown("a@test.com", CLUBS) is False
+
+def test_unknown_email():
+    """
+    Test when the email belongs to no club.
+    """
+    assert mail_is_unknown("b@test.com", CLUBS) is True
+
+def test_empty_or_missing_email():
+    """
+    Test when the email is empty or missing.
+    """
+    assert mail_is_unknown("", CLUBS) is True
+    assert mail_is_unknown("   ", CLUBS) is True
+    assert mail_is_unknown(None, CLUBS) is True
+
+def test_email_case_and_spaces_are_ignored():
+    """
+    Test when the email differs only by case and surrounding spaces.
+    """
+    assert mail_is_unknown("  A@Test.COM ", CLUBS) is False
+    assert normalize_email("  A@Test.COM ") == "a@test.com"
+
+def test_email_checked_against_index():
+    """
+    Test when the clubs are given as an index keyed by normalized email.
+    """
+    index = {"a@test.com": CLUBS[0]}
+    assert mail_is_unknown("A@test.com", index) is False
+    assert mail_is_unknown("b@test.com", index) is True
@@ -1,5 +1,17 @@
+from collections.abc import Mapping
 from datetime import datetime
 
+from models import competition_date
+
+
+def normalize_email(email):
+    """
+    Return the email in the form used to compare club emails:
+    stripped and lowercased ("" for a missing email).
+    """
+    return (email or "").strip().lower()
+
+
 
 def validate_places_required(places_required, club, competition):
     """
@@ -25,17 +37,25 @@ def validate_places_required(places_required, club, competition):
 def validate_competition_date(competition):
     """
     Check if the competition date is in the past.
+    The date is a datetime for Competition records, and is only parsed
+    for plain dicts.
     Returns a message if the competition date is in the past, 
     otherwise returns None.
     """
-    if competition["date"] < datetime.now().isoformat():
+    if competition_date(competition) < datetime.now():
         return "This competition has already ended"
     return None
 
 def mail_is_unknown(email, clubs):
     """
-    Check if the email is unknown.
-    Returns a message if the email is unknown, 
-    otherwise returns None.
+    Check if the email is unknown, ignoring case and surrounding spaces.
+    `clubs` is either a list of clubs or an index of clubs keyed by
+    normalized email, which makes the check constant-time.
+    Returns True if the email is unknown, otherwise returns False.
     """
-    return email not in [club["email"] for club in clubs] or email == ""
+    email = normalize_email(email)
+    if not email:
+        return True
+    if not isinstance(clubs, Mapping):
+        clubs = {normalize_email(club["email"]) for club in clubs}
+    return email not in clubs